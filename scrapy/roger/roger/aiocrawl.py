@@ -0,0 +1,416 @@
+"""
+Lightweight asyncio crawler for small, on-demand recrawls.
+
+    python -m roger.aiocrawl --urls-file changed.txt --output refresh.jsonl
+    python -m roger.aiocrawl --sitemap https://www.roger.pl/sitemap.xml --output refresh.jsonl
+    python -m roger.aiocrawl https://www.roger.pl/produkty --follow --max-pages 200
+
+Starting Scrapy and Twisted costs more than refreshing a few hundred changed
+URLs, so this mode does without both. It fetches over one pooled keep-alive
+aiohttp session, reuses RogerSpider's extraction (roger.extract,
+roger.documents, roger.priority, roger.template), reads the same
+roger.settings and writes items with the same schema. Requests to a host
+are spaced by DOWNLOAD_DELAY, adapted to the host's latency and errors by
+the same controller as AdaptiveThrottleMiddleware (roger.throttle); PDFs
+use the binary download slot's delay. Only the given URLs and the PDFs they
+link to are fetched unless --follow is set. With --sitemap, only URLs whose
+<lastmod> moved since the last crawl are fetched.
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import random
+import time
+from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+try:
+    import aiohttp
+except ImportError:  # only needed for this crawl mode
+    aiohttp = None
+import lxml.etree
+import lxml.html
+
+from roger import settings as roger_settings
+from roger.blobstore import BlobStore
+from roger.documents import (
+    document_title, download_item, extract_pdf_text, generate_title_from_url, page_item, pdf_document,
+    truncate_document,
+)
+from roger.extract import extract_download_links, extract_page, internal_links, is_product_page
+from roger.feed import open_feed_file
+from roger.lastmod import LastmodStore
+from roger.pdfcache import PdfTextCache
+from roger.priority import categorize_url
+from roger.seen import MemorySeenSet, url_fingerprint
+from roger.template import TemplateStore
+from roger.throttle import BACKOFF_STATUSES, ThrottleController
+from roger.urlcanon import canonical_host, canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+SITEMAP_NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+
+# Same as RogerSpider.is_valid_url: don't follow images, etc. but allow PDFs
+IGNORED_EXTENSIONS = ['.jpg', '.png', '.gif', '.zip']
+
+
+def setting(name, default=None):
+    return getattr(roger_settings, name, default)
+
+
+class AsyncCrawler:
+    """
+    Fetches pages and documents concurrently and hands finished items to
+    `emit(item, request_url)`; request_url is the URL as scheduled, before
+    any redirect.
+    """
+
+    def __init__(self, allowed_domains, emit, follow=False, max_pages=None, concurrency=8,
+                 per_host=None, timeout=30, user_agent=None):
+        self.allowed_domains = set(allowed_domains)
+        self.emit = emit
+        self.follow = follow
+        self.max_pages = max_pages
+        self.concurrency = concurrency
+        self.per_host = per_host or setting('CONCURRENT_REQUESTS_PER_DOMAIN', 2)
+        self.timeout = timeout
+        self.user_agent = user_agent or setting('USER_AGENT') or 'roger (+asyncio recrawl)'
+        self.obey_robots = setting('ROBOTSTXT_OBEY', True)
+        self.max_size = setting('BINARY_MAXSIZE', 100 * 1024 * 1024)
+        self.max_pdf_chars = setting('PDF_TEXT_MAX_CHARS', 0)
+        self.trailing_slash = setting('CANONICAL_TRAILING_SLASH', 'strip')
+        self.max_links = setting('LINK_GRAPH_MAX_LINKS', 500) if setting('LINK_GRAPH_ENABLED', True) else None
+
+        # Per-slot request spacing, as in Scrapy's downloader: a slot per
+        # host, and one shared binary slot for PDFs
+        self.delay = setting('DOWNLOAD_DELAY', 0)
+        self.randomize_delay = setting('RANDOMIZE_DOWNLOAD_DELAY', True)
+        self.binary_slot = setting('BINARY_DOWNLOAD_SLOT', 'binary')
+        self.binary_delay = (setting('DOWNLOAD_SLOTS') or {}).get(self.binary_slot, {}).get('delay', self.delay)
+        self.throttle = ThrottleController(
+            max_concurrency=setting('ADAPTIVE_THROTTLE_MAX_CONCURRENCY', 16),
+            max_rps=setting('ADAPTIVE_THROTTLE_MAX_RPS', 0),
+            max_delay=setting('ADAPTIVE_THROTTLE_MAX_DELAY', 30.0),
+            target_latency=setting('ADAPTIVE_THROTTLE_TARGET_LATENCY', 2.0),
+            max_error_rate=setting('ADAPTIVE_THROTTLE_MAX_ERROR_RATE', 0.05),
+        ) if setting('ADAPTIVE_THROTTLE_ENABLED', True) else None
+        self.slot_locks = {}
+        self.slot_last_request = {}
+
+        cache_dir = setting('PDF_TEXT_CACHE_DIR')
+        self.pdf_cache = PdfTextCache(cache_dir) if cache_dir else None
+        template_path = setting('TEMPLATE_STORE_PATH')
+        self.template_store = TemplateStore(
+            template_path,
+            min_pages=setting('TEMPLATE_MIN_PAGES', 20),
+            min_fraction=setting('TEMPLATE_MIN_FRACTION', 0.5),
+        ).load() if template_path else None
+
+        self.session = None
+        self.queue = asyncio.Queue()
+        self.seen = MemorySeenSet()
+        self.robots = {}
+        self.scheduled_pages = 0
+        self.stats = {'pages': 0, 'documents': 0, 'errors': 0, 'robots_blocked': 0}
+
+    def is_valid_url(self, url):
+        if any(url.endswith(ext) for ext in IGNORED_EXTENSIONS):
+            return False
+        return canonical_host(urlparse(url).hostname or '') in self.allowed_domains
+
+    def schedule(self, url, link=None, parent_url=None):
+        """Queue a page, or with `link` a PDF linked from `parent_url`, unless already seen"""
+        if not self.seen.add(url_fingerprint(url, self.trailing_slash)):
+            return
+        if link is None:
+            if self.max_pages is not None and self.scheduled_pages >= self.max_pages:
+                return
+            self.scheduled_pages += 1
+        self.queue.put_nowait((url, link, parent_url))
+
+    async def crawl(self, urls):
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host,
+                                         keepalive_timeout=30)
+        async with aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={'User-Agent': self.user_agent},
+        ) as session:
+            self.session = session
+            for url in urls:
+                self.schedule(url)
+            workers = [asyncio.create_task(self.worker()) for _ in range(self.concurrency)]
+            await self.queue.join()
+            for worker in workers:
+                worker.cancel()
+        if self.template_store is not None:
+            self.template_store.save()
+        return self.stats
+
+    async def worker(self):
+        while True:
+            url, link, parent_url = await self.queue.get()
+            try:
+                await self.fetch(url, link, parent_url)
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Error crawling {url}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def slot_delay(self, slot):
+        if slot == self.binary_slot:
+            return self.binary_delay
+        if self.throttle is not None:
+            return self.throttle.state(slot, self.per_host, self.delay).delay
+        return self.delay
+
+    async def wait_for_slot(self, slot):
+        """Wait until the slot's delay has passed since its last request"""
+        delay = self.slot_delay(slot)
+        if slot != self.binary_slot and self.randomize_delay:
+            delay *= random.uniform(0.5, 1.5)  # like Scrapy's RANDOMIZE_DOWNLOAD_DELAY
+        if not delay:
+            return
+        # Holding the lock while sleeping makes the slot's requests queue up
+        async with self.slot_locks.setdefault(slot, asyncio.Lock()):
+            wait = self.slot_last_request.get(slot, 0.0) + delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.slot_last_request[slot] = time.monotonic()
+
+    def observe(self, slot, latency=None, error=False):
+        """Feed a response (or failure) to the adaptive throttle of a host's slot"""
+        if self.throttle is not None and slot != self.binary_slot:
+            self.throttle.observe(self.throttle.state(slot, self.per_host, self.delay), latency, error)
+
+    async def allowed_by_robots(self, url):
+        if not self.obey_robots:
+            return True
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        if origin not in self.robots:
+            # Share one robots.txt fetch between the workers hitting a new host
+            self.robots[origin] = asyncio.ensure_future(self._fetch_robots(origin))
+        parser = await self.robots[origin]
+        return parser.can_fetch(self.user_agent, url)
+
+    async def _fetch_robots(self, origin):
+        parser = RobotFileParser()
+        await self.wait_for_slot(urlparse(origin).netloc)
+        try:
+            async with self.session.get(f"{origin}/robots.txt") as response:
+                text = await response.text(errors='replace') if response.status == 200 else ''
+        except aiohttp.ClientError:
+            text = ''
+        parser.parse(text.splitlines())
+        return parser
+
+    async def fetch(self, url, link, parent_url):
+        if not await self.allowed_by_robots(url):
+            self.stats['robots_blocked'] += 1
+            return
+
+        request_url = url
+        slot = self.binary_slot if link is not None else urlparse(url).netloc
+        await self.wait_for_slot(slot)
+        started = time.monotonic()
+        try:
+            async with self.session.get(url) as response:
+                self.observe(slot, time.monotonic() - started, response.status in BACKOFF_STATUSES)
+                if response.status >= 400:
+                    self.stats['errors'] += 1
+                    logger.warning(f"HTTP {response.status} for {url}")
+                    return
+                body = await self.read_body(response, url)
+                if body is None:
+                    return
+                content_type = response.headers.get('Content-Type', '').lower()
+                url = str(response.url)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.observe(slot, error=True)
+            raise
+
+        if link is not None:
+            # A PDF linked from a page (RogerSpider.process_pdf_download)
+            content, pages = await self.extract_pdf(body, url)
+            self.emit(download_item(url, document_title(link.get('text', ''), url), content,
+                                    'application/pdf', pages=pages, parent_url=parent_url), request_url)
+            self.stats['documents'] += 1
+        elif not content_type.startswith('text/html') and not content_type.startswith('text/plain'):
+            # A binary response reached as a page (RogerSpider.parse)
+            content, pages = "", []
+            if content_type.startswith('application/pdf') or url.lower().endswith('.pdf'):
+                content, pages = await self.extract_pdf(body, url)
+            filename = url.split('/')[-1]
+            self.emit(download_item(url, generate_title_from_url(url) or filename, content,
+                                    content_type.split(';')[0], pages=pages), request_url)
+            self.stats['documents'] += 1
+        else:
+            self.process_page(url, body, request_url)
+
+    async def read_body(self, response, url):
+        """
+        Read a response body, or return None as soon as it grows past
+        BINARY_MAXSIZE; chunked responses and those without Content-Length
+        are only caught this way
+        """
+        if self.max_size and response.content_length and response.content_length > self.max_size:
+            logger.warning(f"Skipping {url}: {response.content_length} bytes is over BINARY_MAXSIZE")
+            return None
+        chunks = []
+        size = 0
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            size += len(chunk)
+            if self.max_size and size > self.max_size:
+                logger.warning(f"Cancelled {url}: body exceeded BINARY_MAXSIZE ({self.max_size} bytes)")
+                return None
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+    async def extract_pdf(self, body, url):
+        """Extract PDF text and page spans off the event loop"""
+        def extract():
+            if self.pdf_cache is not None:
+                text, pages = pdf_document(self.pdf_cache.pages(body))
+            else:
+                text, pages = extract_pdf_text(body)
+            return truncate_document(text, pages, self.max_pdf_chars)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, extract)
+        except Exception as e:
+            logger.error(f"PDF extraction error for {url}: {e}")
+            return f"PDF document - extraction failed: {str(e)}", []
+
+    def process_page(self, url, body, request_url):
+        """Extract an HTML page into an item (RogerSpider.parse)"""
+        root = lxml.html.document_fromstring(body)
+        base = root.find('.//base[@href]')
+        page = extract_page(root, urljoin(url, base.get('href')) if base is not None else url)
+        content = page['content']
+
+        template_blocks = []
+        if self.template_store is not None:
+            content, template_blocks = self.template_store.strip(canonical_host(urlparse(url).netloc),
+                                                                 page['blocks'])
+
+        processed_download_links = []
+        for link in extract_download_links(page):
+            if link['url'].lower().endswith('.pdf'):
+                link['text'] = document_title(link['text'], link['url'])
+                self.schedule(link['url'], link=link, parent_url=url)
+            else:
+                processed_download_links.append(link)
+
+        extra = {}
+        if self.max_links is not None:
+            extra['links'] = internal_links(url, page, self.is_valid_url, self.max_links)
+        self.emit(page_item(url, page['title'], content, categorize_url(url), is_product_page(page),
+                            processed_download_links, template_blocks=template_blocks, **extra), request_url)
+        self.stats['pages'] += 1
+
+        if self.follow:
+            for link in page['links']:
+                if self.is_valid_url(link['url']):
+                    self.schedule(link['url'].split('#', 1)[0])
+
+
+async def changed_sitemap_urls(session, sitemap_url, lastmod_store):
+    """Return (url, lastmod) for the sitemap entries that changed since the last crawl"""
+    async with session.get(sitemap_url) as response:
+        body = await response.read()
+    if body[:2] == b'\x1f\x8b':  # gzipped sitemap
+        body = gzip.decompress(body)
+
+    root = lxml.etree.fromstring(body, parser=lxml.etree.XMLParser(resolve_entities=False))
+    if root.tag == f"{SITEMAP_NS}sitemapindex":
+        entries = []
+        for loc in root.iter(f"{SITEMAP_NS}loc"):
+            entries.extend(await changed_sitemap_urls(session, loc.text.strip(), lastmod_store))
+        return entries
+
+    entries = []
+    for url_element in root.iter(f"{SITEMAP_NS}url"):
+        url = url_element.findtext(f"{SITEMAP_NS}loc", '').strip()
+        lastmod = url_element.findtext(f"{SITEMAP_NS}lastmod")
+        if url and not lastmod_store.is_unchanged(url, lastmod):
+            entries.append((url, lastmod))
+    return entries
+
+
+async def refresh(urls, output, sitemap=None, follow=False, max_pages=None, concurrency=8):
+    """Crawl `urls` (plus changed sitemap URLs) into a JSON-lines file; returns crawl stats"""
+    blob_dir = setting('BLOB_STORE_DIR')
+    blobs = BlobStore(blob_dir) if blob_dir else None
+    blob_min_chars = setting('BLOB_MIN_CHARS', 2000)
+    blob_preview_chars = setting('BLOB_PREVIEW_CHARS', 500)
+
+    lastmod_store = None
+    lastmods = {}
+    if sitemap:
+        lastmod_store = LastmodStore(setting('SITEMAP_LASTMOD_PATH', 'crawl_state/lastmod.json')).load()
+        async with aiohttp.ClientSession() as session:
+            changed = await changed_sitemap_urls(session, sitemap, lastmod_store)
+        logger.info(f"Sitemap {sitemap}: {len(changed)} URLs changed since the last crawl")
+        urls = list(urls) + [url for url, _ in changed]
+        lastmods = {canonicalize_url(url): lastmod for url, lastmod in changed}
+
+    domains = {canonical_host(urlparse(url).hostname or '') for url in urls}
+    output_dir = os.path.dirname(output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    with open_feed_file(output, 'wb') as f:
+        def emit(item, request_url):
+            if blobs is not None:
+                blobs.offload(item, blob_min_chars, blob_preview_chars)
+            f.write((json.dumps(item, ensure_ascii=False) + '\n').encode('utf-8'))
+            # By the URL the sitemap listed, which a redirect may have changed
+            lastmod = lastmods.get(canonicalize_url(request_url))
+            if lastmod_store is not None and lastmod is not None:
+                lastmod_store.record(request_url, lastmod)
+
+        crawler = AsyncCrawler(domains, emit, follow=follow, max_pages=max_pages, concurrency=concurrency)
+        stats = await crawler.crawl(urls)
+
+    if lastmod_store is not None:
+        lastmod_store.save()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recrawl a few URLs without starting Scrapy')
+    parser.add_argument('urls', nargs='*', help='URLs to crawl')
+    parser.add_argument('--urls-file', help='File with one URL per line (e.g. a delta manifest)')
+    parser.add_argument('--sitemap', help='Sitemap URL; crawl the entries whose <lastmod> changed')
+    parser.add_argument('--output', default='refresh.jsonl', help='Output JSON-lines file (.jsonl, .gz or .zst)')
+    parser.add_argument('--follow', action='store_true', help='Also crawl internal links')
+    parser.add_argument('--max-pages', type=int, help='Stop scheduling pages after this many')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent requests')
+    args = parser.parse_args()
+
+    if aiohttp is None:
+        raise SystemExit("The asyncio crawler needs the 'aiohttp' package (pip install aiohttp)")
+
+    urls = list(args.urls)
+    if args.urls_file:
+        with open(args.urls_file, 'r', encoding='utf-8') as f:
+            urls.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    if not urls and not args.sitemap:
+        parser.error('give URLs, --urls-file or --sitemap')
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+    start = time.time()
+    stats = asyncio.run(refresh(urls, args.output, args.sitemap, args.follow, args.max_pages, args.concurrency))
+    stats['seconds'] = round(time.time() - start, 2)
+    # One JSON line on stdout for callers such as the backend
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Crawl throughput benchmark: RogerSpider against the local mock site.
+
+    python -m roger.benchmark --pages 1000 --latency 0.05 -s DOWNLOAD_DELAY=0
+
+Serves a roger.mocksite site, crawls it with RogerSpider in a fresh working
+directory (so every cache and seen-set starts cold) and reports pages/sec,
+CPU time per page and the spider's peak memory. Settings given with -s are
+passed on to the crawl, so an optimization can be measured with and without.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from roger.blobstore import is_document
+from roger.mocksite import add_site_arguments, make_server, site_from_arguments
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _serve(args, port, ready):
+    server = make_server(site_from_arguments(args), port=port)
+    ready.set()
+    server.serve_forever()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def count_items(path):
+    """Count the crawled HTML pages and documents in a JSON-lines feed"""
+    counts = {'pages': 0, 'documents': 0}
+    if not os.path.isfile(path):
+        return counts
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                counts['documents' if is_document(item) else 'pages'] += 1
+    return counts
+
+
+def run_benchmark(args):
+    """Crawl the mock site once and return the measurements"""
+    port = free_port()
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=_serve, args=(args, port, ready), daemon=True)
+    server.start()
+    ready.wait(30)
+
+    workdir = tempfile.mkdtemp(prefix='roger-bench-')
+    feed_path = os.path.join(workdir, 'output.jsonl')
+    command = [
+        sys.executable, '-m', 'scrapy', 'crawl', 'RogerSpider',
+        '-a', f"start_url=http://localhost:{port}/",
+        '-s', f"ITEM_FEED_PATH={feed_path}",
+        '-s', 'ITEM_FEED_MODE=jsonl',
+        '-s', f"LOG_FILE={os.path.join(workdir, 'crawl.log')}",
+    ]
+    for setting in args.set:
+        command += ['-s', setting]
+    env = dict(os.environ, SCRAPY_SETTINGS_MODULE='roger.settings',
+               PYTHONPATH=os.pathsep.join(filter(None, [PROJECT_DIR, os.environ.get('PYTHONPATH')])))
+
+    try:
+        # wait4 returns the resource usage of this crawl process alone;
+        # RUSAGE_CHILDREN would carry the peak memory of earlier runs over
+        start = time.perf_counter()
+        process = subprocess.Popen(command, cwd=workdir, env=env)
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - start
+        process.returncode = returncode = os.waitstatus_to_exitcode(status)
+        counts = count_items(feed_path)
+    finally:
+        server.terminate()
+        server.join()
+        if args.keep:
+            print(f"Crawl state kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    cpu = usage.ru_utime + usage.ru_stime
+    pages = counts['pages']
+    return {
+        'returncode': returncode,
+        'pages': pages,
+        'documents': counts['documents'],
+        'seconds': elapsed,
+        'pages_per_second': pages / elapsed if elapsed else 0.0,
+        'items_per_second': (pages + counts['documents']) / elapsed if elapsed else 0.0,
+        'cpu_seconds': cpu,
+        'cpu_ms_per_page': 1000 * cpu / pages if pages else None,
+        'peak_memory_mb': usage.ru_maxrss / 1024,  # ru_maxrss is in KiB on Linux
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark RogerSpider against the local mock site')
+    add_site_arguments(parser)
+    parser.add_argument('-s', '--set', action='append', default=[], metavar='NAME=VALUE',
+                        help='Scrapy setting for the crawl (repeatable)')
+    parser.add_argument('--runs', type=int, default=1, help='Number of crawls to run')
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    parser.add_argument('--keep', action='store_true', help='Keep the crawl working directory')
+    args = parser.parse_args()
+
+    results = []
+    for run in range(1, args.runs + 1):
+        result = run_benchmark(args)
+        results.append(result)
+        cpu_per_page = f"{result['cpu_ms_per_page']:.1f}" if result['cpu_ms_per_page'] is not None else '-'
+        print(f"Run {run}: {result['pages']} pages + {result['documents']} documents in {result['seconds']:.1f} s - "
+              f"{result['pages_per_second']:.1f} pages/s, {cpu_per_page} ms CPU/page, "
+              f"peak {result['peak_memory_mb']:.0f} MB")
+        if result['returncode']:
+            print(f"Warning: the crawl exited with status {result['returncode']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'site': {key: getattr(args, key) for key in
+                                ('pages', 'fanout', 'documents', 'pdf_size', 'latency', 'jitter', 'seed')},
+                       'settings': args.set, 'runs': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
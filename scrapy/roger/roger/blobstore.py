@@ -0,0 +1,62 @@
+"""
+Content-addressed store for large document text (full PDF text).
+
+Each text is gzip-compressed and stored once under its SHA-256, sharded by
+the first two hex digits: <directory>/ab/abcdef....txt.gz. Items reference
+the text by that hash instead of carrying it inline.
+"""
+
+import gzip
+import hashlib
+import os
+
+
+def is_document(item):
+    """
+    Check whether an item is a downloaded document rather than an HTML page
+    (HTML pages under /downloads are categorized 'download' too). Items of
+    older feeds have no 'content_type', but PDF items have their 'pages'.
+    """
+    return bool(item.get('content_type')) or 'pages' in item
+
+
+class BlobStore:
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, digest):
+        return os.path.join(self.directory, digest[:2], f"{digest}.txt.gz")
+
+    def put(self, text):
+        """Store text (once per distinct content) and return its SHA-256 hex digest"""
+        data = text.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def get(self, digest):
+        with gzip.open(self.path(digest), 'rb') as f:
+            return f.read().decode('utf-8')
+
+    def __contains__(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def offload(self, item, min_chars, preview_chars):
+        """
+        Move a document item's 'content' into the store if it has at least
+        min_chars characters, leaving a preview, 'content_blob' and
+        'content_length'. HTML pages keep their text inline. Works on dicts
+        and ItemAdapters.
+        """
+        content = item.get('content') or ''
+        if is_document(item) and len(content) >= min_chars:
+            item['content_blob'] = self.put(content)
+            item['content_length'] = len(content)
+            item['content'] = content[:preview_chars]
+        return item
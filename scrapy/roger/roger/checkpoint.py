@@ -0,0 +1,63 @@
+"""
+Helpers for reading and writing crawl checkpoints.
+
+A checkpoint directory holds numbered snapshots (ckpt-000001, ...), each with
+a manifest.json and the files its components wrote, plus a LATEST file naming
+the newest complete snapshot. LATEST is only updated once a snapshot has been
+fully written, so a crash mid-checkpoint leaves the previous one usable.
+"""
+
+import json
+import os
+import pickle
+
+MANIFEST_FILE = 'manifest.json'
+LATEST_FILE = 'LATEST'
+FRONTIER_FILE = 'frontier.pickle'
+
+
+def write_atomic(path, data, mode='w'):
+    """Write a file via a temp file and rename, so readers never see half of it"""
+    tmp_path = f"{path}.tmp"
+    if 'b' in mode:
+        with open(tmp_path, mode) as f:
+            f.write(data)
+    else:
+        with open(tmp_path, mode, encoding='utf-8') as f:
+            f.write(data)
+    os.replace(tmp_path, path)
+
+
+def latest_checkpoint(directory):
+    """Return the path of the newest complete snapshot, or None"""
+    latest_path = os.path.join(directory, LATEST_FILE)
+    if not os.path.isfile(latest_path):
+        return None
+    with open(latest_path, 'r', encoding='utf-8') as f:
+        name = f.read().strip()
+    snapshot = os.path.join(directory, name)
+    return snapshot if os.path.isfile(os.path.join(snapshot, MANIFEST_FILE)) else None
+
+
+def load_manifest(directory):
+    """Return (snapshot_path, manifest) for the newest snapshot, or (None, None)"""
+    snapshot = latest_checkpoint(directory)
+    if snapshot is None:
+        return None, None
+    with open(os.path.join(snapshot, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        return snapshot, json.load(f)
+
+
+def load_frontier(directory):
+    """Return the request dicts pending in the newest snapshot, or None"""
+    snapshot = latest_checkpoint(directory)
+    if snapshot is None:
+        return None
+    with open(os.path.join(snapshot, FRONTIER_FILE), 'rb') as f:
+        return pickle.load(f)
+
+
+def request_key(url, callback):
+    """Key identifying a scheduled request in the checkpoint frontier"""
+    callback_name = getattr(callback, '__name__', callback) or 'parse'
+    return f"{callback_name} {url}"
@@ -0,0 +1,139 @@
+"""
+Run a crawl with several RogerSpider processes sharing one frontier.
+
+    python -m roger.distributed --workers 4 -a sitemap=1 -s DOWNLOAD_DELAY=0.25
+
+A single Scrapy process parses HTML and PDFs on one core. This launcher
+starts N `scrapy crawl RogerSpider` workers that share their frontier and
+seen-set through a SQLite file (roger.frontier, roger.schedulers), so the
+crawl spreads over N cores. Each worker claims batches of requests and
+writes its own feed file (or shards) named items-<worker>-<run>... in the
+feed directory; roger.feed.iter_items and the website processor read the
+directory as one feed. Templates, metrics and logs are kept per worker.
+
+The frontier records every request's state, so an interrupted crawl is
+continued with --resume instead of crawl checkpoints, which are turned off
+for the workers. Near-duplicate detection only compares pages within a
+worker, and per-host throttling applies per worker, so lower the per-worker
+concurrency (-s ADAPTIVE_THROTTLE_MAX_CONCURRENCY=...) to keep the total
+load on the site where it was.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from roger import settings as project_settings
+from roger.frontier import SqliteFrontier
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def worker_path(path, worker):
+    """Insert the worker id before a path's extension: metrics.json -> metrics-w01.json"""
+    root, extension = os.path.splitext(path)
+    return f"{root}-{worker}{extension}"
+
+
+def remove_frontier(path):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def worker_command(args, worker, run, overrides):
+    """Return the scrapy command line for one worker"""
+    def setting(name):
+        return overrides.get(name, getattr(project_settings, name, None))
+
+    worker_settings = {
+        'SCHEDULER': 'roger.schedulers.SharedFrontierScheduler',
+        'SHARED_FRONTIER_PATH': os.path.abspath(args.frontier),
+        'WORKER_ID': worker,
+        'CHECKPOINT_ENABLED': '0',
+        'LOG_FILE': os.path.join(args.log_dir, f"crawl-{worker}.log"),
+    }
+    if args.feed_mode == 'shards':
+        worker_settings.update(ITEM_FEED_MODE='shards', ITEM_FEED_DIR=args.feed_dir,
+                               ITEM_FEED_SHARD_PREFIX=f"items-{worker}-{run}")
+    else:
+        worker_settings.update(ITEM_FEED_MODE='jsonl',
+                               ITEM_FEED_PATH=os.path.join(args.feed_dir, f"items-{worker}-{run}.jsonl"))
+    # Files a single crawl owns would be overwritten by every worker
+    for name in ('TEMPLATE_STORE_PATH', 'METRICS_PATH'):
+        if setting(name):
+            worker_settings[name] = worker_path(setting(name), worker)
+
+    command = [sys.executable, '-m', 'scrapy', 'crawl', 'RogerSpider']
+    for argument in args.argument:
+        command += ['-a', argument]
+    # User settings first, so the per-worker ones win
+    for name, value in {**overrides, **worker_settings}.items():
+        command += ['-s', f"{name}={value}"]
+    return command
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl with several RogerSpider processes sharing one frontier')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Number of crawl processes')
+    parser.add_argument('--frontier', default='crawl_state/frontier.sqlite3', help='Shared frontier database')
+    parser.add_argument('--feed-dir', default='feed', help='Directory the workers write their feeds to')
+    parser.add_argument('--feed-mode', choices=('jsonl', 'shards'), default='jsonl',
+                        help='One JSON-lines file per worker, or compressed shards (ITEM_FEED_MODE)')
+    parser.add_argument('--log-dir', default='crawl_state', help='Directory for the per-worker logs')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue the crawl recorded in the frontier instead of starting over')
+    parser.add_argument('--interval', type=float, default=30, help='Seconds between progress reports')
+    parser.add_argument('-a', '--argument', action='append', default=[], metavar='NAME=VALUE',
+                        help='Spider argument (repeatable)')
+    parser.add_argument('-s', '--set', action='append', default=[], metavar='NAME=VALUE',
+                        help='Scrapy setting for every worker (repeatable)')
+    args = parser.parse_args()
+
+    overrides = dict(setting.split('=', 1) for setting in args.set)
+    os.makedirs(args.feed_dir, exist_ok=True)
+    os.makedirs(args.log_dir, exist_ok=True)
+    if args.resume:
+        # Claims of the interrupted run will never be completed by their workers
+        frontier = SqliteFrontier(args.frontier)
+        released = frontier.release()
+        print(f"Resuming crawl: {frontier.counts()}, {released} interrupted requests requeued")
+        frontier.close()
+    else:
+        remove_frontier(args.frontier)
+
+    run = time.strftime('%Y%m%d%H%M%S')
+    env = dict(os.environ, SCRAPY_SETTINGS_MODULE='roger.settings',
+               PYTHONPATH=os.pathsep.join(filter(None, [PROJECT_DIR, os.environ.get('PYTHONPATH')])))
+    workers = {}
+    for i in range(1, args.workers + 1):
+        worker = f"w{i:02d}"
+        workers[worker] = subprocess.Popen(worker_command(args, worker, run, overrides), env=env)
+    print(f"Started {len(workers)} workers sharing {args.frontier}")
+
+    started = time.monotonic()
+    frontier = SqliteFrontier(args.frontier)
+    try:
+        while any(process.poll() is None for process in workers.values()):
+            time.sleep(min(args.interval, 1.0))
+            if time.monotonic() - started >= args.interval:
+                started = time.monotonic()
+                print(f"Frontier: {frontier.counts()}")
+    except KeyboardInterrupt:
+        # The workers got the interrupt too; wait for them to shut down cleanly
+        print("Interrupted, waiting for the workers to stop (continue with --resume)")
+        for process in workers.values():
+            process.wait()
+
+    failed = {worker: process.returncode for worker, process in workers.items() if process.returncode}
+    print(f"Finished: {frontier.counts()}")
+    frontier.close()
+    if failed:
+        print(f"Workers exited with errors: {failed}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
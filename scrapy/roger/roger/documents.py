@@ -0,0 +1,181 @@
+"""
+Item builders and PDF helpers shared by RogerSpider, the asyncio crawler
+(roger.aiocrawl) and the offline PDF ingester (roger.ingest).
+"""
+
+import re
+from datetime import datetime
+from io import BytesIO
+from urllib.parse import urlparse
+
+import PyPDF2
+
+
+# Identifies how page text is pulled out of PDFs; bump the suffix when that
+# changes so cached text from the old extractor is not reused
+EXTRACTOR_VERSION = f"pypdf2-{PyPDF2.__version__}-1"
+
+
+def extract_pdf_pages(pdf_data):
+    """
+    Extract the raw text of each page from PDF bytes, a path to a PDF file
+    or an open binary file. Raises on unreadable PDFs.
+    """
+    # Read paths (e.g. spooled response bodies) straight from disk
+    if isinstance(pdf_data, (bytes, bytearray)):
+        pdf_file = BytesIO(pdf_data)
+    elif isinstance(pdf_data, str):
+        pdf_file = open(pdf_data, 'rb')
+    else:
+        pdf_file = pdf_data
+    
+    with pdf_file:
+        pdf_reader = PyPDF2.PdfReader(pdf_file)
+        return [page.extract_text() or '' for page in pdf_reader.pages]
+
+
+def clean_page_text(text):
+    """
+    Normalize the raw text of one page: collapse runs of whitespace and join
+    wrapped lines, keeping paragraph breaks as a blank line. A paragraph
+    ends at a blank line, at an all-caps heading, or at a line that ends a
+    sentence well short of the page's line width.
+    """
+    lines = [re.sub(r'\s+', ' ', line).strip() for line in text.splitlines()]
+    width = max((len(line) for line in lines), default=0)
+    
+    paragraphs = []
+    current = []
+    for line in lines:
+        if line:
+            current.append(line)
+        heading = line.isupper() and len(line) > 3
+        sentence_end = line.endswith(('.', '!', '?', ':')) and len(line) < 0.8 * width
+        if current and (not line or heading or sentence_end):
+            paragraphs.append(' '.join(current))
+            current = []
+    if current:
+        paragraphs.append(' '.join(current))
+    
+    return '\n\n'.join(paragraphs)
+
+
+def pdf_document(pages):
+    """
+    Build a document's text from its raw page texts. Returns the text, with
+    pages separated by a blank line, and a list of
+    {'page': n, 'start': offset, 'end': offset} character spans, one per page.
+    """
+    parts = []
+    spans = []
+    offset = 0
+    for number, page in enumerate(pages, start=1):
+        text = clean_page_text(page)
+        if parts:
+            offset += 2  # the blank line between pages
+        spans.append({'page': number, 'start': offset, 'end': offset + len(text)})
+        parts.append(text)
+        offset += len(text)
+    return '\n\n'.join(parts), spans
+
+
+def truncate_document(text, spans, max_chars):
+    """Cut a document to max_chars characters, clipping its page spans to match"""
+    if not max_chars or len(text) <= max_chars:
+        return text, spans
+    clipped = [dict(span, end=min(span['end'], max_chars)) for span in spans if span['start'] < max_chars]
+    return text[:max_chars], clipped
+
+
+def extract_pdf_text(pdf_data):
+    """Extract a PDF's text and page spans (see extract_pdf_pages and pdf_document)"""
+    return pdf_document(extract_pdf_pages(pdf_data))
+
+
+def generate_title_from_url(url):
+    """Generate a better title from URL path segments"""
+    try:
+        # Extract the last meaningful segment from the URL path
+        path = urlparse(url).path
+        segments = [s for s in path.split('/') if s and s != 'file']
+
+        if not segments:
+            return None
+
+        # Get the last segment before 'file' if it exists
+        last_segment = segments[-1]
+
+        # Clean up the segment
+        clean_segment = last_segment.replace('-', ' ').replace('_', ' ')
+
+        # Handle numeric IDs at the beginning
+        clean_segment = re.sub(r'^\d+\s+', '', clean_segment)
+
+        # Extract manual type if possible
+        manual_type = None
+        manual_match = re.search(r'(installation|operating|user|product|technical|reference)\s*(manual|guide)', clean_segment, re.I)
+        if manual_match:
+            manual_type = manual_match.group(0)
+
+        # Extract product model
+        model_match = re.search(r'([A-Z0-9]+-[0-9]+|[A-Z]+-[0-9]+|[A-Z0-9]{2,6})', clean_segment, re.I)
+        model = model_match.group(0) if model_match else None
+
+        # Construct a title
+        if model and manual_type:
+            title = f"{model.upper()} {manual_type.title()}"
+        elif model:
+            title = f"{model.upper()} Document"
+        else:
+            # Capitalize words appropriately
+            title = ' '.join(word.capitalize() for word in clean_segment.split())
+
+        return title
+    except:
+        return None
+
+
+# Link texts that say nothing about the document behind the link
+GENERIC_LINK_TEXTS = ['file', 'download', 'document']
+
+
+def document_title(link_text, url):
+    """Use the link text as a document's title unless it is generic"""
+    if not link_text or link_text.lower() in GENERIC_LINK_TEXTS:
+        return generate_title_from_url(url) or link_text
+    return link_text
+
+
+def page_item(url, title, content, category, is_product, download_links, **extra):
+    """Build a crawl item for an HTML page"""
+    item = {
+        'url': url,
+        'title': title,
+        'content': content,
+        'category': category,
+        'is_product': is_product,
+        'download_links': download_links,
+    }
+    item.update(extra)
+    item['timestamp'] = datetime.now().isoformat()
+    return item
+
+
+def download_item(url, title, content, content_type, **extra):
+    """Build a crawl item for a downloadable document"""
+    item = {
+        'url': url,
+        'title': title,
+        'content': content,
+        'category': 'download',
+        'content_type': content_type,
+        'is_product': False,
+        'download_links': [{
+            'url': url,
+            'text': title,
+            'type': content_type
+        }],
+    }
+    item.update(extra)
+    item['timestamp'] = datetime.now().isoformat()
+    return item
@@ -0,0 +1,91 @@
+from scrapy import signals
+from scrapy.dupefilters import BaseDupeFilter
+
+from roger import signals as roger_signals
+from roger.checkpoint import load_manifest
+from roger.seen import build_seen_set, url_fingerprint
+from roger.urlcanon import canonicalize_url
+
+
+class SeenSetDupeFilter(BaseDupeFilter):
+    """
+    Dupefilter backed by a pluggable seen-set (see roger.seen).
+
+    The scheduler consults it before enqueueing each request, so duplicates
+    are dropped before they are ever scheduled and memory stays bounded.
+    """
+
+    def __init__(self, seen, debug=False, trailing_slash='strip'):
+        self.seen = seen
+        self.debug = debug
+        self.trailing_slash = trailing_slash
+        self.logdupes = True
+        self.close_on_spider_closed = False
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        dupefilter = cls.from_settings(crawler.settings)
+        crawler.signals.connect(dupefilter.checkpoint, signal=roger_signals.checkpoint)
+        crawler.signals.connect(dupefilter.request_scheduled, signal=signals.request_scheduled)
+        crawler.signals.connect(dupefilter.url_seen, signal=roger_signals.url_seen)
+        # Keep the seen-set open until spider_closed so the final checkpoint
+        # (written by CrawlCheckpoint, connected earlier) can still read it
+        crawler.signals.connect(dupefilter.spider_closed, signal=signals.spider_closed)
+        dupefilter.close_on_spider_closed = True
+
+        # Roll the seen-set back to the checkpoint the crawl resumes from
+        if crawler.settings.getbool('CHECKPOINT_RESUME'):
+            snapshot, manifest = load_manifest(crawler.settings.get('CHECKPOINT_DIR', 'crawl_state/checkpoints'))
+            if manifest and 'seen' in manifest:
+                dupefilter.seen.restore(snapshot, manifest['seen'])
+        return dupefilter
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            build_seen_set(settings),
+            debug=settings.getbool('DUPEFILTER_DEBUG'),
+            trailing_slash=settings.get('CANONICAL_TRAILING_SLASH', 'strip'),
+        )
+
+    def request_seen(self, request):
+        is_new = self.seen.add(url_fingerprint(request.url, self.trailing_slash))
+        # A redirect between variants of the same canonical URL (e.g. roger.pl ->
+        # www.roger.pl) must still be followed, it is the same logical fetch
+        redirect_urls = request.meta.get('redirect_urls')
+        if redirect_urls and self._same_url(request.url, redirect_urls[-1]):
+            return False
+        return not is_new
+
+    def _same_url(self, url, other):
+        return canonicalize_url(url, trailing_slash=self.trailing_slash) == \
+            canonicalize_url(other, trailing_slash=self.trailing_slash)
+
+    def request_scheduled(self, request, spider):
+        # The scheduler only asks request_seen about filtered requests; record
+        # dont_filter ones (start URLs, resumed frontier) too, so links back
+        # to them are not fetched a second time
+        if request.dont_filter:
+            self.seen.add(url_fingerprint(request.url, self.trailing_slash))
+
+    def url_seen(self, url):
+        self.seen.add(url_fingerprint(url, self.trailing_slash))
+
+    def checkpoint(self, directory):
+        return {'seen': self.seen.checkpoint(directory)}
+
+    def close(self, reason):
+        if not self.close_on_spider_closed:
+            self.seen.close()
+
+    def spider_closed(self, spider, reason):
+        self.seen.close()
+
+    def log(self, request, spider):
+        if self.debug:
+            spider.logger.debug(f"Filtered duplicate request: {request.url}")
+        elif self.logdupes:
+            spider.logger.debug(f"Filtered duplicate request: {request.url} "
+                                f"- no more duplicates will be shown (see DUPEFILTER_DEBUG)")
+            self.logdupes = False
+        spider.crawler.stats.inc_value('dupefilter/filtered', spider=spider)
@@ -0,0 +1,255 @@
+import json
+import logging
+import os
+import pickle
+import shutil
+import time
+from datetime import datetime
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+
+from roger import signals as roger_signals
+from roger.checkpoint import FRONTIER_FILE, LATEST_FILE, MANIFEST_FILE, request_key, write_atomic
+from roger.metrics import (
+    EXTRACTION_BUCKETS, LATENCY_BUCKETS, SIZE_BUCKETS, Histogram, to_json, to_prometheus,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlCheckpoint:
+    """
+    Periodically snapshots the crawl so it can resume after a crash.
+
+    The frontier is every request that has been scheduled but whose callback
+    has not finished yet. The seen-set and the item feed offsets are written
+    by their owners in response to the roger checkpoint signal. Resume with
+    -s CHECKPOINT_RESUME=1.
+    """
+
+    def __init__(self, crawler, directory, interval, keep):
+        self.crawler = crawler
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+        self.pending = {}
+        self.sequence = 0
+        self.task = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('CHECKPOINT_ENABLED'):
+            raise NotConfigured
+
+        extension = cls(
+            crawler,
+            directory=settings.get('CHECKPOINT_DIR', 'crawl_state/checkpoints'),
+            interval=settings.getfloat('CHECKPOINT_INTERVAL', 300),
+            keep=settings.getint('CHECKPOINT_KEEP', 2),
+        )
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(extension.request_scheduled, signal=signals.request_scheduled)
+        crawler.signals.connect(extension.request_dropped, signal=signals.request_dropped)
+        crawler.signals.connect(extension.response_processed, signal=roger_signals.response_processed)
+        crawler.signals.connect(extension.spider_idle, signal=signals.spider_idle)
+        return extension
+
+    def spider_opened(self, spider):
+        os.makedirs(self.directory, exist_ok=True)
+        self.sequence = self._last_sequence()
+        self.task = task.LoopingCall(self.write_checkpoint, spider)
+        self.task.start(self.interval, now=False)
+
+    def spider_closed(self, spider, reason):
+        if self.task and self.task.running:
+            self.task.stop()
+        self.write_checkpoint(spider)
+
+    def request_scheduled(self, request, spider):
+        # request_scheduled fires before the dupefilter runs, so keep the
+        # first request for a key and let request_dropped discard duplicates
+        self.pending.setdefault(request_key(request.url, request.callback), request)
+
+    def request_dropped(self, request, spider):
+        key = request_key(request.url, request.callback)
+        if self.pending.get(key) is request:
+            del self.pending[key]
+
+    def response_processed(self, response, spider):
+        request = response.request
+        self.pending.pop(request_key(request.url, request.callback), None)
+        # The original URLs of a redirect chain are done as well
+        for url in response.meta.get('redirect_urls', []):
+            self.pending.pop(request_key(url, request.callback), None)
+
+    def spider_idle(self, spider):
+        # Idle means nothing is queued, downloading or in a callback, so what
+        # is still pending failed to download (robots.txt, size limit, DNS,
+        # timeouts) and never reached a callback; resuming would refetch it
+        if self.pending:
+            logger.debug(f"Dropping {len(self.pending)} failed requests from the checkpoint frontier")
+            self.pending.clear()
+
+    def write_checkpoint(self, spider):
+        """Write a new snapshot and point LATEST at it"""
+        self.sequence += 1
+        name = f"ckpt-{self.sequence:06d}"
+        snapshot = os.path.join(self.directory, name)
+        os.makedirs(snapshot, exist_ok=True)
+
+        # Let the seen-set, the feed and the spider write their own state
+        manifest = {
+            'created': datetime.now().isoformat(),
+            'frontier': len(self.pending),
+        }
+        results = self.crawler.signals.send_catch_log(signal=roger_signals.checkpoint, directory=snapshot)
+        for _, result in results:
+            if isinstance(result, dict):
+                manifest.update(result)
+
+        frontier = [request.to_dict(spider=spider) for request in self.pending.values()]
+        write_atomic(os.path.join(snapshot, FRONTIER_FILE), pickle.dumps(frontier), mode='wb')
+        write_atomic(os.path.join(snapshot, MANIFEST_FILE), json.dumps(manifest, indent=2))
+        write_atomic(os.path.join(self.directory, LATEST_FILE), name)
+
+        self._prune()
+        logger.info(f"Wrote crawl checkpoint {name} with {len(frontier)} pending requests")
+
+    def _last_sequence(self):
+        sequences = [int(name[5:]) for name in os.listdir(self.directory)
+                     if name.startswith('ckpt-') and name[5:].isdigit()]
+        return max(sequences, default=0)
+
+    def _prune(self):
+        """Keep only the newest CHECKPOINT_KEEP snapshots"""
+        names = sorted(name for name in os.listdir(self.directory) if name.startswith('ckpt-'))
+        for name in names[:-self.keep]:
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+
+class CrawlMetrics:
+    """
+    Records where crawl time goes - download latency, response sizes, HTML
+    and PDF extraction time, item rate and queue depth - and writes them to
+    METRICS_PATH every METRICS_INTERVAL seconds, as JSON or in the
+    Prometheus text format (METRICS_FORMAT).
+    """
+
+    def __init__(self, crawler, path, interval, output_format):
+        self.crawler = crawler
+        self.path = path
+        self.interval = interval
+        self.output_format = output_format
+        self.counters = {
+            'responses_total': 0,
+            'response_bytes_total': 0,
+            'error_responses_total': 0,
+            'spider_errors_total': 0,
+            'items_scraped_total': 0,
+            'items_dropped_total': 0,
+        }
+        self.histograms = {
+            'download_latency_seconds': Histogram(LATENCY_BUCKETS),
+            'response_size_bytes': Histogram(SIZE_BUCKETS),
+            'html_extraction_seconds': Histogram(EXTRACTION_BUCKETS),
+            'pdf_extraction_seconds': Histogram(EXTRACTION_BUCKETS),
+        }
+        self.started = None
+        self.last_write = None
+        self.last_items = 0
+        self.task = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        path = settings.get('METRICS_PATH')
+        if not settings.getbool('METRICS_ENABLED') or not path:
+            raise NotConfigured
+
+        extension = cls(
+            crawler,
+            path=path,
+            interval=settings.getfloat('METRICS_INTERVAL', 30),
+            output_format=settings.get('METRICS_FORMAT', 'json'),
+        )
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(extension.response_received, signal=signals.response_received)
+        crawler.signals.connect(extension.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(extension.item_dropped, signal=signals.item_dropped)
+        crawler.signals.connect(extension.extraction_timed, signal=roger_signals.extraction_timed)
+        crawler.signals.connect(extension.spider_error, signal=signals.spider_error)
+        return extension
+
+    def spider_opened(self, spider):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.started = self.last_write = time.monotonic()
+        self.task = task.LoopingCall(self.write_metrics)
+        self.task.start(self.interval, now=False)
+
+    def spider_closed(self, spider, reason):
+        if self.task and self.task.running:
+            self.task.stop()
+        self.write_metrics()
+
+    def response_received(self, response, request, spider):
+        self.counters['responses_total'] += 1
+        if response.status >= 400:
+            self.counters['error_responses_total'] += 1
+        latency = request.meta.get('download_latency')
+        if latency is not None:
+            self.histograms['download_latency_seconds'].observe(latency)
+
+        # Spooled binary bodies are on disk, not in response.body
+        body_path = request.meta.get('body_path')
+        size = os.path.getsize(body_path) if body_path and os.path.exists(body_path) else len(response.body)
+        self.counters['response_bytes_total'] += size
+        self.histograms['response_size_bytes'].observe(size)
+
+    def spider_error(self, failure, response, spider):
+        self.counters['spider_errors_total'] += 1
+
+    def item_scraped(self, item, response, spider):
+        self.counters['items_scraped_total'] += 1
+
+    def item_dropped(self, item, response, exception, spider):
+        self.counters['items_dropped_total'] += 1
+
+    def extraction_timed(self, kind, seconds, url=None):
+        histogram = self.histograms.get(f"{kind}_extraction_seconds")
+        if histogram is not None:
+            histogram.observe(seconds)
+
+    def gauges(self):
+        now = time.monotonic()
+        items = self.counters['items_scraped_total']
+        elapsed = now - self.last_write
+        gauges = {
+            'items_per_second': (items - self.last_items) / elapsed if elapsed > 0 else 0.0,
+            'uptime_seconds': now - self.started,
+            'scheduler_queue_depth': 0,
+            'downloads_in_progress': 0,
+        }
+        self.last_write = now
+        self.last_items = items
+
+        engine = self.crawler.engine
+        # The engine's slot is private; newer Scrapy releases renamed it _slot
+        slot = getattr(engine, 'slot', None) or getattr(engine, '_slot', None)
+        if slot is not None:
+            gauges['scheduler_queue_depth'] = len(slot.scheduler)
+            gauges['downloads_in_progress'] = len(engine.downloader.active)
+        return gauges
+
+    def write_metrics(self):
+        if self.output_format == 'prometheus':
+            data = to_prometheus(self.counters, self.gauges(), self.histograms)
+        else:
+            data = to_json(self.counters, self.gauges(), self.histograms)
+        write_atomic(self.path, data)
@@ -0,0 +1,176 @@
+"""
+Single-pass page extraction for RogerSpider.
+
+extract_page walks an already-parsed lxml tree once and collects everything
+parse() needs: the title, text blocks, links (with anchor text) and the
+product indicators that is_product_page() used to find with separate
+whole-document XPath scans. Text blocks carry their element path so site
+templates can be recognized (see roger.template). is_product_page and
+extract_download_links work on its result and are shared by RogerSpider and
+the asyncio crawler (roger.aiocrawl). internal_links turns the links into
+the page's edges of the site link graph, which items carry in 'links'.
+"""
+
+from urllib.parse import urljoin
+
+from roger.urlcanon import canonicalize_url
+
+# Elements whose direct text makes up a page's content
+CONTENT_TAGS = {'p', 'h1', 'h2', 'h3', 'h4', 'h5'}
+
+# Phrases that mark a product page when they start an element's text
+PRODUCT_INDICATORS = ('technical specification', 'product code', 'model', 'sku')
+
+# Link targets treated as downloads, by extension
+DOWNLOAD_EXTENSIONS = ['.pdf', '.zip', '.doc', '.docx', '.xls', '.xlsx']
+
+
+def _direct_texts(element):
+    """Return the text nodes that are direct children of an element"""
+    texts = [element.text] if element.text is not None else []
+    texts.extend(child.tail for child in element if child.tail is not None)
+    return texts
+
+
+def _element_label(element):
+    """Label an element by its tag and id, or its tag and classes"""
+    element_id = element.get('id')
+    if element_id:
+        return f"{element.tag}#{element_id}"
+    classes = element.get('class', '').split()
+    if classes:
+        return f"{element.tag}.{'.'.join(sorted(classes))}"
+    return element.tag
+
+
+def extract_page(root, base_url):
+    """
+    Walk the tree rooted at `root` once and return a dict with:
+    title, content, blocks (list of (element path, text), one per content
+    element, that make up content), links (list of {'url', 'text'} with
+    absolute URLs), has_price, has_buy_button and product_indicators (the
+    indicators found).
+    """
+    title = None
+    blocks = []
+    paths = {}
+    links = []
+    has_price = False
+    has_buy_button = False
+    indicators_found = set()
+
+    for element in root.iter():
+        tag = element.tag
+        if not isinstance(tag, str):  # comments and processing instructions
+            continue
+
+        texts = _direct_texts(element)
+
+        # Parents come before their children in document order
+        path = f"{paths.get(element.getparent(), '')}/{_element_label(element)}"
+        paths[element] = path
+
+        if tag == 'title':
+            if title is None and texts:
+                title = texts[0]
+        elif tag in CONTENT_TAGS and texts:
+            blocks.append((path, ' '.join(texts)))
+
+        # Price: an element with class "price" or whose first text mentions "$"
+        if texts:
+            first_text = texts[0]
+            if not has_price:
+                if '$' in first_text or 'price' in element.get('class', '').split():
+                    has_price = True
+            if len(indicators_found) < len(PRODUCT_INDICATORS):
+                for indicator in PRODUCT_INDICATORS:
+                    if indicator in first_text:
+                        indicators_found.add(indicator)
+
+        if tag == 'a' or tag == 'button':
+            full_text = ' '.join(''.join(element.itertext()).split())
+            if not has_buy_button and 'Buy' in full_text:
+                has_buy_button = True
+
+            if tag == 'a':
+                href = (element.get('href') or '').strip()
+                if href:
+                    links.append({'url': urljoin(base_url, href), 'text': full_text})
+
+    return {
+        'title': title,
+        'content': ' '.join(text for _, text in blocks),
+        'blocks': blocks,
+        'links': links,
+        'has_price': has_price,
+        'has_buy_button': has_buy_button,
+        'product_indicators': indicators_found,
+    }
+
+
+def is_product_page(page):
+    """Check if page has product characteristics (collected by extract_page)"""
+    has_price = page['has_price']
+    has_buy_button = page['has_buy_button']
+    has_product_indicators = bool(page['product_indicators'])
+    
+    return has_price or has_buy_button or has_product_indicators
+
+
+def extract_download_links(page):
+    """Extract the links of a page that look like downloads"""
+    download_links = []
+    
+    for link in page['links']:
+        full_url = link['url']
+        if any(full_url.lower().endswith(ext) for ext in DOWNLOAD_EXTENSIONS):
+            # Get link text or use fallback
+            link_text = link['text']
+            if not link_text or link_text.strip() == '':
+                link_text = 'Download'
+                
+            # Try to determine file type from extension
+            file_type = 'application/octet-stream'  # default fallback
+            for ext in DOWNLOAD_EXTENSIONS:
+                if full_url.lower().endswith(ext):
+                    if ext == '.pdf':
+                        file_type = 'application/pdf'
+                    elif ext in ['.doc', '.docx']:
+                        file_type = 'application/msword'
+                    elif ext in ['.xls', '.xlsx']:
+                        file_type = 'application/excel'
+                    elif ext == '.zip':
+                        file_type = 'application/zip'
+            
+            download_links.append({
+                'url': full_url,
+                'text': link_text.strip(),
+                'type': file_type
+            })
+    
+    return download_links
+
+
+def internal_links(url, page, is_internal, limit=0):
+    """
+    Return a page's outgoing edges in the site link graph: one
+    {'url', 'text'} per distinct canonical target accepted by is_internal,
+    in page order, with the first non-empty anchor text. Links back to the
+    page itself are left out; limit > 0 caps the number of edges.
+    """
+    source = canonicalize_url(url)
+    edges = {}
+    for link in page['links']:
+        if not is_internal(link['url']):
+            continue
+        target = canonicalize_url(link['url'])
+        if target == source:
+            continue
+        edge = edges.get(target)
+        if edge is None:
+            if limit and len(edges) >= limit:
+                continue
+            edges[target] = {'url': target, 'text': link['text']}
+        elif not edge['text']:
+            edge['text'] = link['text']
+    return list(edges.values())
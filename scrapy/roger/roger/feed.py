@@ -0,0 +1,91 @@
+"""
+Reading and writing the crawl's JSON-lines feed.
+
+Feeds are either a single .jsonl file or a directory of shards
+(items-00001.jsonl.gz, ...) compressed with gzip or zstd. Large document text
+lives in a content-addressed blob store (roger.blobstore) and items only carry
+its hash in 'content_blob'; iter_items puts the text back.
+Shards are independent files, so consumers can process them in parallel.
+"""
+
+import glob
+import gzip
+import io
+import json
+import os
+
+try:
+    import zstandard
+except ImportError:  # zstd shards are optional
+    zstandard = None
+
+from roger import settings as project_settings
+from roger.blobstore import BlobStore
+
+SHARD_EXTENSIONS = {None: '.jsonl', 'gzip': '.jsonl.gz', 'zstd': '.jsonl.zst'}
+
+
+def shard_name(index, compression=None, prefix='items'):
+    return f"{prefix}-{index:05d}{SHARD_EXTENSIONS[compression]}"
+
+
+def shard_paths(directory, prefix='items'):
+    """
+    Return the shard files in a feed directory, in write order. Crawl
+    workers write shards named items-<worker>-..., so the default prefix
+    covers all of them and a worker's own prefix only its shards.
+    """
+    return sorted(glob.glob(os.path.join(directory, f"{prefix}-*.jsonl*")))
+
+
+def open_feed_file(path, mode='rb', level=None):
+    """Open a plain, gzip or zstd feed file based on its extension"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode, compresslevel=level or 6) if 'w' in mode else gzip.open(path, mode)
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise ImportError("zstd feeds need the 'zstandard' package (pip install zstandard)")
+        raw = open(path, mode)
+        if 'w' in mode:
+            return zstandard.ZstdCompressor(level=level or 3).stream_writer(raw)
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw))
+    return open(path, mode)
+
+
+def default_blob_dir(path):
+    """
+    Return the blob store a crawl writing the feed at `path` used, if there
+    is one: BLOB_STORE_DIR next to the feed file or shard directory.
+    """
+    name = getattr(project_settings, 'BLOB_STORE_DIR', None)
+    if not name:
+        return None
+    directory = name if os.path.isabs(name) else \
+        os.path.join(os.path.dirname(os.path.abspath(path.rstrip(os.sep))), name)
+    return directory if os.path.isdir(directory) else None
+
+
+def iter_items(path, blob_dir=None):
+    """
+    Yield the items of a feed: a .jsonl file, a single shard or a directory
+    of shards, with blob references resolved back into each item's
+    'content'. The blob store is blob_dir, or found next to the feed; an
+    item referencing a blob when there is none raises ValueError rather
+    than passing on its preview as the full text.
+    """
+    paths = shard_paths(path) if os.path.isdir(path) else [path]
+    blob_dir = blob_dir or default_blob_dir(path)
+    blobs = BlobStore(blob_dir) if blob_dir else None
+
+    for shard_path in paths:
+        with open_feed_file(shard_path, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                if item.get('content_blob'):
+                    if blobs is None:
+                        raise ValueError(f"Item {item.get('url')} in {shard_path} keeps its text in a blob "
+                                         f"store, but none was given or found next to the feed")
+                    item['content'] = blobs.get(item['content_blob'])
+                yield item
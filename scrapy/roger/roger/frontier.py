@@ -0,0 +1,156 @@
+"""
+Crawl frontier shared by several crawler processes through one SQLite file.
+
+Every request any worker schedules becomes a row keyed by its fingerprint,
+so the table is the frontier and the seen-set at once: a URL another worker
+already queued is simply not inserted again. Workers claim batches of the
+highest-priority pending rows in one write transaction, so no row is ever
+handed to two workers, and mark them done once their callbacks finished.
+Claims of a worker that died are released again after a lease timeout.
+
+SQLite in WAL mode lets readers run alongside the single writer, and every
+write here is a short transaction, so a handful of workers on one machine
+share the file without a server process.
+"""
+
+import os
+import sqlite3
+import time
+
+PENDING, CLAIMED, DONE, FAILED, SEEN = 0, 1, 2, 3, 4
+STATE_NAMES = {PENDING: 'pending', CLAIMED: 'claimed', DONE: 'done', FAILED: 'failed', SEEN: 'seen'}
+
+
+class SqliteFrontier:
+    """Frontier and seen-set in a SQLite file, safe to use from several processes"""
+
+    def __init__(self, path, lease=600, max_attempts=3):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        # Autocommit: each insert is visible to the other workers immediately;
+        # the timeout makes a worker wait for, rather than fail on, a busy writer
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS frontier ('
+            ' id INTEGER PRIMARY KEY,'
+            ' fingerprint BLOB UNIQUE NOT NULL,'
+            ' priority INTEGER NOT NULL,'
+            ' state INTEGER NOT NULL DEFAULT 0,'
+            ' worker TEXT,'
+            ' claimed_at REAL,'
+            ' attempts INTEGER NOT NULL DEFAULT 0,'
+            ' request BLOB NOT NULL)'
+        )
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS frontier_state ON frontier (state, priority DESC, id)'
+        )
+
+    def add(self, fingerprint, priority, request):
+        """Queue a pickled request, returning False if its fingerprint was queued before"""
+        cursor = self.connection.execute(
+            'INSERT OR IGNORE INTO frontier (fingerprint, priority, request) VALUES (?, ?, ?)',
+            (fingerprint, priority, request),
+        )
+        return cursor.rowcount == 1
+
+    def mark_seen(self, fingerprint):
+        """Record a fingerprint as seen without queueing a request for it"""
+        self.connection.execute(
+            'INSERT OR IGNORE INTO frontier (fingerprint, priority, state, request) VALUES (?, 0, ?, ?)',
+            (fingerprint, SEEN, b''),
+        )
+
+    def claim(self, worker, count):
+        """Claim up to `count` pending requests for `worker`; returns [(fingerprint, request)]"""
+        now = time.time()
+        # IMMEDIATE takes the write lock up front, so two workers can't
+        # select the same rows before either has marked them claimed
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            self._release_expired(now)
+            rows = self.connection.execute(
+                'SELECT id, fingerprint, request FROM frontier WHERE state = ? '
+                'ORDER BY priority DESC, id LIMIT ?',
+                (PENDING, count),
+            ).fetchall()
+            self.connection.executemany(
+                'UPDATE frontier SET state = ?, worker = ?, claimed_at = ? WHERE id = ?',
+                [(CLAIMED, worker, now, row_id) for row_id, _, _ in rows],
+            )
+            self.connection.execute('COMMIT')
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        return [(fingerprint, request) for _, fingerprint, request in rows]
+
+    def _release_expired(self, now):
+        # Claims older than the lease belong to a worker that died or hung;
+        # requeue them, unless they already failed max_attempts times
+        cutoff = now - self.lease
+        self.connection.execute(
+            'UPDATE frontier SET state = ?, worker = NULL WHERE state = ? AND claimed_at < ? AND attempts + 1 >= ?',
+            (FAILED, CLAIMED, cutoff, self.max_attempts),
+        )
+        self.connection.execute(
+            'UPDATE frontier SET state = ?, worker = NULL, attempts = attempts + 1 '
+            'WHERE state = ? AND claimed_at < ?',
+            (PENDING, CLAIMED, cutoff),
+        )
+
+    def complete(self, fingerprint):
+        """Mark a claimed request as done"""
+        self.connection.execute(
+            'UPDATE frontier SET state = ? WHERE fingerprint = ? AND state = ?',
+            (DONE, fingerprint, CLAIMED),
+        )
+
+    def complete_worker(self, worker):
+        """Mark everything still claimed by `worker` as done, returning how many rows that was"""
+        cursor = self.connection.execute(
+            'UPDATE frontier SET state = ? WHERE worker = ? AND state = ?',
+            (DONE, worker, CLAIMED),
+        )
+        return cursor.rowcount
+
+    def release(self, worker=None):
+        """Put the requests claimed by `worker` (or by anyone) back in the queue"""
+        if worker is None:
+            cursor = self.connection.execute(
+                'UPDATE frontier SET state = ?, worker = NULL WHERE state = ?', (PENDING, CLAIMED)
+            )
+        else:
+            cursor = self.connection.execute(
+                'UPDATE frontier SET state = ?, worker = NULL WHERE state = ? AND worker = ?',
+                (PENDING, CLAIMED, worker),
+            )
+        return cursor.rowcount
+
+    def counts(self):
+        """Return the number of requests in each state, by state name"""
+        counts = {name: 0 for name in STATE_NAMES.values()}
+        for state, count in self.connection.execute('SELECT state, COUNT(*) FROM frontier GROUP BY state'):
+            counts[STATE_NAMES[state]] = count
+        return counts
+
+    def has_pending(self):
+        row = self.connection.execute('SELECT 1 FROM frontier WHERE state = ? LIMIT 1', (PENDING,)).fetchone()
+        return row is not None
+
+    def is_active(self):
+        """Check whether any request is still pending or being worked on by some worker"""
+        row = self.connection.execute(
+            'SELECT 1 FROM frontier WHERE state IN (?, ?) LIMIT 1', (PENDING, CLAIMED)
+        ).fetchone()
+        return row is not None
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM frontier').fetchone()[0]
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,175 @@
+"""
+Offline bulk ingestion of a directory of PDFs (e.g. backend/docs/roger).
+
+Emits the same download items RogerSpider produces, as JSON lines:
+
+    python -m roger.ingest ../../backend/docs/roger --output docs.jsonl
+
+Text is extracted in parallel across cores into the PDF text cache the
+spider also uses (PDF_TEXT_CACHE_DIR), so each distinct PDF is parsed once.
+A manifest of file sizes and mtimes lets
+a re-run over an unchanged directory return without hashing or parsing.
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from roger.blobstore import BlobStore
+from roger.checkpoint import write_atomic
+from roger.documents import (
+    EXTRACTOR_VERSION, download_item, extract_pdf_pages, pdf_document,
+)
+from roger.feed import open_feed_file
+from roger.pdfcache import PdfTextCache, file_sha256
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'ingest_manifest.json'
+
+
+def scan_pdfs(directory):
+    """Return (path, size, mtime_ns) for every PDF under a directory, sorted by path"""
+    files = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if name.lower().endswith('.pdf'):
+                path = os.path.abspath(os.path.join(root, name))
+                stat = os.stat(path)
+                files.append((path, stat.st_size, stat.st_mtime_ns))
+    return sorted(files)
+
+
+def file_title(path):
+    """Title a PDF by its file name: IO-MC16-PL.pdf -> "IO MC16 PL" """
+    return re.sub(r'[\s_-]+', ' ', Path(path).stem).strip() or os.path.basename(path)
+
+
+def _extract(path):
+    """Worker: extract one PDF's page texts, returning (path, pages, error)"""
+    try:
+        return path, extract_pdf_pages(path), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def load_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def ingest(directory, output, cache_dir, text_cache_dir, blob_dir=None, workers=None, force=False,
+           blob_min_chars=2000, blob_preview_chars=500):
+    """Ingest all PDFs under directory into output; returns a stats dict"""
+    files = scan_pdfs(directory)
+    output = os.path.abspath(output)
+    manifest = load_manifest(cache_dir)
+    previous = manifest.get('files', {})
+
+    # Nothing to do if the same files, unchanged, were already written to this output
+    signature = {path: [size, mtime_ns] for path, size, mtime_ns in files}
+    unchanged = (
+        not force
+        and manifest.get('output') == output
+        and manifest.get('extractor') == EXTRACTOR_VERSION
+        and os.path.exists(output)
+        and {path: [entry['size'], entry['mtime_ns']] for path, entry in previous.items()} == signature
+    )
+    if unchanged:
+        return {'files': len(files), 'extracted': 0, 'unchanged': True}
+
+    # Only hash files whose size or mtime changed since the last run
+    hashes = {}
+    for path, size, mtime_ns in files:
+        entry = previous.get(path)
+        if entry and entry['size'] == size and entry['mtime_ns'] == mtime_ns:
+            hashes[path] = entry['sha256']
+        else:
+            hashes[path] = file_sha256(path)
+
+    cache = PdfTextCache(text_cache_dir)
+    pages = {path: cache.get(digest) for path, digest in hashes.items()}
+    missing = [path for path, cached in pages.items() if cached is None]
+
+    # Parse the PDFs that aren't cached yet in parallel across cores
+    extracted = 0
+    errors = 0
+    if missing:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, document_pages, error in pool.map(_extract, missing):
+                if error is not None:
+                    logger.error(f"PDF extraction error for {path}: {error}")
+                    errors += 1
+                    continue
+                cache.put(hashes[path], document_pages)
+                pages[path] = document_pages
+                extracted += 1
+
+    blobs = BlobStore(blob_dir) if blob_dir else None
+    output_dir = os.path.dirname(output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    tmp_output = f"{output}.tmp{Path(output).suffix}"
+    with open_feed_file(tmp_output, 'wb') as f:
+        for path, _, _ in files:
+            url = Path(path).as_uri()
+            # Model-number file names give generate_title_from_url little to work with
+            title = file_title(path)
+            if pages[path] is None:
+                content, spans = "PDF document - extraction failed", []
+            else:
+                content, spans = pdf_document(pages[path])
+            item = download_item(url, title, content, 'application/pdf', pages=spans)
+            if blobs is not None:
+                blobs.offload(item, blob_min_chars, blob_preview_chars)
+            f.write((json.dumps(item, ensure_ascii=False) + '\n').encode('utf-8'))
+    os.replace(tmp_output, output)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = {
+        'output': output,
+        'extractor': EXTRACTOR_VERSION,
+        'files': {
+            path: {'size': size, 'mtime_ns': mtime_ns, 'sha256': hashes[path]}
+            for path, size, mtime_ns in files
+        },
+    }
+    write_atomic(os.path.join(cache_dir, MANIFEST_FILE), json.dumps(manifest))
+    return {'files': len(files), 'extracted': extracted, 'errors': errors, 'unchanged': False}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingest a directory of PDFs into crawl items')
+    parser.add_argument('directory', help='Directory of PDF files (searched recursively)')
+    parser.add_argument('--output', default='docs.jsonl', help='Output JSON-lines file (.jsonl, .jsonl.gz or .jsonl.zst)')
+    parser.add_argument('--cache-dir', default='crawl_state/pdf_ingest', help='Directory for the ingest manifest')
+    parser.add_argument('--text-cache-dir', default='crawl_state/pdf_text',
+                        help='PDF text cache (as PDF_TEXT_CACHE_DIR in the crawl)')
+    parser.add_argument('--blob-dir', help='Blob store for large text (as BLOB_STORE_DIR in the crawl)')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: one per core)')
+    parser.add_argument('--force', action='store_true', help='Rewrite the output even if nothing changed')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+    start = time.time()
+    stats = ingest(args.directory, args.output, args.cache_dir, args.text_cache_dir,
+                   args.blob_dir, args.workers, args.force)
+    elapsed = time.time() - start
+
+    if stats['unchanged']:
+        print(f"{stats['files']} PDFs unchanged, nothing to do ({elapsed * 1000:.0f} ms)")
+    else:
+        print(f"Ingested {stats['files']} PDFs into {args.output}: extracted {stats['extracted']}, "
+              f"{stats['errors']} errors ({elapsed:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
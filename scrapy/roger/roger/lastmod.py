@@ -0,0 +1,82 @@
+"""
+Per-URL <lastmod> record from previous sitemap crawls.
+
+Sitemap mode uses it to skip URLs whose sitemap <lastmod> has not moved
+since they were last crawled.
+"""
+
+import json
+import logging
+import os
+from datetime import timezone
+
+from dateutil.parser import isoparse
+
+from roger.urlcanon import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+
+def parse_lastmod(value):
+    """Parse a W3C datetime (as used by sitemaps) into an aware UTC datetime"""
+    if not value:
+        return None
+    try:
+        parsed = isoparse(value.strip())
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+class LastmodStore:
+    """JSON-backed map of canonical URL -> lastmod seen when it was last crawled"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lastmods = {}
+
+    def load(self):
+        """Load the record of the previous crawl, if any"""
+        if not os.path.isfile(self.path):
+            return self
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.lastmods = json.load(f)
+            logger.info(f"Loaded lastmod state for {len(self.lastmods)} URLs from {self.path}")
+        except (json.JSONDecodeError, OSError) as e:
+            logger.error(f"Could not load lastmod state from {self.path}: {e}")
+        return self
+
+    def save(self):
+        """
+        Atomically write the record to disk, keeping the URLs other crawl
+        workers sharing the file have recorded since it was loaded
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.lastmods = {**json.load(f), **self.lastmods}
+            except (json.JSONDecodeError, OSError) as e:
+                logger.error(f"Could not merge lastmod state from {self.path}: {e}")
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.lastmods, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def is_unchanged(self, url, lastmod):
+        """Check whether a URL's lastmod is no newer than when it was last crawled"""
+        current = parse_lastmod(lastmod)
+        previous = parse_lastmod(self.lastmods.get(canonicalize_url(url)))
+        if current is None or previous is None:
+            return False
+        return current <= previous
+
+    def record(self, url, lastmod):
+        """Remember the lastmod a URL had when it was crawled"""
+        if lastmod:
+            self.lastmods[canonicalize_url(url)] = lastmod
@@ -0,0 +1,74 @@
+"""
+Histograms and text exposition for crawl instrumentation (see
+roger.extensions.CrawlMetrics).
+
+Metrics are written either as JSON or in the Prometheus text format, so the
+file can be picked up by node_exporter's textfile collector.
+"""
+
+import bisect
+import json
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+EXTRACTION_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 30, 120)
+
+
+class Histogram:
+    """Fixed-bucket histogram; counts[i] is the number of values <= buckets[i]"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """Return (upper bound, number of values <= it) pairs, ending with +Inf"""
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else None,
+            'buckets': {('+Inf' if bound == float('inf') else str(bound)): count
+                        for bound, count in self.cumulative()},
+        }
+
+
+def to_json(counters, gauges, histograms):
+    return json.dumps({
+        'counters': counters,
+        'gauges': gauges,
+        'histograms': {name: histogram.as_dict() for name, histogram in histograms.items()},
+    }, indent=2)
+
+
+def to_prometheus(counters, gauges, histograms, prefix='roger_'):
+    """Render metrics in the Prometheus text exposition format"""
+    lines = []
+    for name, value in counters.items():
+        lines.append(f"# TYPE {prefix}{name} counter")
+        lines.append(f"{prefix}{name} {value}")
+    for name, value in gauges.items():
+        lines.append(f"# TYPE {prefix}{name} gauge")
+        lines.append(f"{prefix}{name} {value}")
+    for name, histogram in histograms.items():
+        lines.append(f"# TYPE {prefix}{name} histogram")
+        for bound, count in histogram.cumulative():
+            le = '+Inf' if bound == float('inf') else repr(float(bound))
+            lines.append(f'{prefix}{name}_bucket{{le="{le}"}} {count}')
+        lines.append(f"{prefix}{name}_sum {histogram.sum}")
+        lines.append(f"{prefix}{name}_count {histogram.count}")
+    return '\n'.join(lines) + '\n'
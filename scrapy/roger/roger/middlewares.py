@@ -0,0 +1,248 @@
+# Define here the models for your spider and downloader middlewares
+#
+# See documentation in:
+# https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
+
+import os
+import tempfile
+from urllib.parse import urlparse
+
+import scrapy
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.spidermiddlewares.httperror import HttpError
+
+from roger import signals as roger_signals
+from roger.priority import score_url
+from roger.throttle import BACKOFF_STATUSES, ThrottleController
+
+# URL endings that (on roger.pl) point at binary downloads rather than pages
+BINARY_EXTENSIONS = ('.pdf', '.zip', '.doc', '.docx', '.xls', '.xlsx')
+
+
+def is_binary_url(url):
+    """Guess from the URL alone whether it points at a binary download"""
+    path = urlparse(url).path.lower().rstrip('/')
+    # roger.pl serves its document library as .../<id>-<name>/file
+    return path.endswith(BINARY_EXTENSIONS) or path.endswith('/file')
+
+
+def binary_request_meta(settings):
+    """Request meta routing a download through the binary slot with its size caps"""
+    return {
+        'download_slot': settings.get('BINARY_DOWNLOAD_SLOT', 'binary'),
+        'download_maxsize': settings.getint('BINARY_MAXSIZE', 100 * 1024 * 1024),
+        'download_warnsize': settings.getint('BINARY_WARNSIZE', 30 * 1024 * 1024),
+    }
+
+
+class BinaryDownloadMiddleware:
+    """
+    Bandwidth limiting and spooling for the binary download slot.
+
+    After each binary response the slot delay is set so the slot averages at
+    most BINARY_BANDWIDTH bytes/second. Bodies larger than
+    BINARY_SPOOL_THRESHOLD are written to a temp file and dropped from the
+    response; the spider reads them from meta['body_path'].
+    """
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.slot_name = settings.get('BINARY_DOWNLOAD_SLOT', 'binary')
+        self.bandwidth = settings.getint('BINARY_BANDWIDTH', 0)
+        self.spool_threshold = settings.getint('BINARY_SPOOL_THRESHOLD', 1024 * 1024)
+        self.base_delay = settings.getdict('DOWNLOAD_SLOTS').get(self.slot_name, {}).get('delay', 0)
+        self.temp_dir = settings.get('BINARY_TEMP_DIR') or None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def process_response(self, request, response, spider):
+        if request.meta.get('download_slot') != self.slot_name:
+            return response
+
+        size = len(response.body)
+        self.crawler.stats.inc_value('binary/response_bytes', size)
+        self._throttle(size)
+
+        # Pages that turn out to be HTML are parsed from memory as usual
+        content_type = response.headers.get('Content-Type', b'').decode('latin-1').lower()
+        if size <= self.spool_threshold or content_type.startswith('text/'):
+            return response
+
+        # Move the body to disk so it isn't held in memory through parsing
+        fd, body_path = tempfile.mkstemp(prefix='roger-', suffix='.bin', dir=self.temp_dir)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(response.body)
+        self.crawler.stats.inc_value('binary/spooled_to_disk')
+
+        spooled = response.replace(body=b'')
+        spooled.meta['body_path'] = body_path
+        spooled.meta['body_size'] = size
+        return spooled
+
+    def _throttle(self, size):
+        """Space out binary downloads so the slot stays within its bandwidth"""
+        if not self.bandwidth:
+            return
+        slot = self.crawler.engine.downloader.slots.get(self.slot_name)
+        if slot is not None:
+            slot.delay = max(self.base_delay, size / self.bandwidth)
+
+
+class AdaptiveThrottleMiddleware:
+    """
+    Adjusts each host's download slot concurrency and delay from observed
+    latency and error rates (see roger.throttle), within an optional
+    requests-per-second ceiling. The binary slot is left to
+    BinaryDownloadMiddleware's bandwidth limit.
+    """
+
+    BACKOFF_STATUSES = BACKOFF_STATUSES
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool('ADAPTIVE_THROTTLE_ENABLED'):
+            raise NotConfigured
+        self.crawler = crawler
+        self.debug = settings.getbool('ADAPTIVE_THROTTLE_DEBUG')
+        self.skip_slots = {settings.get('BINARY_DOWNLOAD_SLOT', 'binary')}
+        self.controller = ThrottleController(
+            max_concurrency=settings.getint('ADAPTIVE_THROTTLE_MAX_CONCURRENCY', 16),
+            max_rps=settings.getfloat('ADAPTIVE_THROTTLE_MAX_RPS', 0),
+            max_delay=settings.getfloat('ADAPTIVE_THROTTLE_MAX_DELAY', 30.0),
+            target_latency=settings.getfloat('ADAPTIVE_THROTTLE_TARGET_LATENCY', 2.0),
+            max_error_rate=settings.getfloat('ADAPTIVE_THROTTLE_MAX_ERROR_RATE', 0.05),
+        )
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def process_response(self, request, response, spider):
+        error = response.status in self.BACKOFF_STATUSES
+        self._observe(request, spider, request.meta.get('download_latency'), error)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        self._observe(request, spider, None, True)
+
+    def _observe(self, request, spider, latency, error):
+        key = request.meta.get('download_slot')
+        if key is None or key in self.skip_slots:
+            return
+        slot = self.crawler.engine.downloader.slots.get(key)
+        if slot is None:
+            return
+
+        state = self.controller.state(key, slot.concurrency, slot.delay)
+        self.controller.observe(state, latency, error)
+        slot.concurrency = state.concurrency
+        slot.delay = state.delay
+
+        if self.debug:
+            latency_text = f"{state.latency:.3f}s" if state.latency is not None else "n/a"
+            spider.logger.info(f"Throttle [{key}] concurrency={slot.concurrency} delay={slot.delay:.3f}s "
+                               f"latency={latency_text} error_rate={state.error_rate:.2f}")
+
+
+class PriorityMiddleware:
+    """
+    Spider middleware that scores every outgoing request (see roger.priority)
+    so product, firmware and manual pages are fetched first and a time-boxed
+    crawl still covers the pages that matter most.
+    """
+
+    def __init__(self, recent_days):
+        self.recent_days = recent_days
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('PRIORITY_ENABLED', True):
+            raise NotConfigured
+        return cls(crawler.settings.getint('PRIORITY_RECENT_DAYS', 30))
+
+    def process_spider_output(self, response, result, spider):
+        for entry in result:
+            if isinstance(entry, scrapy.Request):
+                entry.priority += score_url(
+                    entry.url,
+                    depth=entry.meta.get('depth', 0),
+                    lastmod=entry.meta.get('lastmod'),
+                    recent_days=self.recent_days,
+                )
+            yield entry
+
+
+class CheckpointMiddleware:
+    """
+    Spider middleware that tells CrawlCheckpoint (or SharedFrontierScheduler)
+    when all output of a response's callback has been consumed, i.e. the
+    request is complete and can leave the checkpointed (or shared) frontier.
+    Responses that never reach their callback (HTTP errors such as 404s,
+    dropped by HttpErrorMiddleware) and callbacks that fail are complete too,
+    or they would be fetched again on every resume.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not (settings.getbool('CHECKPOINT_ENABLED') or settings.get('SHARED_FRONTIER_PATH')):
+            raise NotConfigured
+        middleware = cls(crawler)
+        crawler.signals.connect(middleware.spider_error, signal=signals.spider_error)
+        return middleware
+
+    def process_spider_output(self, response, result, spider):
+        yield from result
+        self.response_processed(response, spider)
+
+    def process_spider_exception(self, response, exception, spider):
+        if isinstance(exception, HttpError):
+            self.response_processed(response, spider)
+        # Let HttpErrorMiddleware and the others handle the exception as usual
+        return None
+
+    def spider_error(self, failure, response, spider):
+        self.response_processed(response, spider)
+
+    def response_processed(self, response, spider):
+        self.crawler.signals.send_catch_log(signal=roger_signals.response_processed,
+                                            response=response, spider=spider)
+
+
+class NearDuplicateLinkMiddleware:
+    """
+    Spider middleware that drops the links found on pages NearDuplicatePipeline
+    flagged as near-duplicates. The page item is yielded before its links and
+    pipelines run as each item is yielded, so the flag is set by the time the
+    links come through.
+    """
+
+    def __init__(self):
+        self.near_duplicates = set()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not (settings.getbool('NEAR_DUPLICATE_ENABLED') and settings.getbool('NEAR_DUPLICATE_SKIP_LINKS')):
+            raise NotConfigured
+        middleware = cls()
+        crawler.signals.connect(middleware.near_duplicate, signal=roger_signals.near_duplicate)
+        return middleware
+
+    def near_duplicate(self, url):
+        self.near_duplicates.add(url)
+
+    def process_spider_output(self, response, result, spider):
+        for entry in result:
+            if isinstance(entry, scrapy.Request) and response.url in self.near_duplicates:
+                spider.crawler.stats.inc_value('near_duplicate/links_skipped', spider=spider)
+                continue
+            yield entry
+        self.near_duplicates.discard(response.url)
@@ -0,0 +1,254 @@
+"""
+A local, synthetic stand-in for roger.pl to benchmark RogerSpider against.
+
+    python -m roger.mocksite --pages 2000 --fanout 8 --latency 0.05
+
+The site has the shape of a real crawl (output1.json): Polish and English
+product, support and blog sections nested a few levels deep, every page
+wrapped in the same header, footer and "Przydatne linki" template, and a
+document library served both as .pdf links and as roger.pl-style
+.../<id>-<name>/file links. Pages and PDFs are generated on request from
+the seed, so the same arguments always serve the same site.
+"""
+
+import argparse
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+from xml.sax.saxutils import escape
+
+# (path prefix, share of pages), roughly as in output1.json
+SECTIONS = (
+    ('produkty', 0.10),
+    ('wsparcie/zasoby-do-pobrania', 0.20),
+    ('blog', 0.12),
+    ('rozwiazania', 0.03),
+    ('en/products', 0.15),
+    ('en/support/downloads', 0.25),
+    ('en/blog', 0.15),
+)
+MAX_DEPTH = 4  # path segments below the section prefix
+
+WORDS = (
+    'kontrola', 'dostępu', 'czytnik', 'kontroler', 'system', 'zamek', 'karta',
+    'moduł', 'zasilanie', 'instalacja', 'konfiguracja', 'oprogramowanie',
+    'access', 'control', 'reader', 'controller', 'firmware', 'manual',
+    'installation', 'network', 'door', 'terminal', 'RACS', 'VISO', 'MIFARE',
+)
+PDF_WORDS = (
+    'access', 'control', 'reader', 'controller', 'firmware', 'manual',
+    'installation', 'network', 'door', 'terminal', 'RACS', 'VISO', 'MIFARE',
+)
+
+HEADER = 'Przykłady instalacji produktów Roger'
+FOOTER = ('Newsletter', 'Bądź na bieżąco', 'Na skróty', 'Wsparcie', 'Kontakt', 'Komunikaty')
+USEFUL_LINKS = ('Przydatne linki', 'Gdzie kupić', 'Dokumentacja', 'Szkolenia')
+
+
+class MockSite:
+    """Structure of the synthetic site; page bodies are generated on request"""
+
+    def __init__(self, pages=500, fanout=8, documents=None, pdf_size=200_000,
+                 latency=0.0, jitter=0.0, seed=0):
+        self.fanout = fanout
+        self.pdf_size = pdf_size
+        self.latency = latency
+        self.jitter = jitter
+        self.seed = seed
+        self.base_url = ''  # set once the server is bound
+        rng = random.Random(seed)
+
+        # Section roots first, then pages nested under random earlier pages
+        self.paths = ['/'] + [f"/{prefix}" for prefix, _ in SECTIONS]
+        self.children = {path: [] for path in self.paths}
+        self.children['/'] = self.paths[1:]
+        sections = [prefix for prefix, _ in SECTIONS]
+        weights = [share for _, share in SECTIONS]
+        by_section = {prefix: [f"/{prefix}"] for prefix in sections}
+        for i in range(max(0, pages - len(self.paths))):
+            prefix = rng.choices(sections, weights)[0]
+            candidates = [path for path in by_section[prefix]
+                          if path.count('/') - prefix.count('/') <= MAX_DEPTH]
+            parent = rng.choice(candidates)
+            path = f"{parent}/{rng.choice(WORDS).lower()}-{i}"
+            self.paths.append(path)
+            self.children[parent].append(path)
+            self.children[path] = []
+            by_section[prefix].append(path)
+        self.index = {path: i for i, path in enumerate(self.paths)}
+
+        # Documents hang off download-section pages, or any page if there are none
+        if documents is None:
+            documents = pages // 2
+        hosts = [path for path in self.paths if 'download' in path or 'pobrania' in path] or self.paths
+        self.documents = {}
+        self.page_documents = {path: [] for path in self.paths}
+        for i in range(documents):
+            parent = rng.choice(hosts)
+            name = f"{rng.choice(PDF_WORDS).lower()}-{i}"
+            # Half as .pdf files, half as roger.pl-style .../<id>-<name>/file
+            path = f"{parent}/{name}.pdf" if i % 2 else f"{parent}/{i}-{name}/file"
+            self.documents[path] = i
+            self.page_documents[parent].append(path)
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+
+    def page_html(self, path):
+        index = self.index[path]
+        rng = random.Random(f"{self.seed}:{path}")
+
+        # Tree links plus random cross-links, as on real listing pages
+        links = list(self.children[path])
+        parent = path.rsplit('/', 1)[0] or '/'
+        if path != '/' and parent in self.index:
+            links.append(parent)
+        links.extend(rng.choice(self.paths) for _ in range(self.fanout))
+        link_html = ''.join(f'<li><a href="{link}">{escape(link.rsplit("/", 1)[-1] or "Start")}</a></li>'
+                            for link in links)
+        document_html = ''.join(f'<li><a href="{document}">Pobierz {escape(document.split("/")[-2])}</a></li>'
+                                for document in self.page_documents[path])
+
+        title = ' '.join(rng.choice(WORDS) for _ in range(3)).capitalize()
+        paragraphs = ''.join(
+            f"<p>{' '.join(rng.choice(WORDS) for _ in range(rng.randint(15, 60)))}.</p>"
+            for _ in range(rng.randint(1, 4))
+        )
+        nav = ''.join(f'<li><a href="/{prefix}">{prefix}</a></li>' for prefix, _ in SECTIONS)
+        footer = ''.join(f'<p>{text}</p>' for text in FOOTER)
+        useful = ''.join(f'<p>{text}</p>' for text in USEFUL_LINKS)
+
+        return (
+            f'<!DOCTYPE html><html lang="pl"><head><meta charset="utf-8">'
+            f'<title>{title} | Roger</title></head><body>'
+            f'<div id="header"><p>{HEADER}</p><ul class="nav">{nav}</ul></div>'
+            f'<div class="content"><h1>{title} {index}</h1>{paragraphs}'
+            f'<ul class="links">{link_html}</ul><ul class="downloads">{document_html}</ul></div>'
+            f'<div class="useful-links">{useful}</div>'
+            f'<div id="footer">{footer}</div>'
+            f'</body></html>'
+        ).encode('utf-8')
+
+    def document_pdf(self, path):
+        rng = random.Random(f"{self.seed}:{path}")
+        lines = [' '.join(rng.choice(PDF_WORDS) for _ in range(10)) for _ in range(30)]
+        return make_pdf([f"Document {self.documents[path]}"] + lines, self.pdf_size)
+
+    def sitemap_xml(self):
+        urls = ''.join(f"<url><loc>{self.base_url}{escape(path)}</loc></url>" for path in self.paths)
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+        ).encode('utf-8')
+
+
+def make_pdf(lines, size=0):
+    """Build a one-page PDF showing `lines`, padded with an unused stream to about `size` bytes"""
+    def stream(data):
+        return b'<< /Length %d >>\nstream\n' % len(data) + data + b'\nendstream'
+
+    def pdf_string(text):
+        return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+    text = ' '.join(f"({pdf_string(line)}) Tj T*" for line in lines)
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R '
+        b'/Resources << /Font << /F1 5 0 R >> >> >>',
+        stream(f"BT /F1 10 Tf 40 760 Td 12 TL {text} ET".encode('latin-1')),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    base = 600 + sum(len(obj) for obj in objects)
+    objects.append(stream(b'0' * max(0, size - base)))
+
+    out = b'%PDF-1.4\n'
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % number + obj + b'\nendobj\n'
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return out
+
+
+class MockSiteHandler(BaseHTTPRequestHandler):
+    site = None
+
+    def do_GET(self):
+        site = self.site
+        site.delay()
+        path = unquote(self.path.split('?', 1)[0].split('#', 1)[0])
+        if len(path) > 1:
+            path = path.rstrip('/')
+
+        if path == '/robots.txt':
+            body = f"User-agent: *\nAllow: /\nSitemap: {site.base_url}/sitemap.xml\n".encode('utf-8')
+            self.respond(200, 'text/plain', body)
+        elif path == '/sitemap.xml':
+            self.respond(200, 'application/xml', site.sitemap_xml())
+        elif path in site.index:
+            self.respond(200, 'text/html; charset=utf-8', site.page_html(path))
+        elif path in site.documents:
+            self.respond(200, 'application/pdf', site.document_pdf(path))
+        else:
+            self.respond(404, 'text/plain', b'Not found')
+
+    def respond(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(site, host='127.0.0.1', port=8765):
+    """Create (but don't start) an HTTP server for a MockSite"""
+    handler = type('Handler', (MockSiteHandler,), {'site': site})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    site.base_url = f"http://localhost:{server.server_address[1]}"
+    return server
+
+
+def add_site_arguments(parser):
+    parser.add_argument('--pages', type=int, default=500, help='Number of HTML pages')
+    parser.add_argument('--fanout', type=int, default=8, help='Random cross-links per page')
+    parser.add_argument('--documents', type=int, help='Number of PDF documents (default: pages / 2)')
+    parser.add_argument('--pdf-size', type=int, default=200_000, help='Approximate PDF size in bytes')
+    parser.add_argument('--latency', type=float, default=0.0, help='Mean injected response latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Standard deviation of the injected latency')
+    parser.add_argument('--seed', type=int, default=0, help='Seed the site is generated from')
+
+
+def site_from_arguments(args):
+    return MockSite(pages=args.pages, fanout=args.fanout, documents=args.documents,
+                    pdf_size=args.pdf_size, latency=args.latency, jitter=args.jitter, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a synthetic roger.pl-like site for crawl benchmarks')
+    add_site_arguments(parser)
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on (0 = any free port)')
+    args = parser.parse_args()
+
+    site = site_from_arguments(args)
+    server = make_server(site, port=args.port)
+    print(f"Serving {len(site.paths)} pages and {len(site.documents)} documents at {site.base_url}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Cache of extracted PDF text, shared by RogerSpider and roger.ingest.
+
+Entries are keyed by the SHA-256 of the PDF bytes plus the extractor version
+and hold the raw text of each page, so each distinct document is parsed once
+for the life of the cache and text cleanup can change without re-parsing.
+Entries from other extractor versions live in their own directory and are
+never read; delete it to reclaim the space.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+
+from roger.documents import EXTRACTOR_VERSION, extract_pdf_pages
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Hash a file without reading it into memory at once"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def pdf_sha256(pdf_data):
+    """Hash PDF bytes or the PDF file at a path"""
+    if isinstance(pdf_data, str):
+        return file_sha256(pdf_data)
+    return hashlib.sha256(pdf_data).hexdigest()
+
+
+class PdfTextCache:
+    def __init__(self, directory, version=EXTRACTOR_VERSION):
+        self.directory = directory
+        self.version = version
+
+    def path(self, digest):
+        return os.path.join(self.directory, self.version, digest[:2], f"{digest}.json.gz")
+
+    def get(self, digest):
+        """Return the cached page texts for a PDF hash, or None"""
+        try:
+            with gzip.open(self.path(digest), 'rb') as f:
+                return json.loads(f.read())['pages']
+        except FileNotFoundError:
+            return None
+
+    def put(self, digest, pages):
+        path = self.path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, 'wb') as f:
+            f.write(json.dumps({'extractor': self.version, 'pages': pages}).encode('utf-8'))
+        os.replace(tmp_path, path)
+
+    def pages(self, pdf_data, digest=None):
+        """Return the page texts of a PDF (bytes or path), extracting them on a miss"""
+        digest = digest or pdf_sha256(pdf_data)
+        pages = self.get(digest)
+        if pages is None:
+            pages = extract_pdf_pages(pdf_data)
+            self.put(digest, pages)
+        return pages
@@ -0,0 +1,252 @@
+# Define your item pipelines here
+#
+# See: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
+
+import json
+import os
+
+from itemadapter import ItemAdapter
+from scrapy.exceptions import DropItem, NotConfigured
+
+from roger import signals as roger_signals
+from roger.blobstore import BlobStore
+from roger.checkpoint import load_manifest
+from roger.feed import open_feed_file, shard_name, shard_paths
+from roger.simhash import SimHashIndex, simhash
+
+
+def load_feed_resume_state(settings):
+    """Return the feed state recorded in the checkpoint being resumed, if any"""
+    if not settings.getbool('CHECKPOINT_RESUME'):
+        return None
+    _, manifest = load_manifest(settings.get('CHECKPOINT_DIR', 'crawl_state/checkpoints'))
+    return manifest.get('feed') if manifest else None
+
+
+class NearDuplicatePipeline:
+    """
+    Detects pages whose text is a near-duplicate of a page already crawled
+    (language variants, print views, paginated listings) using SimHash.
+    NEAR_DUPLICATE_ACTION 'drop' drops them, 'mark' keeps them with
+    'near_duplicate_of' set to the URL of the original. Either way the
+    near_duplicate signal lets NearDuplicateLinkMiddleware skip their links.
+    """
+
+    def __init__(self, crawler, index, action, min_chars):
+        self.crawler = crawler
+        self.index = index
+        self.action = action
+        self.min_chars = min_chars
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('NEAR_DUPLICATE_ENABLED'):
+            raise NotConfigured
+
+        pipeline = cls(
+            crawler,
+            SimHashIndex(settings.getint('NEAR_DUPLICATE_DISTANCE', 3)),
+            action=settings.get('NEAR_DUPLICATE_ACTION', 'mark'),
+            min_chars=settings.getint('NEAR_DUPLICATE_MIN_CHARS', 200),
+        )
+        crawler.signals.connect(pipeline.checkpoint, signal=roger_signals.checkpoint)
+
+        # Continue with the fingerprints of the checkpoint the crawl resumes from
+        if settings.getbool('CHECKPOINT_RESUME'):
+            snapshot, manifest = load_manifest(settings.get('CHECKPOINT_DIR', 'crawl_state/checkpoints'))
+            if manifest and 'simhash' in manifest:
+                pipeline.index.restore(snapshot, manifest['simhash'])
+        return pipeline
+
+    def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+        content = adapter.get('content') or ''
+        if len(content) < self.min_chars:
+            return item
+
+        fingerprint = simhash(content)
+        original = self.index.find(fingerprint)
+        if original is None:
+            self.index.add(fingerprint, adapter['url'])
+            return item
+
+        self.crawler.stats.inc_value('near_duplicate/count', spider=spider)
+        self.crawler.signals.send_catch_log(signal=roger_signals.near_duplicate, url=adapter['url'])
+        if self.action == 'drop':
+            raise DropItem(f"Near-duplicate of {original}: {adapter['url']}")
+        adapter['near_duplicate_of'] = original
+        return item
+
+    def checkpoint(self, directory):
+        return {'simhash': self.index.checkpoint(directory)}
+
+
+class BlobStorePipeline:
+    """
+    Moves large document text (full PDF text) into the content-addressed
+    blob store. The item keeps a short preview in 'content' plus the blob's hash
+    in 'content_blob' and the full length in 'content_length'.
+    """
+
+    def __init__(self, store, min_chars, preview_chars):
+        self.store = store
+        self.min_chars = min_chars
+        self.preview_chars = preview_chars
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        directory = settings.get('BLOB_STORE_DIR')
+        if not directory:
+            raise NotConfigured
+        return cls(
+            BlobStore(directory),
+            min_chars=settings.getint('BLOB_MIN_CHARS', 2000),
+            preview_chars=settings.getint('BLOB_PREVIEW_CHARS', 500),
+        )
+
+    def process_item(self, item, spider):
+        self.store.offload(ItemAdapter(item), self.min_chars, self.preview_chars)
+        return item
+
+
+class JsonLinesFeedPipeline:
+    """
+    Writes items to ITEM_FEED_PATH as JSON lines, one complete item per line,
+    so a feed cut off by a crash is still readable. The byte offset reached
+    at each checkpoint is recorded; on resume the feed is truncated back to
+    it, because items written after the checkpoint are scraped again.
+    """
+
+    def __init__(self, path, resume_state=None):
+        self.path = path
+        self.resume_state = resume_state
+        self.file = None
+        self.items = 0
+        self.final_state = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        path = settings.get('ITEM_FEED_PATH')
+        if not path or settings.get('ITEM_FEED_MODE', 'jsonl') != 'jsonl':
+            raise NotConfigured
+
+        pipeline = cls(path, load_feed_resume_state(settings))
+        crawler.signals.connect(pipeline.checkpoint, signal=roger_signals.checkpoint)
+        return pipeline
+
+    def open_spider(self, spider):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if self.resume_state and os.path.isfile(self.path):
+            self.file = open(self.path, 'r+b')
+            self.file.truncate(self.resume_state['offset'])
+            self.file.seek(0, os.SEEK_END)
+            self.items = self.resume_state['items']
+            spider.logger.info(f"Resuming feed {self.path} after {self.items} items")
+        else:
+            self.file = open(self.path, 'wb')
+
+    def close_spider(self, spider):
+        # Remember the final position for the checkpoint written at spider_closed
+        self.file.flush()
+        self.final_state = {'path': self.path, 'offset': self.file.tell(), 'items': self.items}
+        self.file.close()
+
+    def process_item(self, item, spider):
+        line = json.dumps(ItemAdapter(item).asdict(), ensure_ascii=False) + '\n'
+        self.file.write(line.encode('utf-8'))
+        self.items += 1
+        return item
+
+    def checkpoint(self, directory):
+        """Flush to disk and report how far the feed has been written"""
+        if self.final_state is not None:
+            return {'feed': self.final_state}
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {'feed': {'path': self.path, 'offset': self.file.tell(), 'items': self.items}}
+
+
+class ShardedFeedPipeline:
+    """
+    Writes items as gzip- or zstd-compressed JSON-lines shards in
+    ITEM_FEED_DIR, starting a new shard once ITEM_FEED_SHARD_SIZE bytes of
+    JSON have been written. Every checkpoint also closes the current shard,
+    so a resume simply drops shards written after it. Shards are named
+    <ITEM_FEED_SHARD_PREFIX>-00001..., so crawl workers sharing a directory
+    each write (and on resume drop) only their own.
+    """
+
+    def __init__(self, directory, compression, shard_size, resume_state=None, prefix='items'):
+        self.directory = directory
+        self.prefix = prefix
+        self.compression = compression
+        self.shard_size = shard_size
+        self.resume_state = resume_state
+        self.file = None
+        self.shards = 0  # completed shards
+        self.shard_bytes = 0
+        self.items = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if settings.get('ITEM_FEED_MODE', 'jsonl') != 'shards':
+            raise NotConfigured
+
+        pipeline = cls(
+            settings.get('ITEM_FEED_DIR', 'feed'),
+            compression=settings.get('ITEM_FEED_COMPRESSION') or None,
+            shard_size=settings.getint('ITEM_FEED_SHARD_SIZE', 64 * 1024 * 1024),
+            resume_state=load_feed_resume_state(settings),
+            prefix=settings.get('ITEM_FEED_SHARD_PREFIX') or 'items',
+        )
+        crawler.signals.connect(pipeline.checkpoint, signal=roger_signals.checkpoint)
+        return pipeline
+
+    def open_spider(self, spider):
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Keep the shards completed at the resumed checkpoint, drop the rest
+        keep = 0
+        if self.resume_state:
+            keep = self.resume_state['shards']
+            self.shards = keep
+            self.items = self.resume_state['items']
+            spider.logger.info(f"Resuming sharded feed in {self.directory} after {self.items} items")
+        for path in shard_paths(self.directory, self.prefix)[keep:]:
+            os.remove(path)
+
+    def close_spider(self, spider):
+        self._close_shard()
+
+    def process_item(self, item, spider):
+        if self.file is None:
+            path = os.path.join(self.directory, shard_name(self.shards + 1, self.compression, self.prefix))
+            self.file = open_feed_file(path, 'wb')
+            self.shard_bytes = 0
+
+        line = (json.dumps(ItemAdapter(item).asdict(), ensure_ascii=False) + '\n').encode('utf-8')
+        self.file.write(line)
+        self.shard_bytes += len(line)
+        self.items += 1
+
+        if self.shard_bytes >= self.shard_size:
+            self._close_shard()
+        return item
+
+    def _close_shard(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self.shards += 1
+
+    def checkpoint(self, directory):
+        """Close the current shard and report how many shards are complete"""
+        self._close_shard()
+        return {'feed': {'directory': self.directory, 'shards': self.shards, 'items': self.items}}
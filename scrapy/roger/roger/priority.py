@@ -0,0 +1,70 @@
+"""
+URL scoring for crawl prioritization.
+
+Product pages, downloads and documentation are what the support bot needs
+most, so they are fetched before blog posts and company pages. A URL's score
+combines its category (the same path patterns categorize_page uses), extra
+high-value path hints, a bonus for pages changed recently and a small
+depth penalty.
+"""
+
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+from roger.lastmod import parse_lastmod
+
+# (path fragments, category), checked in order - shared with categorize_page
+CATEGORY_RULES = [
+    (('/product', '/shop'), 'product'),
+    (('/download',), 'download'),
+    (('/about',), 'about'),
+    (('/contact',), 'contact'),
+    (('/blog', '/news'), 'article'),
+    (('/manual', '/guide'), 'documentation'),
+]
+
+CATEGORY_SCORES = {
+    'product': 30,
+    'download': 30,
+    'documentation': 25,
+    'general': 10,
+    'article': 0,
+    'about': 0,
+    'contact': 0,
+}
+
+# Path fragments (Polish and English) that mark product, firmware and manual pages
+HIGH_VALUE_HINTS = (
+    'produkty', 'firmware', 'oprogramowanie', 'zasoby-do-pobrania',
+    'instrukcj', 'karty-katalogowe', 'software', '/file',
+)
+HINT_SCORE = 15
+RECENT_SCORE = 20
+DEPTH_PENALTY = 2
+
+
+def categorize_url(url):
+    """Categorize a page from its URL path"""
+    url = url.lower()
+    for fragments, category in CATEGORY_RULES:
+        if any(fragment in url for fragment in fragments):
+            return category
+    return 'general'
+
+
+def score_url(url, depth=0, lastmod=None, recent_days=30, now=None):
+    """Score a URL for crawl priority; higher scores are fetched first"""
+    score = CATEGORY_SCORES.get(categorize_url(url), 0)
+
+    path = urlparse(url).path.lower()
+    if any(hint in path for hint in HIGH_VALUE_HINTS):
+        score += HINT_SCORE
+
+    # "Changed recently" hint, e.g. from a sitemap <lastmod>
+    modified = parse_lastmod(lastmod)
+    if modified is not None:
+        now = now or datetime.now(timezone.utc)
+        if (now - modified).days <= recent_days:
+            score += RECENT_SCORE
+
+    return score - depth * DEPTH_PENALTY
@@ -0,0 +1,156 @@
+import hashlib
+import pickle
+import time
+from collections import deque
+
+from scrapy import signals
+from scrapy.core.scheduler import BaseScheduler
+from scrapy.exceptions import DontCloseSpider
+from scrapy.utils.request import request_from_dict
+
+from roger import signals as roger_signals
+from roger.checkpoint import request_key
+from roger.frontier import SqliteFrontier
+from roger.seen import url_fingerprint
+
+# How long a "is there work left" answer from the shared frontier is reused
+ACTIVITY_CACHE_SECONDS = 1.0
+
+
+def frontier_fingerprint(request, trailing_slash='strip'):
+    """
+    Return the frontier key of a request. Ordinary requests are keyed by
+    canonical URL, like the seen-set dupefilter. dont_filter requests (start
+    URLs, sitemaps) are keyed by callback, URL and parent page, so workers
+    don't repeat each other's; their canonical URL is recorded as seen as well
+    (see SharedFrontierScheduler.enqueue_request).
+    """
+    if not request.dont_filter:
+        return url_fingerprint(request.url, trailing_slash)
+    key = f"{request_key(request.url, request.callback)} {request.meta.get('parent_url', '')}"
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+
+
+class SharedFrontierScheduler(BaseScheduler):
+    """
+    Scheduler for one of several crawler workers sharing a SqliteFrontier
+    (see roger.frontier and roger.distributed). Requests go to the shared
+    frontier, which also deduplicates them across workers, and the worker
+    claims them back in batches of SHARED_FRONTIER_BATCH. A request is marked
+    done once all output of its callback has been consumed (so its links are
+    queued first), or at the latest when the worker goes idle.
+
+    The worker keeps running while other workers still have requests in
+    flight, since their callbacks may queue more.
+    """
+
+    def __init__(self, crawler, frontier, worker, batch_size, trailing_slash='strip'):
+        self.crawler = crawler
+        self.frontier = frontier
+        self.worker = worker
+        self.batch_size = batch_size
+        self.trailing_slash = trailing_slash
+        self.stats = crawler.stats
+        self.spider = None
+        self.local = deque()  # redirects and retries of claimed requests
+        self.claimed = deque()
+        self._has_pending = (0.0, False)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        path = settings.get('SHARED_FRONTIER_PATH')
+        if not path:
+            raise ValueError("SharedFrontierScheduler needs SHARED_FRONTIER_PATH")
+
+        scheduler = cls(
+            crawler,
+            SqliteFrontier(
+                path,
+                lease=settings.getint('SHARED_FRONTIER_LEASE', 600),
+                max_attempts=settings.getint('SHARED_FRONTIER_MAX_ATTEMPTS', 3),
+            ),
+            worker=settings.get('WORKER_ID') or 'w00',
+            batch_size=settings.getint('SHARED_FRONTIER_BATCH', 16),
+            trailing_slash=settings.get('CANONICAL_TRAILING_SLASH', 'strip'),
+        )
+        crawler.signals.connect(scheduler.response_processed, signal=roger_signals.response_processed)
+        crawler.signals.connect(scheduler.spider_idle, signal=signals.spider_idle)
+        crawler.signals.connect(scheduler.url_seen, signal=roger_signals.url_seen)
+        return scheduler
+
+    def open(self, spider):
+        self.spider = spider
+        spider.logger.info(f"Worker {self.worker} sharing frontier {self.frontier.path}: {self.frontier.counts()}")
+
+    def close(self, reason):
+        # Claims the engine never got to go back to the other workers
+        released = self.frontier.release(self.worker)
+        if released:
+            self.spider.logger.info(f"Released {released} unfinished requests to the shared frontier")
+        self.frontier.close()
+
+    def __len__(self):
+        return len(self.local) + len(self.claimed)
+
+    def has_pending_requests(self):
+        if self.local or self.claimed:
+            return True
+        # The engine asks this on every loop; don't query the database each time
+        checked_at, has_pending = self._has_pending
+        now = time.monotonic()
+        if now - checked_at > ACTIVITY_CACHE_SECONDS:
+            has_pending = self.frontier.has_pending()
+            self._has_pending = (now, has_pending)
+        return has_pending
+
+    def enqueue_request(self, request):
+        # Redirects and retries carry the meta of the claimed request they
+        # came from; they are the same logical fetch, so this worker does them
+        if 'frontier_fingerprint' in request.meta:
+            self.local.append(request)
+            self.stats.inc_value('scheduler/enqueued/local', spider=self.spider)
+            return True
+
+        data = pickle.dumps(request.to_dict(spider=self.spider), protocol=pickle.HIGHEST_PROTOCOL)
+        if not self.frontier.add(frontier_fingerprint(request, self.trailing_slash), request.priority, data):
+            self.stats.inc_value('dupefilter/filtered', spider=self.spider)
+            return False
+        if request.dont_filter:
+            # So links back to a start page don't fetch it again
+            self.frontier.mark_seen(url_fingerprint(request.url, self.trailing_slash))
+        self.stats.inc_value('scheduler/enqueued/frontier', spider=self.spider)
+        self._has_pending = (time.monotonic(), True)
+        return True
+
+    def next_request(self):
+        if self.local:
+            return self.local.popleft()
+        if not self.claimed and self.has_pending_requests():
+            self._claim()
+        if not self.claimed:
+            self._has_pending = (time.monotonic(), False)
+            return None
+        self.stats.inc_value('scheduler/dequeued/frontier', spider=self.spider)
+        return self.claimed.popleft()
+
+    def _claim(self):
+        for fingerprint, data in self.frontier.claim(self.worker, self.batch_size):
+            request = request_from_dict(pickle.loads(data), spider=self.spider)
+            request.meta['frontier_fingerprint'] = fingerprint
+            self.claimed.append(request)
+
+    def url_seen(self, url):
+        self.frontier.mark_seen(url_fingerprint(url, self.trailing_slash))
+
+    def response_processed(self, response, spider):
+        fingerprint = response.meta.get('frontier_fingerprint')
+        if fingerprint is not None:
+            self.frontier.complete(fingerprint)
+
+    def spider_idle(self, spider):
+        # Idle means every request this worker claimed has been handled, even
+        # those that failed to download and never reached a callback
+        self.frontier.complete_worker(self.worker)
+        if self.frontier.is_active():
+            raise DontCloseSpider
@@ -0,0 +1,211 @@
+"""
+Seen-sets used to deduplicate URLs before they are scheduled.
+
+Every backend stores fixed-size URL fingerprints instead of full URL strings:
+- BloomSeenSet keeps a fixed-size bit array in memory (bounded memory, tiny
+  false-positive rate), suited to large crawls.
+- SqliteSeenSet keeps fingerprints on disk so a crawl can be resumed.
+- MemorySeenSet is an exact in-memory set of fingerprints for small crawls.
+
+Each backend can snapshot itself for crawl checkpoints (checkpoint) and roll
+back to such a snapshot when a crawl is resumed (restore).
+"""
+
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+
+from roger.urlcanon import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+# File a seen-set snapshot is written to inside a checkpoint directory
+CHECKPOINT_FILE = 'seen.bin'
+
+
+def url_fingerprint(url, trailing_slash='strip'):
+    """Return a 16-byte fingerprint of the canonicalized URL"""
+    canonical = canonicalize_url(url, trailing_slash=trailing_slash)
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).digest()
+
+
+class MemorySeenSet:
+    """Exact seen-set holding fingerprints in a Python set"""
+
+    def __init__(self):
+        self.fingerprints = set()
+
+    def __contains__(self, fingerprint):
+        return fingerprint in self.fingerprints
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def add(self, fingerprint):
+        """Add a fingerprint, returning True if it was not seen before"""
+        if fingerprint in self.fingerprints:
+            return False
+        self.fingerprints.add(fingerprint)
+        return True
+
+    def checkpoint(self, directory):
+        """Write all fingerprints into `directory` and return the manifest entry"""
+        with open(os.path.join(directory, CHECKPOINT_FILE), 'wb') as f:
+            f.write(b''.join(self.fingerprints))
+        return {'backend': 'memory', 'count': len(self)}
+
+    def restore(self, directory, state):
+        with open(os.path.join(directory, CHECKPOINT_FILE), 'rb') as f:
+            data = f.read()
+        self.fingerprints = {data[i:i + 16] for i in range(0, len(data), 16)}
+
+    def close(self):
+        pass
+
+
+class BloomSeenSet:
+    """Fixed-size Bloom filter sized for `capacity` items at `error_rate`"""
+
+    def __init__(self, capacity=1_000_000, error_rate=0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # Optimal bit count and number of hash functions for the target rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+        self._warned_full = False
+
+    def _positions(self, fingerprint):
+        # Double hashing: derive k positions from two 64-bit halves of the fingerprint
+        h1 = int.from_bytes(fingerprint[:8], 'little')
+        h2 = int.from_bytes(fingerprint[8:16], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, fingerprint):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(fingerprint))
+
+    def __len__(self):
+        return self.count
+
+    def add(self, fingerprint):
+        """Add a fingerprint, returning True if it was (probably) not seen before"""
+        is_new = False
+        for pos in self._positions(fingerprint):
+            mask = 1 << (pos & 7)
+            if not self.bits[pos >> 3] & mask:
+                self.bits[pos >> 3] |= mask
+                is_new = True
+
+        if is_new:
+            self.count += 1
+            if self.count > self.capacity and not self._warned_full:
+                logger.warning(f"Bloom seen-set exceeded its capacity of {self.capacity} URLs; "
+                               f"false-positive rate will rise above {self.error_rate}")
+                self._warned_full = True
+        return is_new
+
+    def checkpoint(self, directory):
+        """Write the bit array into `directory` and return the manifest entry"""
+        with open(os.path.join(directory, CHECKPOINT_FILE), 'wb') as f:
+            f.write(self.bits)
+        return {'backend': 'bloom', 'count': self.count,
+                'num_bits': self.num_bits, 'num_hashes': self.num_hashes}
+
+    def restore(self, directory, state):
+        if state['num_bits'] != self.num_bits or state['num_hashes'] != self.num_hashes:
+            raise ValueError("Checkpointed Bloom filter was built with a different capacity/error rate")
+        with open(os.path.join(directory, CHECKPOINT_FILE), 'rb') as f:
+            self.bits = bytearray(f.read())
+        self.count = state['count']
+
+    def close(self):
+        pass
+
+
+class SqliteSeenSet:
+    """Disk-backed seen-set that survives restarts, for resumable crawls"""
+
+    def __init__(self, path, commit_every=1000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.commit_every = commit_every
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        # The rowid records insertion order so a resume can roll back to a checkpoint
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS seen (id INTEGER PRIMARY KEY, fingerprint BLOB UNIQUE NOT NULL)'
+        )
+        self._migrate()
+        self._pending = 0
+
+    def _migrate(self):
+        """Convert a seen table of older releases, keyed by fingerprint alone, to the current schema"""
+        columns = [row[1] for row in self.connection.execute('PRAGMA table_info(seen)')]
+        if 'id' in columns:
+            return
+        logger.info(f"Migrating seen-set {self.path} to the checkpointable schema")
+        with self.connection:
+            self.connection.execute('ALTER TABLE seen RENAME TO seen_old')
+            self.connection.execute(
+                'CREATE TABLE seen (id INTEGER PRIMARY KEY, fingerprint BLOB UNIQUE NOT NULL)'
+            )
+            self.connection.execute('INSERT INTO seen (fingerprint) SELECT fingerprint FROM seen_old')
+            self.connection.execute('DROP TABLE seen_old')
+
+    def __contains__(self, fingerprint):
+        row = self.connection.execute(
+            'SELECT 1 FROM seen WHERE fingerprint = ?', (fingerprint,)
+        ).fetchone()
+        return row is not None
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM seen').fetchone()[0]
+
+    def add(self, fingerprint):
+        """Add a fingerprint, returning True if it was not seen before"""
+        cursor = self.connection.execute(
+            'INSERT OR IGNORE INTO seen (fingerprint) VALUES (?)', (fingerprint,)
+        )
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.connection.commit()
+            self._pending = 0
+        return cursor.rowcount == 1
+
+    def checkpoint(self, directory):
+        """Commit and record how far the table had grown; the data stays in the database"""
+        self.connection.commit()
+        self._pending = 0
+        last_id = self.connection.execute('SELECT COALESCE(MAX(id), 0) FROM seen').fetchone()[0]
+        return {'backend': 'sqlite', 'path': self.path, 'last_id': last_id}
+
+    def restore(self, directory, state):
+        # Forget URLs first seen after the checkpoint; they will be rediscovered
+        self.connection.execute('DELETE FROM seen WHERE id > ?', (state['last_id'],))
+        self.connection.commit()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+
+def build_seen_set(settings):
+    """Create the seen-set backend selected by the SEEN_SET_BACKEND setting"""
+    backend = settings.get('SEEN_SET_BACKEND', 'bloom')
+
+    if backend == 'bloom':
+        return BloomSeenSet(
+            capacity=settings.getint('SEEN_SET_CAPACITY', 1_000_000),
+            error_rate=settings.getfloat('SEEN_SET_ERROR_RATE', 0.001),
+        )
+    elif backend == 'sqlite':
+        return SqliteSeenSet(settings.get('SEEN_SET_PATH', 'crawl_state/seen.sqlite3'))
+    elif backend == 'memory':
+        return MemorySeenSet()
+
+    raise ValueError(f"Unknown SEEN_SET_BACKEND: {backend!r}")
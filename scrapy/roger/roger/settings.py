@@ -14,7 +14,147 @@ FEED_EXPORTERS = {
 }
 
 ROBOTSTXT_OBEY = True
+# Starting point only: the adaptive throttle below tunes delay and per-host
+# concurrency from observed latency and errors
 DOWNLOAD_DELAY = 1  # 1 second between requests
+CONCURRENT_REQUESTS_PER_DOMAIN = 2
 # Set settings whose default value is deprecated to a future-proof value
 TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
 FEED_EXPORT_ENCODING = "utf-8"
+
+# Deduplicate requests before scheduling with a bounded seen-set
+# (see roger/seen.py). Backends: 'bloom' (in-memory, fixed size),
+# 'sqlite' (on disk, resumable) or 'memory' (exact set, small crawls)
+DUPEFILTER_CLASS = "roger.dupefilters.SeenSetDupeFilter"
+SEEN_SET_BACKEND = "bloom"
+SEEN_SET_CAPACITY = 1000000
+SEEN_SET_ERROR_RATE = 0.001
+SEEN_SET_PATH = "crawl_state/seen.sqlite3"
+
+# Trailing-slash policy used when canonicalizing URLs for dedup
+# (see roger/urlcanon.py): 'strip', 'add' or 'keep'
+CANONICAL_TRAILING_SLASH = "strip"
+
+# Sitemap mode (-a sitemap=1): lastmod of every crawled URL, used to skip
+# pages that are unchanged since the previous crawl
+SITEMAP_LASTMOD_PATH = "crawl_state/lastmod.json"
+
+# Binary downloads (PDF/ZIP manuals) get their own download slot so a few
+# large files don't hold up HTML discovery (see roger/middlewares.py)
+BINARY_DOWNLOAD_SLOT = "binary"
+DOWNLOAD_SLOTS = {
+    "binary": {"concurrency": 2, "delay": 0, "randomize_delay": False},
+}
+BINARY_MAXSIZE = 100 * 1024 * 1024  # cancel binary downloads above 100 MB
+BINARY_WARNSIZE = 30 * 1024 * 1024
+BINARY_BANDWIDTH = 2 * 1024 * 1024  # bytes/second for the binary slot, 0 = unlimited
+BINARY_SPOOL_THRESHOLD = 1024 * 1024  # larger bodies are moved to a temp file
+BINARY_TEMP_DIR = None  # defaults to the system temp directory
+
+DOWNLOADER_MIDDLEWARES = {
+    "roger.middlewares.AdaptiveThrottleMiddleware": 585,
+    # Below HttpCompressionMiddleware (590) so it sees decompressed bodies
+    "roger.middlewares.BinaryDownloadMiddleware": 580,
+}
+
+# Adaptive, latency-driven throttling (see roger/throttle.py)
+ADAPTIVE_THROTTLE_ENABLED = True
+ADAPTIVE_THROTTLE_MAX_CONCURRENCY = 16  # per host
+ADAPTIVE_THROTTLE_MAX_RPS = 8  # requests/second ceiling per host, 0 = none
+ADAPTIVE_THROTTLE_MAX_DELAY = 30.0
+ADAPTIVE_THROTTLE_TARGET_LATENCY = 2.0  # back off when responses get slower than this
+ADAPTIVE_THROTTLE_MAX_ERROR_RATE = 0.05
+ADAPTIVE_THROTTLE_DEBUG = False
+
+# Score requests before enqueueing so product, firmware and manual pages are
+# fetched first (see roger/priority.py). Runs after DepthMiddleware (900) so
+# request depth is known.
+PRIORITY_ENABLED = True
+PRIORITY_RECENT_DAYS = 30  # sitemap lastmod within this many days counts as recent
+SPIDER_MIDDLEWARES = {
+    "roger.middlewares.NearDuplicateLinkMiddleware": 700,
+    "roger.middlewares.PriorityMiddleware": 800,
+    "roger.middlewares.CheckpointMiddleware": 950,
+}
+
+# Item feed (see roger/pipelines.py and roger/feed.py):
+# 'jsonl'  - one JSON-lines file at ITEM_FEED_PATH
+# 'shards' - compressed JSON-lines shards in ITEM_FEED_DIR, rotated by size
+ITEM_FEED_MODE = "jsonl"
+ITEM_FEED_PATH = "output.jsonl"
+ITEM_FEED_DIR = "feed"
+ITEM_FEED_COMPRESSION = "gzip"  # 'gzip', 'zstd' (needs zstandard) or None
+ITEM_FEED_SHARD_SIZE = 64 * 1024 * 1024  # uncompressed bytes per shard
+ITEM_FEED_SHARD_PREFIX = "items"  # shard file prefix, per worker in distributed crawls
+
+# Full text of PDFs goes to a content-addressed blob store; document items
+# keep a preview and the blob's SHA-256 in 'content_blob'. Feed readers look
+# for the store next to the feed unless given its directory.
+BLOB_STORE_DIR = "blobs"
+BLOB_MIN_CHARS = 2000
+BLOB_PREVIEW_CHARS = 500
+PDF_TEXT_MAX_CHARS = 0  # 0 = keep the full text
+# Per-page PDF text keyed by the PDF's SHA-256 and the extractor version,
+# shared with roger.ingest; unset to always re-parse
+PDF_TEXT_CACHE_DIR = "crawl_state/pdf_text"
+
+# Site template blocks (header, footer, "Przydatne linki", ...) are learned
+# from element paths repeated across pages (see roger/template.py), stored
+# once in TEMPLATE_STORE_PATH and left out of item content
+TEMPLATE_STORE_PATH = "crawl_state/templates.json"
+TEMPLATE_MIN_PAGES = 20  # pages of a site to see before stripping starts
+TEMPLATE_MIN_FRACTION = 0.5  # share of those pages a block must appear on
+
+# Page items list their internal links with anchor text in 'links' (the
+# site link graph, used by the website processor for PageRank); at most
+# LINK_GRAPH_MAX_LINKS distinct targets per page, 0 = no limit
+LINK_GRAPH_ENABLED = True
+LINK_GRAPH_MAX_LINKS = 500
+
+# Near-duplicate pages (language variants, print views, paginated listings)
+# are found by SimHash (see roger/simhash.py): 'mark' sets near_duplicate_of
+# on the item, 'drop' drops it. Their links are not followed either when
+# NEAR_DUPLICATE_SKIP_LINKS is set.
+NEAR_DUPLICATE_ENABLED = True
+NEAR_DUPLICATE_ACTION = "mark"
+NEAR_DUPLICATE_DISTANCE = 3  # max differing bits of the 64-bit fingerprint
+NEAR_DUPLICATE_MIN_CHARS = 200  # shorter pages are never compared
+NEAR_DUPLICATE_SKIP_LINKS = True
+
+ITEM_PIPELINES = {
+    "roger.pipelines.NearDuplicatePipeline": 300,
+    "roger.pipelines.BlobStorePipeline": 700,
+    "roger.pipelines.JsonLinesFeedPipeline": 800,
+    "roger.pipelines.ShardedFeedPipeline": 800,
+}
+
+# Periodic checkpoints of the frontier, seen-set and feed offsets
+# (see roger/extensions.py). Resume with -s CHECKPOINT_RESUME=1
+CHECKPOINT_ENABLED = True
+CHECKPOINT_DIR = "crawl_state/checkpoints"
+CHECKPOINT_INTERVAL = 300  # seconds
+CHECKPOINT_KEEP = 2
+CHECKPOINT_RESUME = False
+
+# Crawl metrics (latency, response sizes, extraction times, item rate, queue
+# depth) written every METRICS_INTERVAL seconds (see roger/extensions.py).
+# METRICS_FORMAT is 'json' or 'prometheus' (for a node_exporter textfile).
+METRICS_ENABLED = True
+METRICS_PATH = "crawl_state/metrics.json"
+METRICS_FORMAT = "json"
+METRICS_INTERVAL = 30  # seconds
+
+# Distributed crawl (python -m roger.distributed --workers N): N crawl
+# processes share one frontier and seen-set in a SQLite file (see
+# roger/frontier.py), claiming SHARED_FRONTIER_BATCH requests at a time.
+# The launcher sets SCHEDULER, SHARED_FRONTIER_PATH and WORKER_ID per worker.
+SHARED_FRONTIER_PATH = None
+SHARED_FRONTIER_BATCH = 16
+SHARED_FRONTIER_LEASE = 600  # seconds before a dead worker's claims are requeued
+SHARED_FRONTIER_MAX_ATTEMPTS = 3
+WORKER_ID = None
+
+EXTENSIONS = {
+    "roger.extensions.CrawlCheckpoint": 500,
+    "roger.extensions.CrawlMetrics": 510,
+}
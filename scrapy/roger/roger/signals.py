@@ -0,0 +1,25 @@
+"""Custom signals shared by the roger crawl components"""
+
+# Sent by CrawlCheckpoint with a `directory` argument. Handlers write their
+# own state into that directory and return a dict that is merged into the
+# checkpoint manifest.
+checkpoint = object()
+
+# Sent by CheckpointMiddleware with a `response` argument once all output of
+# the response's callback has been consumed, or the response was dropped as an
+# HTTP error or its callback failed.
+response_processed = object()
+
+# Sent by RogerSpider with a `url` argument for a URL this crawl must not
+# fetch (a sitemap entry unchanged since the last crawl). The seen-set
+# dupefilter, or in a distributed crawl the shared frontier, records it as
+# seen, so no worker fetches it through a link either.
+url_seen = object()
+
+# Sent by NearDuplicatePipeline with a `url` argument when the page at that
+# URL is a near-duplicate of one already crawled.
+near_duplicate = object()
+
+# Sent by RogerSpider with `kind` ('html' or 'pdf'), `seconds` and `url`
+# after extracting a page's or document's text.
+extraction_timed = object()
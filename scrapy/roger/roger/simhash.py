@@ -0,0 +1,108 @@
+"""
+SimHash fingerprints for near-duplicate page detection.
+
+A page's text is reduced to a 64-bit fingerprint such that near-identical
+texts (language variants, print views, paginated listings) differ in only a
+few bits. SimHashIndex finds an earlier fingerprint within a Hamming
+distance of k by splitting fingerprints into k + 1 blocks: two fingerprints
+that differ in at most k bits agree exactly on at least one block, so only
+the fingerprints sharing a block value have to be compared.
+"""
+
+import hashlib
+import os
+import pickle
+import re
+from array import array
+from collections import Counter
+
+FINGERPRINT_BITS = 64
+
+# File the index is written to inside a checkpoint directory
+CHECKPOINT_FILE = 'simhash.pickle'
+
+
+def text_features(text, shingle_size=3):
+    """Return the weighted word shingles of a text"""
+    words = re.findall(r'\w+', text.lower())
+    if len(words) < shingle_size:
+        return Counter(words)
+    return Counter(' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1))
+
+
+def simhash(text, shingle_size=3):
+    """Return the 64-bit SimHash of a text"""
+    # Sum feature weights per (byte position, byte value) first, so each
+    # feature costs 8 additions instead of 64
+    byte_weights = [Counter() for _ in range(FINGERPRINT_BITS // 8)]
+    total = 0
+    for feature, weight in text_features(text, shingle_size).items():
+        digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+        for position, value in enumerate(digest):
+            byte_weights[position][value] += weight
+        total += weight
+
+    fingerprint = 0
+    for position, counts in enumerate(byte_weights):
+        for bit in range(8):
+            # Weight of the features with this bit set, minus those without
+            ones = sum(weight for value, weight in counts.items() if value >> bit & 1)
+            if 2 * ones > total:
+                fingerprint |= 1 << (FINGERPRINT_BITS - 8 * (position + 1) + bit)
+    return fingerprint
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+class SimHashIndex:
+    """Fingerprints of the pages seen so far, searchable by Hamming distance"""
+
+    def __init__(self, max_distance=3):
+        self.max_distance = max_distance
+        blocks = max_distance + 1
+        # Bit ranges of the blocks, as (shift, mask)
+        sizes = [FINGERPRINT_BITS // blocks + (i < FINGERPRINT_BITS % blocks) for i in range(blocks)]
+        self.blocks = []
+        shift = 0
+        for size in sizes:
+            self.blocks.append((shift, (1 << size) - 1))
+            shift += size
+        self.fingerprints = array('Q')
+        self.keys = []
+        self.tables = [{} for _ in self.blocks]
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def find(self, fingerprint):
+        """Return the key of an indexed fingerprint within max_distance, or None"""
+        for table, (shift, mask) in zip(self.tables, self.blocks):
+            for position in table.get(fingerprint >> shift & mask, ()):
+                if hamming_distance(fingerprint, self.fingerprints[position]) <= self.max_distance:
+                    return self.keys[position]
+        return None
+
+    def add(self, fingerprint, key):
+        position = len(self.fingerprints)
+        self.fingerprints.append(fingerprint)
+        self.keys.append(key)
+        for table, (shift, mask) in zip(self.tables, self.blocks):
+            table.setdefault(fingerprint >> shift & mask, []).append(position)
+
+    def checkpoint(self, directory):
+        """Write the fingerprints into `directory` and return the manifest entry"""
+        with open(os.path.join(directory, CHECKPOINT_FILE), 'wb') as f:
+            pickle.dump((self.fingerprints.tobytes(), self.keys), f)
+        return {'count': len(self)}
+
+    def restore(self, directory, state):
+        with open(os.path.join(directory, CHECKPOINT_FILE), 'rb') as f:
+            data, keys = pickle.load(f)
+        fingerprints = array('Q')
+        fingerprints.frombytes(data)
+
+        self.__init__(self.max_distance)
+        for fingerprint, key in zip(fingerprints, keys):
+            self.add(fingerprint, key)
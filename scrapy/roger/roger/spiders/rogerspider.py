@@ -1,68 +1,206 @@
 import scrapy
-from urllib.parse import urlparse
-from datetime import datetime
+from urllib.parse import urljoin, urlparse
 import os
-import tempfile
-import re
-import PyPDF2
-import requests
-from io import BytesIO
+import time
+from scrapy.utils.gz import gunzip
+from scrapy.utils.request import request_from_dict
+from scrapy.utils.response import get_base_url
+from scrapy.utils.sitemap import Sitemap
+
+from roger import signals as roger_signals
+from roger.checkpoint import load_frontier
+from roger.documents import (
+    document_title, download_item, extract_pdf_text, generate_title_from_url, page_item, pdf_document,
+    truncate_document,
+)
+from roger.extract import extract_download_links, extract_page, internal_links, is_product_page
+from roger.lastmod import LastmodStore
+from roger.middlewares import binary_request_meta, is_binary_url
+from roger.pdfcache import PdfTextCache
+from roger.priority import categorize_url
+from roger.template import TemplateStore
+from roger.urlcanon import canonical_host
 
 class RogerSpider(scrapy.Spider):
     name = "RogerSpider"
     allowed_domains = ["roger.pl"]
     start_urls = ["https://roger.pl"] 
     
-    # Keep track of visited URLs to avoid duplicates
-    visited_urls = set()
+    # Used in sitemap mode (scrapy crawl RogerSpider -a sitemap=1)
+    sitemap_urls = ["https://www.roger.pl/sitemap.xml"]
+    
+    def __init__(self, sitemap=None, start_url=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sitemap_mode = str(sitemap).lower() in ('1', 'true', 'yes')
+        # Crawl another site with the same rules, e.g. the local mock site
+        # (scrapy crawl RogerSpider -a start_url=http://localhost:8765/)
+        if start_url:
+            self.start_urls = [start_url]
+            self.allowed_domains = [urlparse(start_url).hostname]
+            self.sitemap_urls = [urljoin(start_url, '/sitemap.xml')]
+        self.lastmod_store = None
+        self.pdf_cache = None
+        self.template_store = None
+    
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider.save_lastmods, signal=roger_signals.checkpoint)
+        crawler.signals.connect(spider.save_templates, signal=roger_signals.checkpoint)
+        cache_dir = crawler.settings.get('PDF_TEXT_CACHE_DIR')
+        if cache_dir:
+            spider.pdf_cache = PdfTextCache(cache_dir)
+        template_path = crawler.settings.get('TEMPLATE_STORE_PATH')
+        if template_path:
+            spider.template_store = TemplateStore(
+                template_path,
+                min_pages=crawler.settings.getint('TEMPLATE_MIN_PAGES', 20),
+                min_fraction=crawler.settings.getfloat('TEMPLATE_MIN_FRACTION', 0.5),
+            ).load()
+        return spider
+    
+    def start_requests(self):
+        if self.sitemap_mode:
+            self.lastmod_store = LastmodStore(
+                self.settings.get('SITEMAP_LASTMOD_PATH', 'crawl_state/lastmod.json')
+            ).load()
+        
+        # Resume from the frontier of the last checkpoint instead of starting over
+        if self.settings.getbool('CHECKPOINT_RESUME'):
+            frontier = load_frontier(self.settings.get('CHECKPOINT_DIR', 'crawl_state/checkpoints'))
+            if frontier is not None:
+                self.logger.info(f"Resuming crawl with {len(frontier)} pending requests from checkpoint")
+                for request_dict in frontier:
+                    # Already in the restored seen-set, so bypass the dupefilter
+                    request_dict['dont_filter'] = True
+                    yield request_from_dict(request_dict, spider=self)
+                return
+        
+        if not self.sitemap_mode:
+            yield from super().start_requests()
+            return
+        
+        for url in self.sitemap_urls:
+            yield scrapy.Request(url, callback=self.parse_sitemap,
+                                 errback=self.sitemap_failed, dont_filter=True)
+    
+    def parse_sitemap(self, response):
+        """Seed the frontier from a sitemap or sitemap index"""
+        body = response.body
+        if body[:2] == b'\x1f\x8b':  # gzipped sitemap
+            body = gunzip(body)
+        
+        sitemap = Sitemap(body)
+        if sitemap.type == 'sitemapindex':
+            for entry in sitemap:
+                yield scrapy.Request(entry['loc'], callback=self.parse_sitemap,
+                                     errback=self.sitemap_failed, dont_filter=True)
+            return
+        
+        scheduled = 0
+        skipped = 0
+        for entry in sitemap:
+            url = entry['loc']
+            if not self.is_valid_url(url):
+                continue
+            
+            # Skip pages that have not changed since the last crawl, and have
+            # the dupefilter (or shared frontier) drop links to them as well
+            lastmod = entry.get('lastmod')
+            if self.lastmod_store.is_unchanged(url, lastmod):
+                self.crawler.signals.send_catch_log(signal=roger_signals.url_seen, url=url)
+                skipped += 1
+                continue
+            
+            scheduled += 1
+            yield scrapy.Request(url, callback=self.parse,
+                                 meta={'lastmod': lastmod, **self.request_meta(url)})
+        
+        self.logger.info(f"Sitemap {response.url}: scheduled {scheduled} URLs, "
+                         f"skipped {skipped} unchanged since last crawl")
+    
+    def sitemap_failed(self, failure):
+        """Fall back to link discovery from start_urls if a sitemap can't be fetched"""
+        self.logger.error(f"Could not fetch sitemap {failure.request.url}: {failure.value}")
+        for url in self.start_urls:
+            yield scrapy.Request(url, callback=self.parse, dont_filter=True)
+    
+    def request_meta(self, url):
+        """Route likely binary downloads through their own download slot"""
+        if is_binary_url(url):
+            return binary_request_meta(self.settings)
+        return {}
+    
+    def discard_spooled_body(self, response):
+        """Remove the temp file a large binary body was spooled to, if any"""
+        body_path = response.meta.get('body_path')
+        if body_path and os.path.exists(body_path):
+            os.remove(body_path)
+    
+    def save_lastmods(self, directory=None):
+        if self.lastmod_store is not None:
+            self.lastmod_store.save()
+    
+    def save_templates(self, directory=None):
+        if self.template_store is not None:
+            self.template_store.save()
+    
+    def closed(self, reason):
+        self.save_lastmods()
+        self.save_templates()
     
     def parse(self, response):
+        # Remember the sitemap lastmod this page had when it was crawled
+        if self.lastmod_store is not None:
+            self.lastmod_store.record(response.url, response.meta.get('lastmod'))
+        
         # Check if the response is a binary file
         content_type = response.headers.get('Content-Type', b'').decode('utf-8').lower()
         if not content_type.startswith('text/html') and not content_type.startswith('text/plain'):
             # For binary files, extract content based on type
             filename = response.url.split('/')[-1]
             
-            # For PDFs, extract the text content
-            content = ""
+            # For PDFs, extract the text content and its page spans
+            content, pages = "", []
             if content_type.startswith('application/pdf') or response.url.lower().endswith('.pdf'):
                 try:
-                    content = self.extract_pdf_content(response.body, response.url)
+                    content, pages = self.extract_pdf_content(self.response_body(response), response.url)
                     self.logger.info(f"Extracted {len(content)} characters from PDF: {response.url}")
                 except Exception as e:
                     self.logger.error(f"Error extracting PDF content from {response.url}: {e}")
+            self.discard_spooled_body(response)
             
             # Generate a better title from the URL path
             better_title = self.generate_title_from_url(response.url)
             
-            yield {
-                'url': response.url,
-                'title': better_title or filename,
-                'content': content,  # Now contains extracted PDF text if available
-                'category': 'download',
-                'is_product': False,
-                'download_links': [{
-                    'url': response.url,
-                    'text': better_title or filename,
-                    'type': content_type.split(';')[0]  # Add content type information
-                }],
-                'timestamp': datetime.now().isoformat()
-            }
+            # content now contains extracted PDF text if available
+            yield download_item(response.url, better_title or filename, content,
+                                content_type.split(';')[0], pages=pages)
             return
 
-        # For HTML pages, proceed with normal parsing
+        # For HTML pages, collect title, content, links and product
+        # indicators in a single walk over the parsed tree
         url = response.url
-        title = response.css('title::text').get()
-        content = ' '.join(response.css('p::text, h1::text, h2::text, h3::text, h4::text, h5::text').getall())
+        started = time.perf_counter()
+        page = extract_page(response.selector.root, get_base_url(response))
+        self.timed('html', started, url)
+        title = page['title']
+        content = page['content']
+        
+        # Leave out the site's header, footer and other template blocks
+        template_blocks = []
+        if self.template_store is not None:
+            content, template_blocks = self.template_store.strip(
+                canonical_host(urlparse(url).netloc), page['blocks'])
         
         # Determine page category (you may need to customize this)
         category = self.categorize_page(response)
         
         # Check if this is a product page
-        is_product = self.is_product_page(response)
+        is_product = self.is_product_page(page)
         
         # Extract download links if any
-        download_links = self.extract_download_links(response)
+        download_links = self.extract_download_links(page)
         
         # Process download links to fetch their content
         processed_download_links = []
@@ -74,18 +212,15 @@ class RogerSpider(scrapy.Spider):
             if link_url.lower().endswith('.pdf'):
                 try:
                     # Generate better link text if it's just "file" or similar
-                    if not link_text or link_text.lower() in ['file', 'download', 'document']:
-                        better_text = self.generate_title_from_url(link_url)
-                        if better_text:
-                            link['text'] = better_text
+                    link['text'] = document_title(link_text, link_url)
                     
                     # Try to download and extract PDF content asynchronously
                     # We'll do this in a separate request to avoid blocking
                     yield scrapy.Request(
                         link_url,
                         callback=self.process_pdf_download,
-                        meta={'link_info': link, 'parent_url': url},
-                        dont_filter=True  # Allow duplicate requests for PDF content
+                        meta={'link_info': link, 'parent_url': url,
+                              **binary_request_meta(self.settings)},
                     )
                 except Exception as e:
                     self.logger.error(f"Error processing PDF link {link_url}: {e}")
@@ -93,132 +228,86 @@ class RogerSpider(scrapy.Spider):
             else:
                 processed_download_links.append(link)
         
+        # Internal links with their anchor text, the page's edges of the link graph
+        extra = {}
+        if self.settings.getbool('LINK_GRAPH_ENABLED'):
+            extra['links'] = internal_links(url, page, self.is_valid_url,
+                                            self.settings.getint('LINK_GRAPH_MAX_LINKS', 500))
+        
         # Yield the extracted data for the HTML page
-        yield {
-            'url': url,
-            'title': title,
-            'content': content,
-            'category': category,
-            'is_product': is_product,
-            'download_links': processed_download_links,
-            'timestamp': datetime.now().isoformat()
-        }
+        yield page_item(url, title, content, category, is_product, processed_download_links,
+                        template_blocks=template_blocks, **extra)
         
-        # Follow internal links for crawling
-        self.visited_urls.add(url)
-        for link in response.css('a::attr(href)').getall():
-            if self.is_valid_url(response.urljoin(link)):
-                yield response.follow(link, self.parse)
+        # Follow internal links for crawling (duplicates are dropped by the
+        # seen-set dupefilter before they are scheduled). In sitemap mode the
+        # sitemap's URLs are already scheduled or marked seen, so only pages
+        # it misses are discovered through links.
+        for link in page['links']:
+            link_url = link['url']
+            if not self.is_valid_url(link_url):
+                continue
+            yield response.follow(link_url, self.parse, meta=self.request_meta(link_url))
     
     def process_pdf_download(self, response):
         """Process downloaded PDF and extract its content"""
         link_info = response.meta.get('link_info', {})
         parent_url = response.meta.get('parent_url', '')
         
-        content = ""
+        content, pages = "", []
         try:
-            content = self.extract_pdf_content(response.body, response.url)
+            content, pages = self.extract_pdf_content(self.response_body(response), response.url)
             self.logger.info(f"Extracted {len(content)} characters from PDF link: {response.url}")
         except Exception as e:
             self.logger.error(f"Error extracting content from PDF link {response.url}: {e}")
+        self.discard_spooled_body(response)
         
         # Generate a better title from the URL path if needed
-        title = link_info.get('text', '')
-        if not title or title.lower() in ['file', 'download', 'document']:
-            title = self.generate_title_from_url(response.url) or title
+        title = document_title(link_info.get('text', ''), response.url)
         
         # Yield the PDF file as a separate item with its content
-        yield {
-            'url': response.url,
-            'title': title,
-            'content': content,
-            'category': 'download',
-            'is_product': False,
-            'download_links': [{
-                'url': response.url,
-                'text': title,
-                'type': 'application/pdf'
-            }],
-            'parent_url': parent_url,
-            'timestamp': datetime.now().isoformat()
-        }
+        yield download_item(response.url, title, content, 'application/pdf',
+                            pages=pages, parent_url=parent_url)
+    
+    def response_body(self, response):
+        """Return the response body, or the path it was spooled to on disk"""
+        return response.meta.get('body_path') or response.body
     
     def extract_pdf_content(self, pdf_data, url):
-        """Extract text content from PDF binary data"""
+        """
+        Extract text content from PDF binary data or a path to a PDF file.
+        Returns the text, with paragraph breaks kept, and its page spans.
+        """
         try:
-            # Create a PDF reader object
-            pdf_file = BytesIO(pdf_data)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            
-            # Extract text from all pages
-            text_content = []
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text_content.append(page.extract_text())
-            
-            # Join all pages with spacing
-            full_text = "\n\n".join(text_content)
-            
-            # Clean up the text - remove excessive whitespace
-            cleaned_text = re.sub(r'\s+', ' ', full_text).strip()
+            started = time.perf_counter()
+            # Each distinct PDF is only parsed once while the cache lives
+            if self.pdf_cache is not None:
+                text, pages = pdf_document(self.pdf_cache.pages(pdf_data))
+            else:
+                text, pages = extract_pdf_text(pdf_data)
+            self.timed('pdf', started, url)
             
-            # Return a reasonable amount of text - first 10000 chars to prevent massive items
-            return cleaned_text[:10000]
+            # Full text is kept by default - large texts go to the blob store
+            # instead of the item (PDF_TEXT_MAX_CHARS=0 means no limit)
+            return truncate_document(text, pages, self.settings.getint('PDF_TEXT_MAX_CHARS', 0))
         
         except Exception as e:
             self.logger.error(f"PDF extraction error for {url}: {e}")
             # Try alternative extraction if PyPDF2 fails
-            return f"PDF document - extraction failed: {str(e)}"
+            return f"PDF document - extraction failed: {str(e)}", []
+    
+    def timed(self, kind, started, url):
+        """Report how long an extraction that began at `started` took"""
+        self.crawler.signals.send_catch_log(signal=roger_signals.extraction_timed, kind=kind,
+                                            seconds=time.perf_counter() - started, url=url)
     
     def generate_title_from_url(self, url):
         """Generate a better title from URL path segments"""
-        try:
-            # Extract the last meaningful segment from the URL path
-            path = urlparse(url).path
-            segments = [s for s in path.split('/') if s and s != 'file']
-            
-            if not segments:
-                return None
-                
-            # Get the last segment before 'file' if it exists
-            last_segment = segments[-1]
-            
-            # Clean up the segment
-            clean_segment = last_segment.replace('-', ' ').replace('_', ' ')
-            
-            # Handle numeric IDs at the beginning
-            clean_segment = re.sub(r'^\d+\s+', '', clean_segment)
-            
-            # Extract manual type if possible
-            manual_type = None
-            manual_match = re.search(r'(installation|operating|user|product|technical|reference)\s*(manual|guide)', clean_segment, re.I)
-            if manual_match:
-                manual_type = manual_match.group(0)
-            
-            # Extract product model
-            model_match = re.search(r'([A-Z0-9]+-[0-9]+|[A-Z]+-[0-9]+|[A-Z0-9]{2,6})', clean_segment, re.I)
-            model = model_match.group(0) if model_match else None
-            
-            # Construct a title
-            if model and manual_type:
-                title = f"{model.upper()} {manual_type.title()}"
-            elif model:
-                title = f"{model.upper()} Document"
-            else:
-                # Capitalize words appropriately
-                title = ' '.join(word.capitalize() for word in clean_segment.split())
-            
-            return title
-        except:
-            return None
+        return generate_title_from_url(url)
     
     def is_valid_url(self, url):
-        # Only follow internal links that haven't been visited
-        if url in self.visited_urls:
-            return False
-        
+        # Only follow internal links
         parsed_url = urlparse(url)
-        domain = parsed_url.netloc.replace('www.', '')
+        domain = canonical_host(parsed_url.hostname or '')
         
         # Don't follow images, etc. but allow PDFs
         ignored_extensions = ['.jpg', '.png', '.gif', '.zip']
@@ -228,68 +317,11 @@ class RogerSpider(scrapy.Spider):
         return domain in self.allowed_domains
     
     def categorize_page(self, response):
-        # Simple categorization based on URL and content
-        url = response.url.lower()
-        
-        if '/product' in url or '/shop' in url:
-            return 'product'
-        elif '/download' in url:
-            return 'download'
-        elif '/about' in url:
-            return 'about'
-        elif '/contact' in url:
-            return 'contact'
-        elif '/blog' in url or '/news' in url:
-            return 'article'
-        elif '/manual' in url or '/guide' in url:
-            return 'documentation'
-        else:
-            return 'general'
+        # Simple categorization based on URL (rules shared with the crawl priority scoring)
+        return categorize_url(response.url)
     
-    def is_product_page(self, response):
-        # Check if page has product characteristics
-        has_price = bool(response.css('.price::text').get() or response.xpath('//*[contains(text(), "$")]').get())
-        has_buy_button = bool(response.css('button:contains("Buy"), a:contains("Buy")').get())
-        product_indicators = ['technical specification', 'product code', 'model', 'sku']
-        has_product_indicators = any(response.xpath(f'//*[contains(text(), "{indicator}")]').get() 
-                                    for indicator in product_indicators)
-        
-        return has_price or has_buy_button or has_product_indicators
+    def is_product_page(self, page):
+        return is_product_page(page)
     
-    def extract_download_links(self, response):
-        # Extract links that look like downloads
-        download_extensions = ['.pdf', '.zip', '.doc', '.docx', '.xls', '.xlsx']
-        download_links = []
-        
-        for link in response.css('a[href]'):
-            href = link.css('::attr(href)').get()
-            if not href:
-                continue
-                
-            full_url = response.urljoin(href)
-            if any(full_url.lower().endswith(ext) for ext in download_extensions):
-                # Get link text or use fallback
-                link_text = link.css('::text').get()
-                if not link_text or link_text.strip() == '':
-                    link_text = 'Download'
-                    
-                # Try to determine file type from extension
-                file_type = 'application/octet-stream'  # default fallback
-                for ext in download_extensions:
-                    if full_url.lower().endswith(ext):
-                        if ext == '.pdf':
-                            file_type = 'application/pdf'
-                        elif ext in ['.doc', '.docx']:
-                            file_type = 'application/msword'
-                        elif ext in ['.xls', '.xlsx']:
-                            file_type = 'application/excel'
-                        elif ext == '.zip':
-                            file_type = 'application/zip'
-                
-                download_links.append({
-                    'url': full_url,
-                    'text': link_text.strip(),
-                    'type': file_type
-                })
-        
-        return download_links
\ No newline at end of file
+    def extract_download_links(self, page):
+        return extract_download_links(page)
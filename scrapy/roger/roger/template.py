@@ -0,0 +1,123 @@
+"""
+Per-site page template learning for boilerplate stripping.
+
+Every text block a page yields is keyed by its element path (tags with their
+id or classes, e.g. /html/body/div#footer/div.links/p) plus its text. Once
+a site has had TEMPLATE_MIN_PAGES pages crawled, a block whose key appears
+on at least TEMPLATE_MIN_FRACTION of them is part of the site template
+(header, footer, "Przydatne linki", ...). Template blocks are stored once in
+TemplateStore and dropped from item content; items list the ids of the
+template blocks they had in 'template_blocks'.
+
+Block counts are kept by lossy counting (Manku and Motwani) with buckets of
+TEMPLATE_MIN_PAGES pages: at the end of each bucket, blocks seen on at most
+one page per bucket so far (article text, product descriptions) are
+forgotten. Each count records how many pages it may have missed, so a block
+on more than 1/TEMPLATE_MIN_PAGES of the pages is never dropped, and the
+candidates held and saved stay bounded however many pages a site has.
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def block_key(path, text):
+    """Return the id of a text block at an element path"""
+    normalized = ' '.join(text.split())
+    return hashlib.blake2b(f"{path}\0{normalized}".encode('utf-8'), digest_size=8).hexdigest()
+
+
+class TemplateStore:
+    """
+    JSON-backed template state: per host, the number of pages seen, the
+    candidate blocks as {id: [pages it appeared on, pages it may have missed]},
+    and the blocks found to be template.
+    """
+
+    def __init__(self, path, min_pages=20, min_fraction=0.5):
+        self.path = path
+        self.min_pages = min_pages
+        self.min_fraction = min_fraction
+        self.sites = {}
+
+    def load(self):
+        """Load the state of previous crawls, if any"""
+        if not os.path.isfile(self.path):
+            return self
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.sites = {}
+            for host, site in data.items():
+                # Stores of older crawls have plain counts and were never pruned
+                counts = {key: count if isinstance(count, list) else [count, 0]
+                          for key, count in site['counts'].items()}
+                self.sites[host] = {'pages': site['pages'], 'counts': counts, 'templates': site['templates']}
+                self._prune(self.sites[host])
+            logger.info(f"Loaded page templates for {len(self.sites)} sites from {self.path}")
+        except (json.JSONDecodeError, KeyError, OSError) as e:
+            logger.error(f"Could not load page templates from {self.path}: {e}")
+        return self
+
+    def save(self):
+        """Atomically write the state to disk"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.sites, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def _bucket(self, site):
+        """Number of the bucket of min_pages pages the site's last page falls in"""
+        return -(-site['pages'] // self.min_pages)
+
+    def _prune(self, site):
+        """Forget the blocks that appeared on no more pages than buckets have passed"""
+        bucket = self._bucket(site)
+        site['counts'] = {key: count for key, count in site['counts'].items() if sum(count) > bucket}
+
+    def templates(self, host):
+        """Return the template blocks of a site as {id: {'path', 'text'}}"""
+        return self.sites.get(host, {}).get('templates', {})
+
+    def strip(self, host, blocks):
+        """
+        Record a page's (path, text) blocks and return its content without
+        the site's template blocks, plus the ids of the blocks removed.
+        """
+        site = self.sites.setdefault(host, {'pages': 0, 'counts': {}, 'templates': {}})
+        keys = [block_key(path, text) for path, text in blocks]
+        site['pages'] += 1
+        counts = site['counts']
+        missed = self._bucket(site) - 1
+        for key in set(keys):
+            if key in counts:
+                counts[key][0] += 1
+            else:
+                counts[key] = [1, missed]
+
+        # Until enough pages were seen, keep everything
+        if site['pages'] < self.min_pages:
+            return ' '.join(text for _, text in blocks), []
+
+        threshold = self.min_fraction * site['pages']
+        templates = site['templates']
+        kept = []
+        removed = []
+        for key, (path, text) in zip(keys, blocks):
+            if counts[key][0] < threshold:
+                kept.append(text)
+                continue
+            if key not in templates:
+                templates[key] = {'path': path, 'text': ' '.join(text.split())}
+            if key not in removed:
+                removed.append(key)
+        if site['pages'] % self.min_pages == 0:
+            self._prune(site)
+        return ' '.join(kept), removed
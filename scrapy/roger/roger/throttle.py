@@ -0,0 +1,82 @@
+"""
+Latency- and error-driven crawl throttling.
+
+ThrottleController keeps, per download slot (i.e. per host), a moving average
+of download latency and error rate and derives the slot's concurrency and
+delay from them, much like TCP congestion control:
+- while the host answers quickly and without errors, concurrency grows by
+  about one per round of requests and the delay decays towards the floor
+  set by the requests-per-second ceiling;
+- when latency exceeds the target or errors appear, concurrency is halved
+  and the delay doubled, at most once per observed round-trip.
+"""
+
+import time
+
+# Statuses that mean the server wants us to slow down
+BACKOFF_STATUSES = {429, 500, 502, 503, 504}
+
+
+class SlotState:
+    """Throttling state for a single download slot"""
+
+    def __init__(self, concurrency, delay):
+        self.window = float(concurrency)
+        self.delay = delay
+        self.latency = None
+        self.error_rate = 0.0
+        self.last_backoff = 0.0
+
+    @property
+    def concurrency(self):
+        return max(1, int(self.window))
+
+
+class ThrottleController:
+    """Derives per-slot concurrency and delay from observed latency and errors"""
+
+    def __init__(self, max_concurrency=16, max_rps=0, max_delay=30.0,
+                 target_latency=2.0, max_error_rate=0.05, smoothing=0.2, clock=time.monotonic):
+        self.max_concurrency = max_concurrency
+        # The ceiling on requests per second becomes a floor on the delay
+        self.min_delay = 1.0 / max_rps if max_rps else 0.0
+        self.max_delay = max_delay
+        self.target_latency = target_latency
+        self.max_error_rate = max_error_rate
+        self.smoothing = smoothing
+        self.clock = clock
+        self.states = {}
+
+    def state(self, key, concurrency, delay):
+        """Get the state of a slot, seeding it from the slot's current settings"""
+        if key not in self.states:
+            self.states[key] = SlotState(min(concurrency, self.max_concurrency),
+                                         max(delay, self.min_delay))
+        return self.states[key]
+
+    def observe(self, state, latency=None, error=False):
+        """Record one response (or failure) and update the slot's limits"""
+        alpha = self.smoothing
+        state.error_rate = alpha * float(error) + (1 - alpha) * state.error_rate
+        if latency is not None:
+            state.latency = latency if state.latency is None else alpha * latency + (1 - alpha) * state.latency
+
+        congested = (
+            error
+            or state.error_rate > self.max_error_rate
+            or (state.latency is not None and state.latency > self.target_latency)
+        )
+
+        if congested:
+            # Back off at most once per round-trip so one slow burst isn't punished repeatedly
+            now = self.clock()
+            if now - state.last_backoff >= (state.latency or 1.0):
+                state.window = max(1.0, state.window / 2)
+                state.delay = min(self.max_delay, max(state.delay * 2, self.min_delay, 0.25))
+                state.last_backoff = now
+        else:
+            # Additive increase: about +1 concurrency per full window of good responses
+            state.window = min(float(self.max_concurrency), state.window + 1.0 / state.window)
+            state.delay = max(self.min_delay, state.delay * 0.9)
+
+        return state
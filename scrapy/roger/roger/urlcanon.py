@@ -0,0 +1,91 @@
+"""
+URL canonicalization shared by the spider's dedup and the website processor.
+
+roger.pl serves the same page under www. and bare hosts, with and without
+trailing slashes and with tracking query strings. canonicalize_url maps all
+of those variants onto one string so each logical page is fetched and
+processed once.
+"""
+
+import re
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, quote, unquote
+
+# Query parameters that only carry tracking information
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'gclsrc', 'dclid', 'msclkid', 'yclid', 'igshid',
+    'mc_cid', 'mc_eid', '_ga', '_gl', '_hsenc', '_hsmi', 'ref', 'ref_src',
+}
+TRACKING_PREFIXES = ('utm_', 'pk_', 'hsa_')
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Characters left unescaped when re-quoting paths
+PATH_SAFE = "/:@!$&'()*+,;=-._~"
+
+# ... and query keys and values, where &, = and + are delimiters
+QUERY_SAFE = "/:@!$'()*,;-._~"
+
+
+def is_tracking_param(name):
+    """Check whether a query parameter name is a known tracking parameter"""
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonical_host(netloc, strip_www=True, scheme=None):
+    """
+    Lowercase a host, dropping userinfo and (optionally) www. With `scheme`,
+    the port is dropped too if it is that scheme's default.
+    """
+    host = netloc.rsplit('@', 1)[-1].lower()
+    if strip_www and host.startswith('www.'):
+        host = host[4:]
+
+    if scheme and ':' in host and not host.endswith(']'):
+        hostname, port = host.rsplit(':', 1)
+        if port.isdigit() and DEFAULT_PORTS.get(scheme.lower()) == int(port):
+            host = hostname
+    return host
+
+
+def canonical_path(path, trailing_slash='strip'):
+    """
+    Normalize a URL path: collapse repeated slashes, normalize percent-encoding
+    and apply the trailing-slash policy ('strip', 'add' or 'keep').
+    The root path is always '/'.
+    """
+    path = re.sub(r'/{2,}', '/', path or '/')
+    # An encoded slash is part of a segment, not a separator: keep it encoded
+    path = '%2F'.join(quote(unquote(part), safe=PATH_SAFE) for part in re.split('%2[fF]', path))
+    if not path.startswith('/'):
+        path = '/' + path
+
+    if path != '/':
+        if trailing_slash == 'strip':
+            path = path.rstrip('/') or '/'
+        elif trailing_slash == 'add' and not path.endswith('/'):
+            # Leave file-like paths (e.g. manual.pdf) alone
+            if '.' not in path.rsplit('/', 1)[-1]:
+                path += '/'
+    return path
+
+
+def canonicalize_url(url, trailing_slash='strip', strip_www=True):
+    """
+    Return the canonical form of a URL: lowercased scheme and host, no www.
+    prefix or default port, no fragment, no tracking parameters, a sorted
+    query string and a normalized path.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = canonical_host(parts.netloc, strip_www, scheme)
+
+    query_pairs = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not is_tracking_param(key)
+    ]
+    query = urlencode(sorted(query_pairs), safe=QUERY_SAFE, quote_via=quote)
+
+    path = canonical_path(parts.path, trailing_slash)
+    return urlunsplit((scheme, host, path, query, ''))
@@ -0,0 +1,179 @@
+"""
+Compact storage for the website tree built by the processors.
+
+Every page used to be a WebsiteNode with its own __dict__, an empty
+children list and common-blocks dict, and its text as a separate str (which
+Python stores at 2 bytes per character as soon as it holds one Polish
+letter). For sites of 100k+ pages NodeStore keeps instead:
+
+- the tree as flat integer arrays indexed by node id (parent, first child,
+  last child, next sibling),
+- the content and processed content of all nodes in one UTF-8 buffer,
+  addressed by (offset, length) arrays,
+- each node's last path segment and its category as interned strings,
+
+and WebsiteNode is a __slots__ handle onto it with the attributes the
+processors always used (path, title, content, children, parent, ...).
+"""
+
+import sys
+from array import array
+
+NO_NODE = -1
+
+
+class NodeStore:
+    """Tree structure and text of all nodes, indexed by integer node id"""
+
+    def __init__(self):
+        self.nodes = []
+        self.parents = array('i')
+        self.first_children = array('i')
+        self.last_children = array('i')
+        self.next_siblings = array('i')
+        self.segments = []  # Interned last path segment of each node
+        self.text = bytearray()  # UTF-8 content of all nodes
+        self.content_offsets = array('q')
+        self.content_lengths = array('q')
+        self.processed_offsets = array('q')
+        self.processed_lengths = array('q')  # -1 = no processed content
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def create(self, path="", title="", content="", category="", is_product=False, pages=None):
+        """Add a node and return its WebsiteNode handle"""
+        node_id = len(self.nodes)
+        node = WebsiteNode(self, node_id, path, title, category, is_product, pages)
+        self.nodes.append(node)
+        for column in (self.parents, self.first_children, self.last_children, self.next_siblings):
+            column.append(NO_NODE)
+        self.segments.append(sys.intern(path.rstrip("/").rsplit("/", 1)[-1]))
+        offset, length = self._append_text(content)
+        self.content_offsets.append(offset)
+        self.content_lengths.append(length)
+        self.processed_offsets.append(0)
+        self.processed_lengths.append(-1)
+        return node
+
+    def _append_text(self, text):
+        data = (text or "").encode("utf-8")
+        offset = len(self.text)
+        self.text += data
+        return offset, len(data)
+
+    def _read_text(self, offset, length):
+        return self.text[offset:offset + length].decode("utf-8")
+
+    def content(self, node_id):
+        return self._read_text(self.content_offsets[node_id], self.content_lengths[node_id])
+
+    def set_content(self, node_id, text):
+        offset = self.content_offsets[node_id]
+        data = (text or "").encode("utf-8")
+        shared = self.processed_lengths[node_id] >= 0 and self.processed_offsets[node_id] == offset
+        if len(data) <= self.content_lengths[node_id] and not shared:
+            # Overwrite in place; only growing text moves to the end of the
+            # buffer, leaving its old bytes unused
+            self.text[offset:offset + len(data)] = data
+            self.content_lengths[node_id] = len(data)
+        else:
+            self.content_offsets[node_id], self.content_lengths[node_id] = self._append_text(text)
+
+    def processed_content(self, node_id):
+        length = self.processed_lengths[node_id]
+        if length < 0:
+            return None
+        return self._read_text(self.processed_offsets[node_id], length)
+
+    def set_processed_content(self, node_id, text):
+        if text is None:
+            self.processed_lengths[node_id] = -1
+        elif text == self.content(node_id):
+            # Unchanged by block replacement: share the content bytes
+            self.processed_offsets[node_id] = self.content_offsets[node_id]
+            self.processed_lengths[node_id] = self.content_lengths[node_id]
+        else:
+            self.processed_offsets[node_id], self.processed_lengths[node_id] = self._append_text(text)
+
+    def add_child(self, parent_id, child_id):
+        """Append a node to another's children"""
+        self.parents[child_id] = parent_id
+        last = self.last_children[parent_id]
+        if last == NO_NODE:
+            self.first_children[parent_id] = child_id
+        else:
+            self.next_siblings[last] = child_id
+        self.last_children[parent_id] = child_id
+
+    def child_ids(self, node_id):
+        child = self.first_children[node_id]
+        while child != NO_NODE:
+            yield child
+            child = self.next_siblings[child]
+
+
+class WebsiteNode:
+    __slots__ = ("store", "id", "path", "title", "category", "is_product", "pages",
+                 "full_url", "rank", "anchors", "common_blocks")
+
+    def __init__(self, store, node_id, path="", title="", category="", is_product=False, pages=None):
+        self.store = store
+        self.id = node_id
+        self.path = path
+        self.title = title
+        self.category = sys.intern(category or "")
+        self.is_product = is_product
+        self.pages = pages  # Page spans of PDF text: [{'page', 'start', 'end'}]
+        self.full_url = None  # Only used for the master node
+        self.rank = None  # Link-graph PageRank, scaled so the average page has 1.0
+        self.anchors = ()  # Most common anchor texts of the links into this page
+        self.common_blocks = None  # Block id -> name, created on first use
+
+    @property
+    def content(self):
+        return self.store.content(self.id)
+
+    @content.setter
+    def content(self, text):
+        self.store.set_content(self.id, text)
+
+    @property
+    def processed_content(self):
+        return self.store.processed_content(self.id)
+
+    @processed_content.setter
+    def processed_content(self, text):
+        self.store.set_processed_content(self.id, text)
+
+    @property
+    def children(self):
+        nodes = self.store.nodes
+        return [nodes[child] for child in self.store.child_ids(self.id)]
+
+    @property
+    def parent(self):
+        parent = self.store.parents[self.id]
+        return None if parent == NO_NODE else self.store.nodes[parent]
+
+    @property
+    def segment(self):
+        return self.store.segments[self.id]
+
+    @property
+    def common_blocks_used(self):
+        return self.common_blocks or {}
+
+    def use_common_block(self, block_id, name):
+        """Record that a common block was cut out of this node's content"""
+        if self.common_blocks is None:
+            self.common_blocks = {}
+        self.common_blocks[block_id] = name
+
+    def add_child(self, child_node):
+        """Add a child node and set its parent reference"""
+        self.store.add_child(self.id, child_node.id)
+
+    def __repr__(self):
+        """String representation of the node"""
+        return f"Node(path='{self.path}', title='{self.title}', children={len(self.children)})"
@@ -4,34 +4,32 @@ import os
 from urllib.parse import urlparse
 from collections import defaultdict
 
-class WebsiteNode:
-    def __init__(self, path="", title="", content="", category="", is_product=False):
-        self.path = path
-        self.title = title
-        self.content = content
-        self.category = category
-        self.is_product = is_product
-        self.children = []
-        self.parent = None
-        self.full_url = None  # Only used for the master node
-        self.common_blocks_used = {}
-        self.processed_content = None
-    
-    def add_child(self, child_node):
-        """Add a child node and set its parent reference"""
-        self.children.append(child_node)
-        child_node.parent = self
-    
-    def __repr__(self):
-        """String representation of the node"""
-        return f"Node(path='{self.path}', title='{self.title}', children={len(self.children)})"
+# Share the feed reader and URL canonicalization with the crawler, so path
+# keys match its dedup; the crawler project must be importable
+# (PYTHONPATH=../scrapy/roger)
+try:
+    from roger.feed import iter_items
+    from roger.urlcanon import canonicalize_url
+except ImportError as e:
+    raise ImportError("path_based_processor needs the crawler's 'roger' package: "
+                      "add scrapy/roger to PYTHONPATH (PYTHONPATH=../scrapy/roger)") from e
+from link_graph import anchor_texts, np, pagerank
+from node_store import NodeStore
+
+ANCHOR_TEXTS_PER_NODE = 10  # Distinct anchor texts kept per node for the search index
+# Page fields read after the nodes are created; the rest (title, category,
+# download links, timestamps, ...) is in the nodes or unused
+PAGE_FIELDS_KEPT = ("url", "content", "links", "template_blocks")
 
 class PathBasedWebsiteProcessor:
-    def __init__(self, input_file, output_file):
+    def __init__(self, input_file, output_file, blob_dir=None, templates_files=None):
         self.input_file = input_file
         self.output_file = output_file
+        self.blob_dir = blob_dir  # Crawler blob store holding full PDF text
+        self.templates_files = templates_files or []  # Template blocks the crawler stripped from pages
         self.pages = []
         self.common_blocks = {}
+        self.nodes = NodeStore()
         self.master_node = None
         self.nodes_by_path = {}
         self.nodes_by_url = {}
@@ -53,6 +51,9 @@ class PathBasedWebsiteProcessor:
         # Build the tree structure
         self._build_tree_structure()
         
+        # Rank nodes and collect their anchor texts from the crawled link graph
+        self._process_link_graph()
+        
         # Extract common blocks
         self._extract_common_blocks()
         
@@ -68,6 +69,12 @@ class PathBasedWebsiteProcessor:
     def _load_data(self):
         """Load and parse the JSON data from the input file"""
         try:
+            # JSON-lines feeds (a .jsonl file or a directory of compressed
+            # shards) are streamed, with blob references resolved
+            if os.path.isdir(self.input_file) or re.search(r'\.jsonl(\.gz|\.zst)?$', self.input_file):
+                self.pages = list(iter_items(self.input_file, self.blob_dir))
+                return True
+            
             with open(self.input_file, 'r', encoding='utf-8') as f:
                 content = f.read()
                 self.pages = json.loads(content)
@@ -78,13 +85,25 @@ class PathBasedWebsiteProcessor:
     
     def _create_nodes(self):
         """Create nodes for all pages"""
+        # Canonicalize URLs so www./bare hosts, trailing slashes and tracking
+        # parameters collapse onto one page, and keep the first copy of each
+        unique_pages = {}
+        for page in self.pages:
+            page["url"] = canonicalize_url(page["url"])
+            unique_pages.setdefault(page["url"], page)
+        
+        duplicate_count = len(self.pages) - len(unique_pages)
+        if duplicate_count:
+            print(f"Dropped {duplicate_count} duplicate pages after URL canonicalization")
+        self.pages = list(unique_pages.values())
+        
         # Extract domain from the first page
         first_url = self.pages[0]["url"]
         parsed_url = urlparse(first_url)
         self.domain = parsed_url.netloc
         
         # Create the master (root) node
-        self.master_node = WebsiteNode(
+        self.master_node = self.nodes.create(
             path="/",
             title=f"{self.domain} Homepage",
             category="root"
@@ -105,31 +124,42 @@ class PathBasedWebsiteProcessor:
                 # Update master node with homepage data if available
                 if url == f"https://{self.domain}/":
                     self.master_node.title = page["title"]
-                    self.master_node.content = page["content"]
+                    self.master_node.content = page.pop("content")
                     self.master_node.category = page["category"]
                     self.master_node.is_product = page["is_product"]
                 continue
             
-            # Create path
+            # Canonical URLs already carry a normalized path
             path = parsed_url.path
-            if not path.startswith("/"):
-                path = "/" + path
             
             # Create node
-            node = WebsiteNode(
+            # The node store keeps the only copy of the text
+            node = self.nodes.create(
                 path=path,
                 title=page["title"],
-                content=page["content"],
+                content=page.pop("content"),
                 category=page.get("category", ""),
-                is_product=page.get("is_product", False)
+                is_product=page.get("is_product", False),
+                pages=page.get("pages") or None
             )
             
+            # Template blocks the crawler left out of this page's content
+            for block_id in page.get("template_blocks", []):
+                node.use_common_block(f"template_{block_id}", f"site_template_{block_id}")
+            
             # Store in lookup dictionaries
             self.nodes_by_path[path] = node
             self.nodes_by_url[url] = node
         
+        self.pages = [{key: page[key] for key in PAGE_FIELDS_KEPT if key in page} for page in self.pages]
         print(f"Created {len(self.nodes_by_path)} nodes")
     
+    def _page_content(self, page):
+        """Return a page's text; pages that became nodes keep it in the node store only"""
+        if "content" in page:
+            return page["content"]
+        return self.nodes_by_url[page["url"]].content
+    
     def _build_tree_structure(self):
         """Build the tree structure based on paths"""
         # Process all nodes except the master node
@@ -148,8 +178,9 @@ class PathBasedWebsiteProcessor:
                     # If we're down to the top level, the parent is the root
                     parent_path = "/"
                 else:
-                    # Otherwise, try the path up to this level
-                    parent_path = "/" + "/".join(path_parts[:i]) + "/"
+                    # Otherwise, try the path up to this level (canonical
+                    # paths carry no trailing slash)
+                    parent_path = "/" + "/".join(path_parts[:i])
                 
                 if parent_path in self.nodes_by_path:
                     parent_node = self.nodes_by_path[parent_path]
@@ -181,229 +212,304 @@ class PathBasedWebsiteProcessor:
         if duplicate_paths:
             print(f"Warning: Found {len(duplicate_paths)} duplicate paths")
     
+    def _process_link_graph(self):
+        """
+        Collect the anchor texts of the links into every node and compute
+        its PageRank from the internal links the crawler recorded
+        """
+        if not any(page.get("links") for page in self.pages):
+            return
+        
+        nodes = list(self.nodes_by_path.values())
+        index = {id(node): i for i, node in enumerate(nodes)}
+        
+        # Links point at canonical URLs, so the URL path is the node path
+        edges = set()
+        anchors = defaultdict(list)
+        for page in self.pages:
+            source = self.nodes_by_path.get(urlparse(page["url"]).path or "/")
+            if source is None:
+                continue
+            for link in page.get("links", []):
+                target = self.nodes_by_path.get(urlparse(canonicalize_url(link["url"])).path or "/")
+                if target is not None and target is not source:
+                    edges.add((index[id(source)], index[id(target)]))
+                    anchors[id(target)].append(link.get("text"))
+            page.pop("links", None)  # Only needed for the link graph
+        
+        for node in nodes:
+            node.anchors = anchor_texts(anchors.get(id(node), ()), ANCHOR_TEXTS_PER_NODE)
+        print(f"Collected anchor texts for {sum(1 for node in nodes if node.anchors)} nodes")
+        
+        if not edges:
+            return
+        if np is None:
+            print("Skipping link-graph ranking: needs numpy and scipy")
+            return
+        sources, targets = zip(*edges)
+        ranks = pagerank(sources, targets, len(nodes))
+        for node, rank in zip(nodes, ranks * len(nodes)):
+            node.rank = round(float(rank), 4)
+        
+        top = sorted(nodes, key=lambda node: node.rank, reverse=True)[:5]
+        print(f"Ranked {len(nodes)} nodes over {len(edges)} links; top: "
+              + ", ".join(f"{node.path} ({node.rank})" for node in top))
+    
     def _extract_common_blocks(self):
-    """Intelligently find and extract common content blocks"""
-    # Start with the predefined blocks (header, footer, etc.)
-    self._extract_predefined_blocks()
+        """Intelligently find and extract common content blocks"""
+        # Blocks the crawler already recognized as the site template
+        self._load_template_blocks()
+        
+        # Then the predefined blocks (header, footer, etc.)
+        self._extract_predefined_blocks()
     
-    # Then intelligently detect other common patterns
-    self._detect_repeated_content_blocks()
+        # Then intelligently detect other common patterns
+        self._detect_repeated_content_blocks()
     
-    print(f"Total common blocks extracted: {len(self.common_blocks)}")
+        print(f"Total common blocks extracted: {len(self.common_blocks)}")
 
-def _extract_predefined_blocks(self):
-    """Extract commonly known blocks like headers and footers"""
-    # Find the header (common at the start of pages)
-    header_pattern = "Przykłady instalacji produktów Roger"
-    header_pages = [page for page in self.pages if page["content"].startswith(header_pattern)]
-    
-    if len(header_pages) > len(self.pages) / 2:
-        # This is a common header, extract it
-        sample_page = header_pages[0]["content"]
-        header_end = sample_page.find("\n") if "\n" in sample_page else 38
-        header_content = sample_page[:header_end].strip()
-        
-        self.common_blocks["header"] = {
-            "name": "site_header",
-            "type": "header",
-            "content": header_content,
-            "occurrences": [page["url"] for page in header_pages]
-        }
+    def _load_template_blocks(self):
+        """Add the template blocks stripped at crawl time as common blocks"""
+        if not self.templates_files:
+            return
+        
+        # One store per crawl worker in a distributed crawl (roger.distributed)
+        sites = []
+        for templates_file in self.templates_files:
+            with open(templates_file, 'r', encoding='utf-8') as f:
+                sites.extend(json.load(f).values())
+        
+        occurrences = defaultdict(list)
+        for page in self.pages:
+            for block_id in page.get("template_blocks", []):
+                occurrences[block_id].append(page["url"])
+        
+        for site in sites:
+            for block_id, block in site["templates"].items():
+                self.common_blocks[f"template_{block_id}"] = {
+                    "name": f"site_template_{block_id}",
+                    "type": "template",
+                    "content": block["text"],
+                    "element_path": block["path"],
+                    "occurrences": occurrences[block_id]
+                }
+        
+        template_count = len([key for key in self.common_blocks if key.startswith("template_")])
+        print(f"Loaded {template_count} template blocks stripped by the crawler")
+
+    def _extract_predefined_blocks(self):
+        """Extract commonly known blocks like headers and footers"""
+        # Find the header (common at the start of pages)
+        header_pattern = "Przykłady instalacji produktów Roger"
+        header_pages = [page for page in self.pages if self._page_content(page).startswith(header_pattern)]
+    
+        if len(header_pages) > len(self.pages) / 2:
+            # This is a common header, extract it
+            sample_page = self._page_content(header_pages[0])
+            header_end = sample_page.find("\n") if "\n" in sample_page else 38
+            header_content = sample_page[:header_end].strip()
+        
+            self.common_blocks["header"] = {
+                "name": "site_header",
+                "type": "header",
+                "content": header_content,
+                "occurrences": [page["url"] for page in header_pages]
+            }
         
-        print(f"Identified common header used on {len(header_pages)} pages")
+            print(f"Identified common header used on {len(header_pages)} pages")
     
-    # Find the footer (common at the end of pages)
-    footer_pattern = "Newsletter     Bądź na bieżąco   Na skróty       Wsparcie       Kontakt   Komunikaty"
-    footer_pages = [page for page in self.pages if page["content"].endswith(footer_pattern)]
+        # Find the footer (common at the end of pages)
+        footer_pattern = "Newsletter     Bądź na bieżąco   Na skróty       Wsparcie       Kontakt   Komunikaty"
+        footer_pages = [page for page in self.pages if self._page_content(page).endswith(footer_pattern)]
     
-    if len(footer_pages) > len(self.pages) / 2:
-        # This is a common footer
-        sample_page = footer_pages[0]["content"]
-        footer_start = sample_page.rfind("Newsletter")
-        if footer_start != -1:
-            footer_content = sample_page[footer_start:].strip()
+        if len(footer_pages) > len(self.pages) / 2:
+            # This is a common footer
+            sample_page = self._page_content(footer_pages[0])
+            footer_start = sample_page.rfind("Newsletter")
+            if footer_start != -1:
+                footer_content = sample_page[footer_start:].strip()
             
-            self.common_blocks["footer"] = {
-                "name": "site_footer",
-                "type": "footer",
-                "content": footer_content,
-                "occurrences": [page["url"] for page in footer_pages]
-            }
+                self.common_blocks["footer"] = {
+                    "name": "site_footer",
+                    "type": "footer",
+                    "content": footer_content,
+                    "occurrences": [page["url"] for page in footer_pages]
+                }
             
-            print(f"Identified common footer used on {len(footer_pages)} pages")
+                print(f"Identified common footer used on {len(footer_pages)} pages")
     
-    # Extract common "przydatne linki" section
-    links_pattern = "Przydatne linki"
-    links_pages = [page for page in self.pages if links_pattern in page["content"]]
+        # Extract common "przydatne linki" section
+        links_pattern = "Przydatne linki"
+        links_pages = [page for page in self.pages if links_pattern in self._page_content(page)]
     
-    if len(links_pages) > 2:
-        sample_page = links_pages[0]["content"]
-        links_start = sample_page.find(links_pattern)
-        links_end = sample_page.find("Newsletter", links_start) if "Newsletter" in sample_page else -1
+        if len(links_pages) > 2:
+            sample_page = self._page_content(links_pages[0])
+            links_start = sample_page.find(links_pattern)
+            links_end = sample_page.find("Newsletter", links_start) if "Newsletter" in sample_page else -1
         
-        if links_start != -1 and links_end != -1:
-            links_content = sample_page[links_start:links_end].strip()
+            if links_start != -1 and links_end != -1:
+                links_content = sample_page[links_start:links_end].strip()
             
-            self.common_blocks["useful_links"] = {
-                "name": "useful_links",
-                "type": "links_section",
-                "content": links_content,
-                "occurrences": [page["url"] for page in links_pages]
-            }
+                self.common_blocks["useful_links"] = {
+                    "name": "useful_links",
+                    "type": "links_section",
+                    "content": links_content,
+                    "occurrences": [page["url"] for page in links_pages]
+                }
             
-            print(f"Identified predefined useful links section on {len(links_pages)} pages")
+                print(f"Identified predefined useful links section on {len(links_pages)} pages")
 
-def _detect_repeated_content_blocks(self):
-    """Intelligently detect repeated content blocks across pages"""
-    import re
-    import difflib
-    from collections import defaultdict
-    
-    # Parameters for content block detection
-    MIN_BLOCK_LENGTH = 40        # Minimum characters for a content block
-    MIN_OCCURRENCES = 3          # Minimum number of pages a block must appear on
-    SIMILARITY_THRESHOLD = 0.85  # How similar blocks need to be (0-1)
-    
-    # Step 1: Split content into potential blocks
-    all_chunks = []
-    
-    for page in self.pages:
-        content = page["content"]
-        url = page["url"]
-        
-        # Skip if this page has no content
-        if not content:
-            continue
+    def _detect_repeated_content_blocks(self):
+        """Intelligently detect repeated content blocks across pages"""
+        import re
+        import difflib
+        from collections import defaultdict
+    
+        # Parameters for content block detection
+        MIN_BLOCK_LENGTH = 40        # Minimum characters for a content block
+        MIN_OCCURRENCES = 3          # Minimum number of pages a block must appear on
+        SIMILARITY_THRESHOLD = 0.85  # How similar blocks need to be (0-1)
+    
+        # Step 1: Split content into potential blocks
+        all_chunks = []
+    
+        for page in self.pages:
+            content = self._page_content(page)
+            url = page["url"]
+        
+            # Skip if this page has no content
+            if not content:
+                continue
             
-        # Split content by common delimiters
-        # This is more sophisticated than just splitting on newlines - we look for 
-        # section breaks, paragraph breaks, and other structural elements
-        potential_delimiters = [
-            r'\n\s*\n',             # Double newline (paragraph break)
-            r'\s{3,}',              # Multiple spaces (often used for formatting)
-            r'(?<=[.!?])\s{2,}',    # Sentence end followed by multiple spaces
-            r'\s+(?=[A-Z][a-z]+\s)', # Space followed by a capitalized word (likely a new section)
-        ]
-        
-        # Create a combined pattern
-        split_pattern = '|'.join(potential_delimiters)
-        chunks = re.split(split_pattern, content)
-        
-        # Process each chunk
-        for chunk in chunks:
-            # Clean and normalize the chunk
-            chunk = chunk.strip()
+            # Split content by common delimiters
+            # This is more sophisticated than just splitting on newlines - we look for 
+            # section breaks, paragraph breaks, and other structural elements
+            potential_delimiters = [
+                r'\n\s*\n',             # Double newline (paragraph break)
+                r'\s{3,}',              # Multiple spaces (often used for formatting)
+                r'(?<=[.!?])\s{2,}',    # Sentence end followed by multiple spaces
+                r'\s+(?=[A-Z][a-z]+\s)', # Space followed by a capitalized word (likely a new section)
+            ]
+        
+            # Create a combined pattern
+            split_pattern = '|'.join(potential_delimiters)
+            chunks = re.split(split_pattern, content)
+        
+            # Process each chunk
+            for chunk in chunks:
+                # Clean and normalize the chunk
+                chunk = chunk.strip()
             
-            # Skip empty or very short chunks
-            if not chunk or len(chunk) < MIN_BLOCK_LENGTH:
-                continue
+                # Skip empty or very short chunks
+                if not chunk or len(chunk) < MIN_BLOCK_LENGTH:
+                    continue
                 
-            all_chunks.append({
-                "url": url,
-                "content": chunk,
-                "length": len(chunk)
-            })
-    
-    print(f"Extracted {len(all_chunks)} content chunks for analysis")
-    
-    # Step 2: Find similar chunks
-    # Group chunks that likely represent the same content block
-    chunk_groups = []
-    processed_indices = set()
-    
-    for i, chunk1 in enumerate(all_chunks):
-        if i in processed_indices:
-            continue
+                all_chunks.append({
+                    "url": url,
+                    "content": chunk,
+                    "length": len(chunk)
+                })
+    
+        print(f"Extracted {len(all_chunks)} content chunks for analysis")
+    
+        # Step 2: Find similar chunks
+        # Group chunks that likely represent the same content block
+        chunk_groups = []
+        processed_indices = set()
+    
+        for i, chunk1 in enumerate(all_chunks):
+            if i in processed_indices:
+                continue
             
-        # Find similar chunks
-        similar_chunks = []
-        urls_in_group = set([chunk1["url"]])
+            # Find similar chunks
+            similar_chunks = []
+            urls_in_group = set([chunk1["url"]])
         
-        for j, chunk2 in enumerate(all_chunks):
-            if i == j or j in processed_indices:
-                continue
+            for j, chunk2 in enumerate(all_chunks):
+                if i == j or j in processed_indices:
+                    continue
                 
-            # Skip chunks from the same page
-            if chunk2["url"] in urls_in_group:
-                continue
+                # Skip chunks from the same page
+                if chunk2["url"] in urls_in_group:
+                    continue
                 
-            # Calculate similarity
-            similarity = difflib.SequenceMatcher(None, chunk1["content"], chunk2["content"]).ratio()
+                # Calculate similarity
+                similarity = difflib.SequenceMatcher(None, chunk1["content"], chunk2["content"]).ratio()
             
-            if similarity >= SIMILARITY_THRESHOLD:
-                similar_chunks.append(j)
-                urls_in_group.add(chunk2["url"])
-                processed_indices.add(j)
-        
-        # If this chunk appears on multiple pages, consider it a repeated block
-        if len(similar_chunks) >= MIN_OCCURRENCES - 1:  # -1 because we also count chunk1
-            chunk_group = {
-                "representative": chunk1,
-                "similar_indices": similar_chunks,
-                "occurrences": len(similar_chunks) + 1
+                if similarity >= SIMILARITY_THRESHOLD:
+                    similar_chunks.append(j)
+                    urls_in_group.add(chunk2["url"])
+                    processed_indices.add(j)
+        
+            # If this chunk appears on multiple pages, consider it a repeated block
+            if len(similar_chunks) >= MIN_OCCURRENCES - 1:  # -1 because we also count chunk1
+                chunk_group = {
+                    "representative": chunk1,
+                    "similar_indices": similar_chunks,
+                    "occurrences": len(similar_chunks) + 1
+                }
+                chunk_groups.append(chunk_group)
+                processed_indices.add(i)
+    
+        print(f"Found {len(chunk_groups)} potential repeated content blocks")
+    
+        # Step 3: Classify and add repeated blocks
+        for i, group in enumerate(chunk_groups):
+            # Skip very small groups (likely false positives)
+            if group["occurrences"] < MIN_OCCURRENCES:
+                continue
+            
+            # Get the representative chunk
+            rep_chunk = group["representative"]
+        
+            # Try to classify what type of content this is
+            block_type = self._classify_content_block(rep_chunk["content"])
+        
+            # Create a name for this block
+            block_name = f"{block_type}_{i+1}"
+        
+            # Get all URLs where this block appears
+            occurrence_urls = [rep_chunk["url"]]
+            for idx in group["similar_indices"]:
+                occurrence_urls.append(all_chunks[idx]["url"])
+        
+            # Add to common blocks
+            block_id = f"auto_block_{i+1}"
+            self.common_blocks[block_id] = {
+                "name": block_name,
+                "type": block_type,
+                "content": rep_chunk["content"],
+                "occurrences": occurrence_urls,
+                "auto_detected": True,
+                "confidence": group["occurrences"] / len(self.pages)  # Confidence score
             }
-            chunk_groups.append(chunk_group)
-            processed_indices.add(i)
-    
-    print(f"Found {len(chunk_groups)} potential repeated content blocks")
     
-    # Step 3: Classify and add repeated blocks
-    for i, group in enumerate(chunk_groups):
-        # Skip very small groups (likely false positives)
-        if group["occurrences"] < MIN_OCCURRENCES:
-            continue
-            
-        # Get the representative chunk
-        rep_chunk = group["representative"]
-        
-        # Try to classify what type of content this is
-        block_type = self._classify_content_block(rep_chunk["content"])
-        
-        # Create a name for this block
-        block_name = f"{block_type}_{i+1}"
-        
-        # Get all URLs where this block appears
-        occurrence_urls = [rep_chunk["url"]]
-        for idx in group["similar_indices"]:
-            occurrence_urls.append(all_chunks[idx]["url"])
-        
-        # Add to common blocks
-        block_id = f"auto_block_{i+1}"
-        self.common_blocks[block_id] = {
-            "name": block_name,
-            "type": block_type,
-            "content": rep_chunk["content"],
-            "occurrences": occurrence_urls,
-            "auto_detected": True,
-            "confidence": group["occurrences"] / len(self.pages)  # Confidence score
+        print(f"Added {sum(1 for block in self.common_blocks.values() if block.get('auto_detected', False))} auto-detected blocks")
+
+    def _classify_content_block(self, content):
+        """Classify the type of content in a block"""
+        content_lower = content.lower()
+    
+        # Common content types and their detection patterns
+        patterns = {
+            "navigation": [r'rozwiązania', r'produkty', r'menu', r'zastosowania'],
+            "product_list": [r'racs', r'produkty', r'powiązane produkty'],
+            "contact_info": [r'kontakt', r'skontaktuj', r'wsparcie'],
+            "links_section": [r'przydatne linki', r'gdzie kupić', r'pobierz'],
+            "form_section": [r'formularz', r'rejestracja', r'logowanie'],
+            "intro_section": [r'wprowadzenie', r'o produkcie', r'charakterystyka'],
+            "case_study": [r'przypadek', r'realizacja', r'wdrożenie', r'case study'],
+            "key_features": [r'charakterystyka', r'cechy', r'funkcje', r'dostępne'],
+            "download_section": [r'pobierz', r'download', r'pliki']
         }
     
-    print(f"Added {sum(1 for block in self.common_blocks.values() if block.get('auto_detected', False))} auto-detected blocks")
-
-def _classify_content_block(self, content):
-    """Classify the type of content in a block"""
-    content_lower = content.lower()
-    
-    # Common content types and their detection patterns
-    patterns = {
-        "navigation": [r'rozwiązania', r'produkty', r'menu', r'zastosowania'],
-        "product_list": [r'racs', r'produkty', r'powiązane produkty'],
-        "contact_info": [r'kontakt', r'skontaktuj', r'wsparcie'],
-        "links_section": [r'przydatne linki', r'gdzie kupić', r'pobierz'],
-        "form_section": [r'formularz', r'rejestracja', r'logowanie'],
-        "intro_section": [r'wprowadzenie', r'o produkcie', r'charakterystyka'],
-        "case_study": [r'przypadek', r'realizacja', r'wdrożenie', r'case study'],
-        "key_features": [r'charakterystyka', r'cechy', r'funkcje', r'dostępne'],
-        "download_section": [r'pobierz', r'download', r'pliki']
-    }
-    
-    # Check each pattern against the content
-    for block_type, keywords in patterns.items():
-        if any(re.search(pattern, content_lower) for pattern in keywords):
-            return block_type
-    
-    # If no specific type is detected, use a generic content_block type
-    return "content_block"
+        # Check each pattern against the content
+        for block_type, keywords in patterns.items():
+            if any(re.search(pattern, content_lower) for pattern in keywords):
+                return block_type
+    
+        # If no specific type is detected, use a generic content_block type
+        return "content_block"
     
     def _replace_common_blocks_in_content(self):
         """Replace common blocks in node content with references"""
@@ -412,6 +518,10 @@ def _classify_content_block(self, content):
             # Skip nodes without content
             if not hasattr(page, 'content') or not page.content:
                 continue
+            
+            # Documents keep their text as is so page offsets stay valid
+            if page.pages:
+                continue
                 
             content = page.content
             
@@ -422,7 +532,7 @@ def _classify_content_block(self, content):
                 # Check if this page uses this block
                 if url in block["occurrences"] and block_content in content:
                     # Mark this block as used on this page
-                    page.common_blocks_used[block_id] = block["name"]
+                    page.use_common_block(block_id, block["name"])
                     
                     # Replace the content with a reference
                     content = content.replace(block_content, f"[{block['name']}]")
@@ -473,6 +583,16 @@ def _classify_content_block(self, content):
         elif node.content:
             result["content"] = node.content
         
+        # Add link-graph rank and anchor texts
+        if node.rank is not None:
+            result["rank"] = node.rank
+        if node.anchors:
+            result["anchors"] = node.anchors
+        
+        # Add page spans of document text
+        if node.pages:
+            result["pages"] = node.pages
+        
         # Add common blocks used
         if node.common_blocks_used:
             result["common_blocks"] = node.common_blocks_used
@@ -489,10 +609,15 @@ def main():
     parser = argparse.ArgumentParser(description='Process website crawler output into a path-based structure')
     parser.add_argument('input_file', help='Input JSON file with crawler output')
     parser.add_argument('output_file', help='Output file for processed structure')
+    parser.add_argument('--blob-dir', help='Crawler blob store directory, to restore full PDF text '
+                                           '(default: BLOB_STORE_DIR next to the feed)')
+    parser.add_argument('--templates', nargs='+',
+                        help='Crawler template store(s) (TEMPLATE_STORE_PATH, one per worker of a distributed crawl), '
+                             'to keep stripped template blocks')
     
     args = parser.parse_args()
     
-    processor = PathBasedWebsiteProcessor(args.input_file, args.output_file)
+    processor = PathBasedWebsiteProcessor(args.input_file, args.output_file, args.blob_dir, args.templates)
     processor.process()
 
 if __name__ == "__main__":
@@ -22,8 +22,10 @@ class PathBasedVisualizer:
         self.master_node = self.website["master_node"]
         self.domain = self.website["domain"]
         
-        # Build a flat path map for quick lookups
+        # Build a flat path map for quick lookups, and the number of nodes
+        # in each path's subtree (the node itself included)
         self.nodes_by_path = {}
+        self.subtree_sizes = {}
         self._build_path_map(self.master_node)
         
         # Keep track of navigation history
@@ -32,7 +34,10 @@ class PathBasedVisualizer:
         self.history_position = 0
     
     def _build_path_map(self, node, parent_path=None):
-        """Recursively build a map of all nodes by path with enhanced content extraction"""
+        """
+        Recursively build a map of all nodes by path with enhanced content
+        extraction. Returns the number of nodes in the subtree.
+        """
         if "path" in node:
             self.nodes_by_path[node["path"]] = node
             
@@ -61,9 +66,14 @@ class PathBasedVisualizer:
             
             # Store the searchable content
             node["_searchable_content"] = " ".join(searchable_content)
-            
+        
+        size = 1
         for child in node.get("children", []):
-            self._build_path_map(child, node["path"] if "path" in node else None)
+            size += self._build_path_map(child, node["path"] if "path" in node else None)
+        
+        if "path" in node:
+            self.subtree_sizes[node["path"]] = size
+        return size
     
     def display_summary(self):
         """Display a summary of the website structure"""
@@ -105,7 +115,7 @@ class PathBasedVisualizer:
         """Recursively add nodes to the tree"""
         if max_depth is not None and current_depth >= max_depth:
             if node.get("children", []):
-                tree.add(f"... ({len(node['children'])} more nodes)")
+                tree.add(f"... ({self._count_all_descendants(node)} more nodes)")
             return
         
         # Add child nodes
@@ -333,7 +343,7 @@ class PathBasedVisualizer:
         
         # Show children
         if "children" in node and node["children"]:
-            self.console.print("\n[bold]Subpaths:[/bold]")
+            self.console.print(f"\n[bold]Subpaths:[/bold] ({self._count_all_descendants(node)} pages in this section)")
             for idx, child in enumerate(node["children"], 1):
                 self.console.print(f"  {idx}. {child.get('title', 'Untitled')} (path: {child['path']})")
     
@@ -467,7 +477,7 @@ class PathBasedVisualizer:
         
         # Check if we've reached max depth
         if max_depth is not None and current_depth > max_depth:
-            remaining = len(self._count_all_descendants(node))
+            remaining = self._count_all_descendants(node)
             if remaining > 0:
                 line = f"{prefix}└── ... ({remaining} more items not shown)"
                 self.console.print(line)
@@ -538,16 +548,9 @@ class PathBasedVisualizer:
 
     def _count_all_descendants(self, node):
         """Count all descendants of a node"""
-        descendants = []
-        
-        if not node.get("children"):
-            return descendants
-            
-        for child in node["children"]:
-            descendants.append(child)
-            descendants.extend(self._count_all_descendants(child))
-            
-        return descendants
+        if "path" in node:
+            return self.subtree_sizes[node["path"]] - 1
+        return sum(self._count_all_descendants(child) + 1 for child in node.get("children", []))
 
     def interactive_mode(self):
         """Run in interactive mode allowing user to explore the website structure"""
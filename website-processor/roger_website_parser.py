@@ -7,28 +7,10 @@ from urllib.parse import urlparse
 from collections import defaultdict
 import difflib
 from enhanced_logging import add_logging_to_processor, add_progress_tracking
+from node_store import NodeStore
 
-class WebsiteNode:
-    def __init__(self, path="", title="", content="", category="", is_product=False):
-        self.path = path
-        self.title = title
-        self.content = content
-        self.category = category
-        self.is_product = is_product
-        self.children = []
-        self.parent = None
-        self.full_url = None  # Only used for the master node
-        self.common_blocks_used = {}
-        self.processed_content = None
-    
-    def add_child(self, child_node):
-        """Add a child node and set its parent reference"""
-        self.children.append(child_node)
-        child_node.parent = self
-    
-    def __repr__(self):
-        """String representation of the node"""
-        return f"Node(path='{self.path}', title='{self.title}', children={len(self.children)})"
+# Page fields read after the nodes are created; the rest is in the nodes
+PAGE_FIELDS_KEPT = ("url", "content")
 
 class PathBasedWebsiteProcessor:
     def __init__(self, input_file, output_file):
@@ -36,6 +18,7 @@ class PathBasedWebsiteProcessor:
         self.output_file = output_file
         self.pages = []
         self.common_blocks = {}
+        self.nodes = NodeStore()
         self.master_node = None
         self.nodes_by_path = {}
         self.nodes_by_url = {}
@@ -88,14 +71,14 @@ class PathBasedWebsiteProcessor:
         """Load and parse the JSON data from the input file"""
         try:
             self.logger.info(f"Loading data from {self.input_file}")
-        with open(self.input_file, 'r', encoding='utf-8') as f:
-            content = f.read()
+            with open(self.input_file, 'r', encoding='utf-8') as f:
+                content = f.read()
                 self.pages = json.loads(content)
             self.logger.info(f"Successfully parsed JSON with {len(self.pages)} pages")
             return True
         except (json.JSONDecodeError, FileNotFoundError) as e:
             self.logger.error(f"Error loading data: {e}")
-                return False
+            return False
     
     def _create_nodes(self):
         """Create nodes for all pages"""
@@ -108,7 +91,7 @@ class PathBasedWebsiteProcessor:
         self.logger.info(f"Domain detected: {self.domain}")
         
         # Create the master (root) node
-        self.master_node = WebsiteNode(
+        self.master_node = self.nodes.create(
             path="/",
             title=f"{self.domain} Homepage",
             category="root"
@@ -130,7 +113,7 @@ class PathBasedWebsiteProcessor:
                 # Update master node with homepage data if available
                 if url == f"https://{self.domain}/":
                     self.master_node.title = page["title"]
-                    self.master_node.content = page["content"]
+                    self.master_node.content = page.pop("content")
                     self.master_node.category = page["category"]
                     self.master_node.is_product = page["is_product"]
                     self.logger.debug(f"Updated master node with data from {url}")
@@ -141,11 +124,11 @@ class PathBasedWebsiteProcessor:
             if not path.startswith("/"):
                 path = "/" + path
             
-            # Create node
-            node = WebsiteNode(
+            # Create node; the node store keeps the only copy of the text
+            node = self.nodes.create(
                 path=path,
                 title=page["title"],
-                content=page["content"],
+                content=page.pop("content"),
                 category=page.get("category", ""),
                 is_product=page.get("is_product", False)
             )
@@ -159,8 +142,15 @@ class PathBasedWebsiteProcessor:
             if created_count % 500 == 0:
                 self.logger.info(f"Created {created_count} nodes so far...")
         
+        self.pages = [{key: page[key] for key in PAGE_FIELDS_KEPT if key in page} for page in self.pages]
         self.logger.info(f"Created {created_count} nodes in total")
     
+    def _page_content(self, page):
+        """Return a page's text; pages that became nodes keep it in the node store only"""
+        if "content" in page:
+            return page["content"]
+        return self.nodes_by_url[page["url"]].content
+    
     def _build_tree_structure(self):
         """Build the tree structure based on paths"""
         self.logger.info("Building tree structure based on paths")
@@ -192,7 +182,7 @@ class PathBasedWebsiteProcessor:
                     parent_node.add_child(node)
                     parent_found = True
                     connected_count += 1
-                            break
+                    break
             
             # If no parent found, attach to master node
             if not parent_found:
@@ -244,11 +234,11 @@ class PathBasedWebsiteProcessor:
         
         # Find the header (common at the start of pages)
         header_pattern = "Przykłady instalacji produktów Roger"
-        header_pages = [page for page in self.pages if page["content"].startswith(header_pattern)]
+        header_pages = [page for page in self.pages if self._page_content(page).startswith(header_pattern)]
         
         if len(header_pages) > len(self.pages) / 2:
             # This is a common header, extract it
-            sample_page = header_pages[0]["content"]
+            sample_page = self._page_content(header_pages[0])
             header_end = sample_page.find("\n") if "\n" in sample_page else 38
             header_content = sample_page[:header_end].strip()
             
@@ -263,11 +253,11 @@ class PathBasedWebsiteProcessor:
         
         # Find the footer (common at the end of pages)
         footer_pattern = "Newsletter     Bądź na bieżąco   Na skróty       Wsparcie       Kontakt   Komunikaty"
-        footer_pages = [page for page in self.pages if page["content"].endswith(footer_pattern)]
+        footer_pages = [page for page in self.pages if self._page_content(page).endswith(footer_pattern)]
         
         if len(footer_pages) > len(self.pages) / 2:
             # This is a common footer
-            sample_page = footer_pages[0]["content"]
+            sample_page = self._page_content(footer_pages[0])
             footer_start = sample_page.rfind("Newsletter")
             if footer_start != -1:
                 footer_content = sample_page[footer_start:].strip()
@@ -283,10 +273,10 @@ class PathBasedWebsiteProcessor:
         
         # Extract common "przydatne linki" section
         links_pattern = "Przydatne linki"
-        links_pages = [page for page in self.pages if links_pattern in page["content"]]
+        links_pages = [page for page in self.pages if links_pattern in self._page_content(page)]
         
         if len(links_pages) > 2:
-            sample_page = links_pages[0]["content"]
+            sample_page = self._page_content(links_pages[0])
             links_start = sample_page.find(links_pattern)
             links_end = sample_page.find("Newsletter", links_start) if "Newsletter" in sample_page else -1
             
@@ -322,7 +312,7 @@ class PathBasedWebsiteProcessor:
         all_chunks = []
         
         for i, page in enumerate(self.pages):
-            content = page["content"]
+            content = self._page_content(page)
             url = page["url"]
             
             # Skip if this page has no content
@@ -536,8 +526,8 @@ class PathBasedWebsiteProcessor:
             content = node.content
             node_url = node.full_url if hasattr(node, 'full_url') else None
             
-            # Initialize or reset common blocks used dictionary
-            node.common_blocks_used = {}
+            # Reset the common blocks used
+            node.common_blocks = None
             
             # Track replacements to handle overlapping blocks
             replacements = []
@@ -581,9 +571,9 @@ class PathBasedWebsiteProcessor:
             # Apply the replacements
             for replacement in non_overlapping:
                 # Mark this block as used
-                node.common_blocks_used[replacement["block_id"]] = blocks_to_replace[
+                node.use_common_block(replacement["block_id"], blocks_to_replace[
                     next(i for i, b in enumerate(blocks_to_replace) if b["id"] == replacement["block_id"])
-                ]["name"]
+                ]["name"])
                 
                 # Apply the replacement
                 content = content[:replacement["start"]] + replacement["replacement"] + content[replacement["end"]:]
@@ -1,8 +1,168 @@
 import json
+import math
 import re
 import difflib
 from typing import List, Dict, Any, Tuple, Optional
 import os
+from array import array
+
+# Polish and English function words, left out of the keyword index (words
+# of up to 3 letters are never indexed)
+STOPWORDS = frozenset("""
+    albo będą będzie bardzo bez było były jako jakie jaki jednak jego jej jeśli jest jeszcze już
+    każdy kiedy która które który którzy można może mogą nasz nasze nasza nich nie niż oraz
+    ponieważ poprzez przed przez przy również się swoje tak także tego tej tych tylko wiele
+    więcej wraz wszystkie wszystko zawsze został została zostały
+    about after also because been before being both could does each from have here into
+    more most only other over should some such than that their them then there these they
+    this those very were what when where which while will with would your
+""".split())
+
+
+class PathTrie:
+    """
+    Map from URL paths to values with ancestor and prefix queries.
+
+    Each trie node is a path prefix ("produkty/kontrolery") whose children
+    are its one-segment extensions, so a path's nearest existing ancestor is
+    a walk up parent links and the paths under a prefix are one subtree walk
+    instead of a startswith scan over all paths. Nodes are integer ids into
+    flat arrays, looked up by their prefix string. "/a" and "/a/" share a
+    node, which keeps both.
+    """
+    ROOT = 0
+    NO_NODE = -1
+
+    def __init__(self, items=()):
+        self.index = {"": self.ROOT}  # Path key -> node id
+        self.keys = [""]
+        self.entries = [None]  # (path, value) pairs stored at each node, None if none
+        self.parents = array('i', [self.NO_NODE])
+        self.first_children = array('i', [self.NO_NODE])
+        self.last_children = array('i', [self.NO_NODE])
+        self.next_siblings = array('i', [self.NO_NODE])
+        for path, value in items:
+            self.insert(path, value)
+
+    @staticmethod
+    def path_key(path: str) -> str:
+        """Return the trie key of a path: "/produkty/kontrolery/" -> "produkty/kontrolery" """
+        return path.strip("/")
+
+    def insert(self, path: str, value: Any):
+        """Add a value at a path, replacing the one stored at exactly that path"""
+        node = self._node(self.path_key(path))
+        entries = self.entries[node]
+        if entries is None:
+            self.entries[node] = [(path, value)]
+            return
+        for i, (other, _) in enumerate(entries):
+            if other == path:
+                entries[i] = (path, value)
+                return
+        entries.append((path, value))
+
+    def _node(self, key: str) -> int:
+        """Return the node of a key, creating it and its missing ancestors"""
+        node = self.index.get(key)
+        if node is not None:
+            return node
+        missing = []
+        while node is None:
+            missing.append(key)
+            key = key.rpartition("/")[0]
+            node = self.index.get(key)
+        for key in reversed(missing):
+            node = self._add_node(node, key)
+        return node
+
+    def _add_node(self, parent: int, key: str) -> int:
+        node = len(self.keys)
+        self.index[key] = node
+        self.keys.append(key)
+        self.entries.append(None)
+        self.parents.append(parent)
+        self.first_children.append(self.NO_NODE)
+        self.last_children.append(self.NO_NODE)
+        self.next_siblings.append(self.NO_NODE)
+        last = self.last_children[parent]
+        if last == self.NO_NODE:
+            self.first_children[parent] = node
+        else:
+            self.next_siblings[last] = node
+        self.last_children[parent] = node
+        return node
+
+    def get(self, path: str, default: Any = None) -> Any:
+        """
+        Return the value at `path`, or else at the same path with or without
+        its trailing slash
+        """
+        node = self.index.get(self.path_key(path))
+        entries = self.entries[node] if node is not None else None
+        if not entries:
+            return default
+        for other, value in entries:
+            if other == path:
+                return value
+        return entries[0][1]
+
+    def nearest_ancestor(self, path: str) -> Optional[Tuple[str, Any]]:
+        """
+        Return (path, value) of the deepest proper ancestor of `path` that
+        holds a value, or None. `path` itself need not be in the trie.
+        """
+        key = self.path_key(path)
+        if not key:
+            return None
+        node = self.index.get(key)
+        if node is not None:
+            node = self.parents[node]
+        else:
+            # Not in the trie: start from its deepest prefix that is
+            while node is None:
+                key = key.rpartition("/")[0]
+                node = self.index.get(key)
+        while node != self.NO_NODE and self.entries[node] is None:
+            node = self.parents[node]
+        return self.entries[node][0] if node != self.NO_NODE else None
+
+    def _children(self, node: int):
+        child = self.first_children[node]
+        while child != self.NO_NODE:
+            yield child
+            child = self.next_siblings[child]
+
+    def prefix_items(self, prefix: str):
+        """
+        Yield (path, value) for every path that starts with the string
+        `prefix`, which may end in a partial segment ("/produkty/kontr")
+        """
+        key = self.path_key(prefix)
+        if prefix.endswith("/") or not key:
+            starts = [self.index.get(key)]
+        else:
+            parent = self.index.get(key.rpartition("/")[0])
+            starts = [child for child in self._children(parent) if self.keys[child].startswith(key)] \
+                if parent is not None else []
+
+        for start in starts:
+            if start is None:
+                continue
+            # A node's path may lack the trailing slash the prefix has
+            for path, value in self._walk(start):
+                if path.startswith(prefix):
+                    yield path, value
+
+    def _walk(self, node: int):
+        # Iterative pre-order walk, so deep sites can't hit the recursion limit
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if self.entries[node] is not None:
+                yield from self.entries[node]
+            stack.extend(reversed(list(self._children(node))))
+
 
 class WebsiteKnowledgeBase:
     """
@@ -10,6 +170,36 @@ class WebsiteKnowledgeBase:
     that provides intelligent search and retrieval capabilities for an AI agent.
     """
     
+    # Link-graph rank prior: relevance is scaled by 1 + weight * ln(rank),
+    # clamped to these bounds (rank 1.0 is an average page)
+    RANK_PRIOR_WEIGHT = 0.1
+    RANK_PRIOR_MIN = 0.8
+    RANK_PRIOR_MAX = 1.25
+    
+    # Weight of a match in the anchor texts of links into a page, on top of
+    # the title (0.6) and content (0.4) scores
+    ANCHOR_WEIGHT = 0.3
+    
+    # Weight of a match in a common block (footer, menus) found on many
+    # pages; the block is one result instead of every page containing it
+    COMMON_BLOCK_WEIGHT = 0.4
+    
+    # Pages listed on a common-block result
+    COMMON_BLOCK_PAGES = 10
+    
+    # Words on more than this share of the pages with text ("roger", footer
+    # links) are dropped from the keyword index. Download placeholders without
+    # text don't count, and on a bilingual site like roger.pl each language's
+    # footer is on about half of the pages. Only sites of at least
+    # PRUNE_MIN_PAGES such pages are pruned: on smaller ones most content
+    # words pass any threshold that catches the site name
+    MAX_DOCUMENT_FREQUENCY = 0.4
+    PRUNE_MIN_PAGES = 300
+    
+    # A dropped frequent word keeps this many of its best-ranked pages, used
+    # only when no other query word finds a candidate
+    PRUNED_POSTINGS_KEPT = 50
+    
     def __init__(self, structure_file: str):
         """Initialize with a processed website structure file"""
         # Load the processed website structure
@@ -21,25 +211,115 @@ class WebsiteKnowledgeBase:
         self.master_node = self.website["master_node"]
         self.domain = self.website.get("domain", "")
         
-        # Build lookup dictionaries
+        # Build lookup dictionaries; subtree_ranges maps each path to the
+        # (pre-order number, pre-order number of its last descendant) pair
         self.nodes_by_path = {}
+        self.subtree_ranges = {}
         self._build_path_map(self.master_node)
         
-        # Build keyword index for faster searching
-        self.keyword_index = self._build_keyword_index()
+        # Path trie for prefix and ancestor lookups
+        self.path_trie = PathTrie(self.nodes_by_path.items())
+        
+        # Link common blocks back to the pages that contain them, and cut
+        # them out of the page text that gets indexed and scored
+        self.block_pages, self.page_texts = self._link_common_blocks()
+        
+        # Build keyword index for faster searching, without stopwords and
+        # words found on most pages; pruned_terms records what was dropped
+        self.pruned_terms = {}
+        self.frequent_terms = {}
+        self.keyword_index = self._prune_keyword_index(self._build_keyword_index())
+        
+        # Common blocks are indexed once, as documents of their own
+        self.block_index = self._drop_stopwords(self._build_block_index())
+        
+        # Anchor texts are indexed as a field of their own
+        self.anchor_index = self._drop_stopwords(self._build_anchor_index())
         
         # Track sections by category
         self.sections_by_category = self._categorize_sections()
         
+        # Precompute the ranking prior of every node from its link-graph rank
+        self.rank_priors = self._build_rank_priors()
+        
         print(f"Loaded knowledge base with {len(self.nodes_by_path)} nodes and {len(self.common_blocks)} common blocks")
+        print(self._pruning_summary())
     
     def _build_path_map(self, node: Dict[str, Any]):
-        """Recursively build a flat map of all nodes by path"""
-        if "path" in node:
-            self.nodes_by_path[node["path"]] = node
+        """
+        Build a flat map of all nodes by path, numbering them in pre-order
+        (an Euler tour) so that a node's subtree is one contiguous range
+        """
+        # Iterative, so deep sites can't hit the recursion limit; a node is
+        # pushed again after its children to close its range
+        stack = [(node, False)]
+        counter = 0
+        while stack:
+            node, closing = stack.pop()
+            path = node.get("path")
+            if closing:
+                self.subtree_ranges[path] = (self.subtree_ranges[path][0], counter - 1)
+                continue
+            if path is not None:
+                self.nodes_by_path[path] = node
+                self.subtree_ranges[path] = (counter, counter)
+                counter += 1
+                stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node.get("children", [])))
+    
+    def _resolve_scope(self, within: Optional[str]) -> Optional[Tuple[int, int]]:
+        """Return the pre-order range of the section at `within`, or None if there is no such node"""
+        node = self.path_trie.get(within)
+        return self.subtree_ranges[node["path"]] if node is not None else None
+    
+    def subtree_size(self, path: str) -> int:
+        """Number of nodes in the subtree at a path, the node itself included"""
+        start, end = self.subtree_ranges.get(path, (0, -1))
+        return end - start + 1
+    
+    def _link_common_blocks(self) -> Tuple[Dict[str, List[str]], Dict[str, str]]:
+        """
+        Find the common blocks in each page and return the paths of the pages
+        using each block, and the text of the pages with their blocks removed
+        (only for pages where that differs from their content). Blocks the
+        processor did not replace, because it did not see them on that URL,
+        are cut out here too.
+        """
+        block_pages = {block_id: [] for block_id in self.common_blocks}
+        page_texts = {}
+        
+        # References the processor left in place of the blocks: "[footer]"
+        markers = [f"[{block.get('name', block_id)}]" for block_id, block in self.common_blocks.items()]
+        marker_pattern = re.compile("|".join(map(re.escape, markers))) if markers else None
+        
+        for path, node in self.nodes_by_path.items():
+            content = node.get("content", "")
+            used = set(node.get("common_blocks", {}))
+            text = content
+            
+            # Documents keep their text so page offsets stay valid
+            if text and not node.get("pages"):
+                for block_id, block in self.common_blocks.items():
+                    block_content = block.get("content")
+                    if block_content and block_content in text:
+                        text = text.replace(block_content, " ")
+                        used.add(block_id)
+                if marker_pattern is not None:
+                    text = marker_pattern.sub(" ", text)
+            
+            for block_id in used:
+                if block_id in block_pages:
+                    block_pages[block_id].append(path)
+            if text != content:
+                page_texts[path] = text
         
-        for child in node.get("children", []):
-            self._build_path_map(child)
+        return block_pages, page_texts
+    
+    def _page_text(self, path: str) -> str:
+        """A page's own text: its content without common blocks"""
+        if path in self.page_texts:
+            return self.page_texts[path]
+        return self.nodes_by_path[path].get("content", "")
     
     def _build_keyword_index(self) -> Dict[str, List[str]]:
         """Build a keyword-to-paths index for faster searching"""
@@ -49,7 +329,7 @@ class WebsiteKnowledgeBase:
         for path, node in self.nodes_by_path.items():
             # Extract keywords from title and content
             title = node.get("title", "")
-            content = node.get("content", "")
+            content = self._page_text(path)
             
             # Extract keywords (simple implementation - could be improved)
             keywords = set()
@@ -72,6 +352,94 @@ class WebsiteKnowledgeBase:
         
         return keyword_index
     
+    def _prune_keyword_index(self, keyword_index: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """
+        Drop stopwords and too frequent words from the keyword index,
+        recording each in pruned_terms. Frequent words keep the pages titled
+        with them and their best-ranked pages in frequent_terms for the
+        query-time fallback.
+        """
+        max_pages = None
+        pages = sum(1 for path in self.nodes_by_path if self._page_text(path))
+        if pages >= self.PRUNE_MIN_PAGES:
+            max_pages = self.MAX_DOCUMENT_FREQUENCY * pages
+        
+        def kept_order(word, path):
+            # Pages titled with the word are about it and go first, so the
+            # fallback still finds them; the sort is stable, so ties stay in
+            # tree order
+            node = self.nodes_by_path[path]
+            titled = word in re.findall(r'\w+', (node.get("title") or "").lower())
+            return not titled, -(node.get("rank") or 0)
+        
+        for word in list(keyword_index):
+            paths = keyword_index[word]
+            if word in STOPWORDS:
+                reason = "stopword"
+            elif max_pages is not None and len(paths) > max_pages:
+                reason = "frequent"
+                best = sorted(paths, key=lambda path: kept_order(word, path))
+                self.frequent_terms[word] = best[:self.PRUNED_POSTINGS_KEPT]
+            else:
+                continue
+            self.pruned_terms[word] = {"reason": reason, "pages": len(paths)}
+            del keyword_index[word]
+        
+        return keyword_index
+    
+    def _drop_stopwords(self, index: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """Remove stopwords from a keyword index"""
+        for word in STOPWORDS.intersection(index):
+            del index[word]
+        return index
+    
+    def _pruning_summary(self) -> str:
+        """One line describing what the keyword index pruning dropped"""
+        stopwords = sum(1 for term in self.pruned_terms.values() if term["reason"] == "stopword")
+        postings = sum(term["pages"] for term in self.pruned_terms.values())
+        kept = sum(len(paths) for paths in self.keyword_index.values())
+        return (f"Keyword index: {len(self.keyword_index)} words, {kept} postings; pruned {stopwords} stopwords "
+                f"and {len(self.frequent_terms)} frequent words ({postings} postings)")
+    
+    def pruning_report(self) -> List[Dict[str, Any]]:
+        """The words dropped from the keyword index, most frequent first"""
+        report = [{"word": word, "reason": term["reason"], "pages": term["pages"],
+                   "share": term["pages"] / len(self.nodes_by_path)}
+                  for word, term in self.pruned_terms.items()]
+        report.sort(key=lambda term: term["pages"], reverse=True)
+        return report
+    
+    def _build_block_index(self) -> Dict[str, List[str]]:
+        """Build a keyword-to-block-ids index over the common blocks"""
+        block_index = {}
+        
+        for block_id, block in self.common_blocks.items():
+            keywords = set()
+            for word in re.findall(r'\w+', block.get("content", "").lower()):
+                if len(word) > 3:  # Skip short words
+                    keywords.add(word)
+            
+            for keyword in keywords:
+                block_index.setdefault(keyword, []).append(block_id)
+        
+        return block_index
+    
+    def _build_anchor_index(self) -> Dict[str, List[str]]:
+        """Build a keyword-to-paths index over the anchor texts of links into each node"""
+        anchor_index = {}
+        
+        for path, node in self.nodes_by_path.items():
+            keywords = set()
+            for anchor in node.get("anchors", []):
+                for word in re.findall(r'\w+', anchor.lower()):
+                    if len(word) > 3:  # Skip short words
+                        keywords.add(word)
+            
+            for keyword in keywords:
+                anchor_index.setdefault(keyword, []).append(path)
+        
+        return anchor_index
+    
     def _categorize_sections(self) -> Dict[str, List[str]]:
         """Group sections by their category"""
         categories = {}
@@ -86,18 +454,39 @@ class WebsiteKnowledgeBase:
         
         return categories
     
-    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def _build_rank_priors(self) -> Dict[str, float]:
+        """Map paths to a relevance multiplier from their PageRank, so well-linked pages rank higher"""
+        rank_priors = {}
+        for path, node in self.nodes_by_path.items():
+            rank = node.get("rank")
+            if rank:
+                prior = 1 + self.RANK_PRIOR_WEIGHT * math.log(rank)
+                rank_priors[path] = min(self.RANK_PRIOR_MAX, max(self.RANK_PRIOR_MIN, prior))
+        return rank_priors
+    
+    def search(self, query: str, limit: int = 10, within: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Search for nodes matching the query.
         Returns a list of matching nodes with relevance scores.
+        With `within` (a path such as "/produkty/kontrolery"), only that
+        node and the nodes under it are returned.
         """
         query = query.lower()
         query_words = set(re.findall(r'\w+', query))
         results = []
         
+        in_scope = None
+        if within is not None:
+            scope = self._resolve_scope(within)
+            if scope is None:
+                return results
+            first, last = scope
+            ranges = self.subtree_ranges
+            in_scope = lambda path: first <= ranges[path][0] <= last
+        
         # First, try exact path match
         if query.startswith('/'):
-            if query in self.nodes_by_path:
+            if query in self.nodes_by_path and (in_scope is None or in_scope(query)):
                 node = self.nodes_by_path[query]
                 results.append({
                     "path": query,
@@ -109,43 +498,93 @@ class WebsiteKnowledgeBase:
                 return results
             
             # Try approximate path match
-            for path in self.nodes_by_path:
-                if path.startswith(query):
-                    node = self.nodes_by_path[path]
-                    results.append({
-                        "path": path,
-                        "title": node.get("title", ""),
-                        "content_preview": self._get_content_preview(node),
-                        "relevance": 0.9,
-                        "match_type": "path_prefix"
-                    })
+            for path, node in self.path_trie.prefix_items(query):
+                if in_scope is not None and not in_scope(path):
+                    continue
+                results.append({
+                    "path": path,
+                    "title": node.get("title", ""),
+                    "content_preview": self._get_content_preview(node),
+                    "relevance": 0.9,
+                    "match_type": "path_prefix"
+                })
         
         # Use keyword index to find candidate paths
         candidate_paths = set()
+        candidate_blocks = set()
         for word in query_words:
             if word in self.keyword_index:
                 candidate_paths.update(self.keyword_index[word])
+            if word in self.anchor_index:
+                candidate_paths.update(self.anchor_index[word])
+            if word in self.block_index:
+                candidate_blocks.update(self.block_index[word])
+        
+        # Words on most pages were pruned from the index; they still count
+        # in scoring, and find candidates themselves only if no other query
+        # word is indexed
+        if not any(word in self.keyword_index for word in query_words):
+            for word in query_words:
+                candidate_paths.update(self.frequent_terms.get(word, ()))
+        if in_scope is not None:
+            candidate_paths = {path for path in candidate_paths if in_scope(path)}
         
         # Score each candidate
         for path in candidate_paths:
             node = self.nodes_by_path[path]
             title = node.get("title", "").lower()
-            content = node.get("content", "").lower()
+            content = self._page_text(path).lower()
             
             # Calculate relevance score
             title_score = self._calculate_relevance(title, query)
             content_score = self._calculate_relevance(content, query)
+            anchor_score = 0.0
+            if node.get("anchors"):
+                anchor_score = self._calculate_relevance(" ".join(node["anchors"]).lower(), query)
             
-            # Combine scores (title matches are more important)
-            relevance = (title_score * 0.6) + (content_score * 0.4)
+            # Combine scores (title matches are more important, anchors
+            # help pages whose own text is thin)
+            relevance = (title_score * 0.6) + (content_score * 0.4) + (anchor_score * self.ANCHOR_WEIGHT)
             
             if relevance > 0.1:  # Only include somewhat relevant results
-                results.append({
+                # Among equally relevant pages, prefer the well-linked ones
+                relevance *= self.rank_priors.get(path, 1.0)
+                result = {
                     "path": path,
                     "title": node.get("title", ""),
                     "content_preview": self._get_content_preview(node, query),
                     "relevance": relevance,
                     "match_type": "content_match"
+                }
+                
+                # For documents, cite the page the match is on
+                page = self._page_at(node, content.find(query))
+                if page is not None:
+                    result["page"] = page
+                
+                results.append(result)
+        
+        # A match in boilerplate is one result for its block, pointing to
+        # the pages that contain it
+        for block_id in candidate_blocks:
+            pages = self.block_pages.get(block_id, [])
+            if in_scope is not None:
+                pages = [path for path in pages if in_scope(path)]
+            if not pages:
+                continue
+            
+            block = self.common_blocks[block_id]
+            relevance = self._calculate_relevance(block.get("content", "").lower(), query) * self.COMMON_BLOCK_WEIGHT
+            if relevance > 0.1:
+                results.append({
+                    "path": pages[0],
+                    "title": block.get("name", block_id),
+                    "content_preview": self._get_content_preview(block, query),
+                    "relevance": relevance,
+                    "match_type": "common_block",
+                    "block_id": block_id,
+                    "pages": pages[:self.COMMON_BLOCK_PAGES],
+                    "page_count": len(pages)
                 })
         
         # Sort by relevance (highest first)
@@ -202,6 +641,25 @@ class WebsiteKnowledgeBase:
         # Fallback to beginning of content
         return content[:100] + "..." if len(content) > 100 else content
     
+    def _page_at(self, node: Dict[str, Any], offset: int) -> Optional[int]:
+        """Return the document page containing a content offset, if known"""
+        for span in node.get("pages", []):
+            if span["start"] <= offset < span["end"]:
+                return span["page"]
+        return None
+    
+    def get_document_pages(self, path: str) -> List[Dict[str, Any]]:
+        """Get the text of each page of a document (PDF) node"""
+        node = self.nodes_by_path.get(path)
+        if not node:
+            return []
+        
+        content = node.get("content", "")
+        return [
+            {"page": span["page"], "text": content[span["start"]:span["end"]]}
+            for span in node.get("pages", [])
+        ]
+    
     def get_node_content(self, path: str) -> Optional[Dict[str, Any]]:
         """Get the full content for a specific path"""
         if path in self.nodes_by_path:
@@ -457,15 +915,12 @@ class WebsiteKnowledgeBase:
         return related[:5]
     
     def _get_parent_path(self, path: str) -> Optional[str]:
-        """Get the parent path for a given path"""
+        """Get the path of the closest existing ancestor of a given path"""
         if path == "/" or not path:
             return None
-            
-        parts = path.strip("/").split("/")
-        if not parts:
-            return "/"
-            
-        return "/" + "/".join(parts[:-1])
+        
+        ancestor = self.path_trie.nearest_ancestor(path)
+        return ancestor[0] if ancestor else None
     
     def _generate_product_summary(self, node: Dict[str, Any]) -> str:
         """Generate a concise summary of a product"""
@@ -611,7 +1066,9 @@ class AIAgent:
         # Handle search commands
         elif query.startswith("search "):
             search_term = query[len("search "):].strip()
-            results = self.knowledge_base.search(search_term)
+            # "search <term> within <path>" limits the search to a section
+            search_term, _, within = search_term.partition(" within ")
+            results = self.knowledge_base.search(search_term, within=within.strip() or None)
             
             if results:
                 response = f"Found {len(results)} results for '{search_term}':\n\n"
@@ -698,7 +1155,7 @@ class AIAgent:
         """Run in interactive mode, allowing the user to query the agent"""
         print("AI Agent with Website Knowledge Base")
         print("Type 'exit' or 'quit' to end the session")
-        print("Commands: search <term>, navigate <path>, download <product>")
+        print("Commands: search <term> [within <path>], navigate <path>, download <product>")
         
         while True:
             query = input(f"\n[{self.current_path}]> ")